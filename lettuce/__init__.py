@@ -20,12 +20,7 @@ release = 'barium'
 
 import os
 import sys
-import traceback
-from datetime import datetime
-
-from lettuce import fs
-
-from lettuce.core import Feature, TotalResult, RunController
+import types
 
 from lettuce.terrain import after
 from lettuce.terrain import before
@@ -35,131 +30,47 @@ from lettuce.decorators import step
 from lettuce.registry import call_hook
 from lettuce.registry import STEP_REGISTRY
 from lettuce.registry import CALLBACK_REGISTRY
-from lettuce.exceptions import StepLoadingError
-from lettuce.plugins import xunit_output
-
-from lettuce import exceptions
 
 __all__ = ['after', 'before', 'step', 'world', 'STEP_REGISTRY', 'CALLBACK_REGISTRY', 'call_hook']
 
-try:
-    terrain = fs.FileSystem._import("terrain")
-    reload(terrain)
-except Exception, e:
-    if not "No module named terrain" in str(e):
-        string = 'Lettuce has tried to load the conventional environment ' \
-            'module "terrain"\nbut it has errors, check its contents and ' \
-            'try to run lettuce again.\n\nOriginal traceback below:\n\n'
-
-        sys.stderr.write(string)
-        sys.stderr.write(exceptions.traceback.format_exc(e))
-        raise SystemExit(1)
-
-class Runner(object):
-    """ Main lettuce's test runner
-
-    Takes a base path as parameter (string), so that it can look for
-    features and step definitions on there.
-    """
-    def __init__(self, base_path, scenarios=None, verbosity=0,
-                 enable_xunit=False, xunit_filename=None,
-                 run_controller=RunController()):
-        """ lettuce.Runner will try to find a terrain.py file and
-        import it from within `base_path`
-        """
-
-        self.single_feature = None
-        if os.path.isfile(base_path) and os.path.exists(base_path):
-            self.single_feature = base_path
-            base_path = os.path.dirname(base_path)
-
-        sys.path.insert(0, base_path)
-        self.loader = fs.FeatureLoader(base_path)
-        self.verbosity = verbosity
-        self.scenarios = scenarios and map(int, scenarios.split(",")) or None
-        self.run_controller = run_controller
-        self.feature_for_test = None
-
-        sys.path.remove(base_path)
-
-        if verbosity is 0:
-            from lettuce.plugins import non_verbose as output
-        elif verbosity is 1:
-            from lettuce.plugins import dots as output
-        elif verbosity is 2:
-            from lettuce.plugins import scenario_names as output
-        elif verbosity is 3:
-            from lettuce.plugins import shell_output as output
-        else:
-            from lettuce.plugins import colored_shell_output as output
-
-        if enable_xunit:
-            xunit_output.enable(filename=xunit_filename)
-
-        reload(output)
-
-        self.output = output
-
-    def run(self):
-        """ Find and load step definitions, and them find and load
-        features under `base_path` specified on constructor
-        """
-
-        started_at = datetime.now()
-        try:
-            self.loader.find_and_load_step_definitions()
-        except StepLoadingError, e:
-            print "Error loading step definitions:\n", e
-            return
-
-        call_hook('before', 'all')
-
-        results = []
-        if self.single_feature:
-            features_files = [self.single_feature]
-        else:
-            features_files = self.loader.find_feature_files()
-
-        if not features_files:
-            self.output.print_no_features_found(self.loader.base_dir)
-            return
-
-        failed = False
-        try:
-            for filename in features_files:
-                feature = Feature.from_file(filename)
-                self.feature_for_test = feature
-                results.append(feature.run(self.run_controller, self.scenarios))
-        except exceptions.LettuceSyntaxError, e:
-            sys.stderr.write(e.msg)
-            failed = True
-        except:
-            e = sys.exc_info()[1]
-            print "Died with "+str(e)
-            traceback.print_exc()
-            failed = True
-
-        finally:
-            if failed:
-                raise SystemExit(2)
-
-            total = TotalResult(results, self.run_controller.only_syntax_check)
-
-            self.run_controller.finished(total)
-
-            call_hook('after', 'all', total)
-
-            finished_at = datetime.now()
-            time_took = finished_at - started_at
-
-            hours = time_took.seconds / 60 / 60
-            minutes = time_took.seconds / 60
-            seconds = time_took.seconds
-            if hours:
-                print  "(finished within %d hours)" % hours
-            elif minutes:
-                print  "(finished within %d minutes)" % minutes
-            elif seconds:
-                print  "(finished within %d seconds)" % seconds
-
-            return total
+# Names of the rest of lettuce, by the module they live in. Those are
+# only imported once asked for, so that step definitions (and whatever
+# else just wants `step` and friends) don't pay for all of lettuce, nor
+# for terrain, that the Runner loads.
+LAZY_NAMES = {
+    'Runner': 'lettuce.runner',
+    'load_terrain': 'lettuce.runner',
+    'Feature': 'lettuce.core',
+    'TotalResult': 'lettuce.core',
+    'RunController': 'lettuce.core',
+    'StepLoadingError': 'lettuce.exceptions',
+    'xunit_output': 'lettuce.plugins',
+    'hotspots_output': 'lettuce.plugins',
+    'results_output': 'lettuce.plugins',
+    'events_output': 'lettuce.plugins',
+}
+
+class LazyPackage(types.ModuleType):
+    """The lettuce package, importing lazily the names in LAZY_NAMES
+    and its submodules"""
+    def __getattr__(self, name):
+        if name in LAZY_NAMES:
+            module = __import__(LAZY_NAMES[name], None, None, [name])
+            value = getattr(module, name)
+            setattr(self, name, value)
+            return value
+
+        if not name.startswith('__'):
+            path = os.path.join(self.__path__[0], name)
+            if os.path.exists(path + '.py') or os.path.isdir(path):
+                __import__('%s.%s' % (self.__name__, name))
+                return sys.modules['%s.%s' % (self.__name__, name)]
+
+        raise AttributeError("'module' object has no attribute '%s'" % name)
+
+_package = LazyPackage(__name__, __doc__)
+_package.__dict__.update(globals())
+# keeps this very module alive, as python 2 would clear its globals,
+# that LazyPackage uses, once it goes away
+_package._module = sys.modules[__name__]
+sys.modules[__name__] = _package
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import hashlib
+import cPickle as pickle
+
+from lettuce.fs import FileSystem
+
+# bump it whenever parsing gives different objects than before, so
+# that entries written by older lettuces are just ignored
+FORMAT = 5
+
+class FeatureCache(object):
+    """On-disk cache of parsed features, so that unchanged feature
+    files don't get parsed again on the next run.
+
+    Each feature file has its own entry, keyed by the file's absolute
+    path, the current dir (descriptions keep paths relative to it) and
+    the parser, as each parser gives its own objects. An entry is valid while the file keeps its mtime and size, or
+    at least its content hash.
+    """
+    def __init__(self, cache_dir='.lettuce_cache'):
+        self.cache_dir = FileSystem.abspath(cache_dir)
+        self.features_dir = FileSystem.join(self.cache_dir, 'features')
+
+    def _entry_path(self, filename, parser):
+        key = u"%s\n%s\n%s" % (FileSystem.abspath(filename),
+                               FileSystem.current_dir(), parser)
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return FileSystem.join(self.features_dir, "%s.pickle" % name)
+
+    def _hash(self, content):
+        if isinstance(content, unicode):
+            content = content.encode('utf-8')
+
+        return hashlib.sha1(content).hexdigest()
+
+    def load(self, filename, parser):
+        """Returns the feature cached for the given file and parser
+        name, or None if there is no valid entry for it"""
+        try:
+            stat = os.stat(filename)
+            f = open(self._entry_path(filename, parser), 'rb')
+            try:
+                entry = pickle.load(f)
+            finally:
+                f.close()
+        except Exception:
+            return None
+
+        if entry.get('format') != FORMAT:
+            return None
+
+        if (entry['mtime'], entry['size']) != (stat.st_mtime, stat.st_size):
+            f = FileSystem.open_raw(filename, 'rb')
+            try:
+                content = f.read()
+            finally:
+                f.close()
+
+            if self._hash(content) != entry['hash']:
+                return None
+
+        return entry['feature']
+
+    def store(self, filename, content, feature, parser):
+        """Saves the given feature, parsed out of `content` with the
+        given parser. Failing to write the cache never breaks the run."""
+        entry = {
+            'format': FORMAT,
+            'hash': self._hash(content),
+            'feature': feature,
+        }
+        path = self._entry_path(filename, parser)
+        temporary = "%s.%d" % (path, os.getpid())
+        try:
+            stat = os.stat(filename)
+            entry['mtime'], entry['size'] = stat.st_mtime, stat.st_size
+            FileSystem.mkdir(self.features_dir)
+            f = open(temporary, 'wb')
+            try:
+                pickle.dump(entry, f, pickle.HIGHEST_PROTOCOL)
+            finally:
+                f.close()
+
+            os.rename(temporary, path)
+        except Exception:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+class FileListCache(object):
+    """On-disk cache of the files found under a directory, so that
+    finding step definitions and features does not list every
+    directory again on the next run.
+
+    Each base directory has its own entry, valid while every directory
+    within it keeps its mtime: adding, removing or renaming a file
+    changes the mtime of the directory holding it.
+    """
+    def __init__(self, cache_dir='.lettuce_cache'):
+        self.cache_dir = FileSystem.abspath(cache_dir)
+        self.files_dir = FileSystem.join(self.cache_dir, 'files')
+
+    def _entry_path(self, base_dir):
+        key = FileSystem.abspath(base_dir)
+        if isinstance(key, unicode):
+            key = key.encode('utf-8')
+
+        name = hashlib.sha1(key).hexdigest()
+        return FileSystem.join(self.files_dir, "%s.pickle" % name)
+
+    def load(self, base_dir):
+        """Returns the files last found under the given directory, or
+        None if some directory has changed since then"""
+        try:
+            f = open(self._entry_path(base_dir), 'rb')
+            try:
+                entry = pickle.load(f)
+            finally:
+                f.close()
+        except Exception:
+            return None
+
+        if entry.get('format') != FORMAT:
+            return None
+
+        for directory, mtime in entry['mtimes'].items():
+            try:
+                if os.stat(directory).st_mtime != mtime:
+                    return None
+            except OSError:
+                return None
+
+        return entry['files']
+
+    def store(self, base_dir, files, mtimes):
+        """Saves the files found under the given directory, along with
+        the mtime of each directory within it"""
+        entry = {
+            'format': FORMAT,
+            'files': files,
+            'mtimes': mtimes,
+        }
+        path = self._entry_path(base_dir)
+        temporary = "%s.%d" % (path, os.getpid())
+        try:
+            FileSystem.mkdir(self.files_dir)
+            f = open(temporary, 'wb')
+            try:
+                pickle.dump(entry, f, pickle.HIGHEST_PROTOCOL)
+            finally:
+                f.close()
+
+            os.rename(temporary, path)
+        except Exception:
+            if os.path.exists(temporary):
+                os.remove(temporary)
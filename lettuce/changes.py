@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Incremental test selection.
+
+Every run records, per scenario, the feature file it lives in and the
+modules of the step definitions its steps have used (plus terrain). When
+asked to, the RunController then runs only the scenarios for which some
+of those files have changed since a git ref or a point in time, along
+with those it knows nothing about yet, and those that had undefined
+steps whenever any python module changed or was added (it may define
+them now).
+"""
+import os
+import sys
+import pickle
+import subprocess
+
+from lettuce.exceptions import ChangeDetectionError
+
+# stands, among the files a scenario depends on, for its undefined steps
+UNDEFINED_STEPS = '<undefined steps>'
+
+def source_file(filename):
+    filename = os.path.realpath(filename)
+    if filename.endswith(('.pyc', '.pyo')):
+        filename = filename[:-1]
+
+    return filename
+
+def used_modules(scenario_result):
+    """Returns the files of the step definitions (and the terrain) the
+    steps of the given ScenarioResult have used, plus UNDEFINED_STEPS if
+    any of them is undefined"""
+    modules = set()
+    for step in scenario_result.all_steps:
+        if step.defined_at:
+            modules.add(source_file(step.defined_at.function.func_code.co_filename))
+        else:
+            modules.add(UNDEFINED_STEPS)
+
+    terrain = sys.modules.get('terrain')
+    if getattr(terrain, '__file__', None):
+        modules.add(source_file(terrain.__file__))
+
+    return modules
+
+class DependencyPersister(object):
+    """Keeps, between runs, the files each scenario depends on. Without
+    a filename they are only kept in memory, by the RunController"""
+    def __init__(self, filename=None):
+        self.filename = filename
+
+    def read_dependencies(self):
+        if not self.filename:
+            return {}
+        try:
+            f = open(self.filename, 'rb')
+            try:
+                return pickle.load(f)
+            finally:
+                f.close()
+        except Exception:
+            return {}
+
+    def write_dependencies(self, dependencies):
+        if not self.filename:
+            return
+        f = open(self.filename, 'wb')
+        try:
+            pickle.dump(dependencies, f, pickle.HIGHEST_PROTOCOL)
+        finally:
+            f.close()
+
+class ChangedFiles(object):
+    """Tells whether a file has changed since the given git ref or, when
+    given a number, since that mtime (in seconds since the epoch). Given
+    the list of changed `files` instead, as lettuce.watch does, only
+    those have changed.
+
+    The git ref is compared against the working tree, so uncommitted and
+    untracked files count as changed as well.
+    """
+    def __init__(self, since=None, path=None, files=None):
+        self.since = since
+        self.path = path or os.curdir
+        self.mtime = None
+        self.changed = None
+        self.modules_changed = None
+        if files is not None:
+            self.changed = set(map(source_file, files))
+            return
+
+        try:
+            self.mtime = float(since)
+        except ValueError:
+            self.changed = self._ask_git(since, self.path)
+
+    def _git(self, args, cwd):
+        try:
+            process = subprocess.Popen(['git'] + args, cwd=cwd,
+                                       stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE)
+        except OSError, e:
+            raise ChangeDetectionError('Could not run git: %s' % e)
+
+        out, err = process.communicate()
+        if process.returncode:
+            raise ChangeDetectionError(
+                'git %s failed: %s' % (' '.join(args), err.strip()))
+
+        return out
+
+    def _ask_git(self, ref, path):
+        if not os.path.isdir(path):
+            path = os.path.dirname(path)
+
+        top = self._git(['rev-parse', '--show-toplevel'], path).strip()
+        names = self._git(['diff', '--name-only', ref, '--'], top).splitlines()
+        names += self._git(['ls-files', '--others', '--exclude-standard'], top).splitlines()
+        return set([source_file(os.path.join(top, name)) for name in names if name])
+
+    def has_changed_modules(self):
+        """Tells whether any python module has changed or was added,
+        under the path given (or anywhere within the git repository)"""
+        if self.modules_changed is None:
+            if self.mtime is None:
+                self.modules_changed = any(
+                    [name.endswith('.py') for name in self.changed])
+            else:
+                self.modules_changed = self._finds_changed_module()
+
+        return self.modules_changed
+
+    def _finds_changed_module(self):
+        path = self.path
+        if not os.path.isdir(path):
+            path = os.path.dirname(path) or os.curdir
+
+        for root, dirs, files in os.walk(path):
+            for name in files:
+                if name.endswith('.py') and os.path.join(root, name) in self:
+                    return True
+
+        return False
+
+    def __contains__(self, filename):
+        filename = source_file(filename)
+        if self.mtime is None:
+            return filename in self.changed
+
+        try:
+            return os.stat(filename).st_mtime > self.mtime
+        except OSError:
+            return True
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""The console the output plugins write to.
+
+What they write is gathered and written out to sys.stdout at once: at
+the end of each scenario, as soon as a step fails, at the end of the
+run, or whenever more than `buffer_size` bytes are waiting. Within a
+terminal nothing waits by default, so that steps show up as they run.
+
+While lettuce runs, sys.stdout is held by a Stdout, that has the console
+flushed before anything else is written to it, so that whatever steps,
+hooks or lettuce itself print keeps its place among the output.
+"""
+import sys
+
+from lettuce.terrain import after
+
+# bytes gathered before writing them out, when not within a terminal
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+class Stdout(object):
+    """Stands for the given stream as sys.stdout, flushing the given
+    console before anything is written to it"""
+    def __init__(self, stream, console):
+        self.stream = stream
+        self.console = console
+
+    def write(self, what):
+        # flushing writes back here, with nothing left to flush
+        self.console.flush()
+        self.stream.write(what)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+class Console(object):
+    def __init__(self, buffer_size=None):
+        # None stands for 0 within a terminal, DEFAULT_BUFFER_SIZE otherwise
+        self.buffer_size = buffer_size
+        self.chunks = []
+        self.size = 0
+        self.limit = 0
+
+    def current_limit(self):
+        if self.buffer_size is not None:
+            return self.buffer_size
+
+        isatty = getattr(sys.stdout, 'isatty', None)
+        if isatty and isatty():
+            return 0
+
+        return DEFAULT_BUFFER_SIZE
+
+    def write(self, what):
+        if isinstance(what, unicode):
+            what = what.encode('utf-8')
+
+        if not self.chunks:
+            # sys.stdout may have changed since the last flush
+            self.limit = self.current_limit()
+
+        self.chunks.append(what)
+        self.size += len(what)
+        if self.size >= self.limit:
+            self.flush()
+
+    def flush(self):
+        if not self.chunks:
+            return
+
+        data = ''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        sys.stdout.write(data)
+        sys.stdout.flush()
+
+    def hold_stdout(self):
+        """Puts a Stdout in place of sys.stdout, unless it is one
+        already. Returns the former sys.stdout, for release_stdout."""
+        stdout = sys.stdout
+        if not isinstance(stdout, Stdout):
+            sys.stdout = Stdout(stdout, self)
+
+        return stdout
+
+    def release_stdout(self, stdout):
+        self.flush()
+        sys.stdout = stdout
+
+console = Console()
+write = console.write
+flush = console.flush
+hold_stdout = console.hold_stdout
+release_stdout = console.release_stdout
+
+def flush_scenario(scenario):
+    console.flush()
+
+def flush_failure(step):
+    if step.failed:
+        console.flush()
+
+def flush_along_the_run():
+    """Has the console flushed at the end of each scenario and after
+    each failed step. Called by the output plugins as they are loaded
+    (callbacks are only registered once)."""
+    after.each_scenario(flush_scenario)
+    after.each_step(flush_failure)
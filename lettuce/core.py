@@ -19,14 +19,18 @@ import re
 import codecs
 import unicodedata
 import pickle
+import hashlib
 import sys
 import traceback
-from copy import deepcopy
+from copy import copy
+from itertools import izip
 from lettuce import strings
 from lettuce import languages
+from lettuce import changes
 from lettuce.fs import FileSystem
-from lettuce.registry import STEP_REGISTRY
+from lettuce.registry import STEP_INDEX
 from lettuce.registry import call_hook
+from lettuce.timing import clock
 from lettuce.exceptions import ReasonToFail
 from lettuce.exceptions import NoDefinitionFound
 from lettuce.exceptions import LettuceSyntaxError
@@ -67,6 +71,77 @@ class HashList(list):
 
         raise AssertionError(self.__base_msg % (self.step.sentence, 'last'))
 
+class Table(object):
+    """The table of a step, kept as a list of values per column.
+
+    Rows are only turned into dicts once step.hashes is asked for, so
+    steps with huge tables can go through them by column or as tuples:
+
+        >>> names = step.table.column('name')
+        >>> cursor.executemany(sql, step.table.rows('name', 'age'))
+
+    Cells that short rows miss are None.
+    """
+    __missing_msg = 'The step "%s" have no table column with the key "%s". ' \
+        'Could you check your step definition for that ? ' \
+        'Maybe there is a typo :)'
+
+    def __init__(self, step, keys, columns):
+        self.step = step
+        self.keys = tuple(keys)
+        self.columns = columns
+
+    @classmethod
+    def from_hashes(cls, step, keys, hashes):
+        return cls(step, keys, [[row.get(key) for row in hashes] for key in keys])
+
+    def __len__(self):
+        if self.columns:
+            return len(self.columns[0])
+
+        return 0
+
+    def __iter__(self):
+        return self.rows()
+
+    def _index(self, key):
+        # the last column with that key, as in the dicts of step.hashes
+        for index in range(len(self.keys) - 1, -1, -1):
+            if self.keys[index] == key:
+                return index
+
+        raise AssertionError(self.__missing_msg % (self.step.sentence, key))
+
+    def column(self, key):
+        """Returns the list of the values under the given key"""
+        return list(self.columns[self._index(key)])
+
+    def rows(self, *keys):
+        """Returns an iterator of the rows, as tuples of the values
+        under the given keys, or under all of them"""
+        if keys:
+            columns = [self.columns[self._index(key)] for key in keys]
+        else:
+            columns = self.columns
+
+        if not columns:
+            return iter([()] * len(self))
+
+        return izip(*columns)
+
+    def dicts(self):
+        """Returns an iterator of the rows, as the dicts step.hashes has"""
+        for row in izip(*self.columns):
+            yield dict((key, value) for key, value in izip(self.keys, row)
+                       if value is not None)
+
+    def solved(self, step, placeholder, value):
+        """Returns a copy of this table, for the given step, with the
+        placeholder replaced by the value within each cell"""
+        columns = [[cell if cell is None else cell.replace(placeholder, value)
+                    for cell in column] for column in self.columns]
+        return Table(step, self.keys, columns)
+
 class Language(object):
     code = 'en'
     name = 'English'
@@ -140,11 +215,14 @@ class StepDescription(object):
 
 class ScenarioDescription(object):
     """A simple object that holds filename and line number of a scenario
-    description (scenario within feature file)"""
+    description (scenario within feature file). The line is looked up
+    within the feature's string, unless it is given"""
 
-    def __init__(self, scenario, filename, string, language):
+    def __init__(self, scenario, filename, string, language, line=None):
         self.file = fs.relpath(filename)
-        self.line = None
+        self.line = line
+        if line is not None:
+            return
 
         for pline, part in enumerate(string.splitlines()):
             part = part.strip()
@@ -154,12 +232,18 @@ class ScenarioDescription(object):
 
 class FeatureDescription(object):
     """A simple object that holds filename and line number of a feature
-    description"""
+    description. The lines are looked up within the feature's string,
+    unless they are given"""
 
-    def __init__(self, feature, filename, string, language):
-        lines = [l.strip() for l in string.splitlines()]
+    def __init__(self, feature, filename, string, language, line=None,
+                 description_at=None):
         self.file = fs.relpath(filename)
-        self.line = None
+        self.line = line
+        if line is not None:
+            self.description_at = tuple(description_at or ())
+            return
+
+        lines = [l.strip() for l in string.splitlines()]
         described_at = []
         description_lines = strings.get_stripped_lines(feature.description)
         for pline, part in enumerate(lines):
@@ -185,6 +269,11 @@ class Step(object):
     passed = None
     failed = None
     related_outline = None
+    duration = None
+    hooks_duration = 0.0
+    # the table, as represent_hashes() gives it
+    _represented_hashes = None
+    _max_length = None
 
     def __init__(self, sentence, remaining_lines, line=None, filename=None,
                  tags=None):
@@ -193,15 +282,31 @@ class Step(object):
         self.tags = tags or []
         self.original_sentence = sentence
         self._remaining_lines = remaining_lines
-        keys, hashes, self.multiline = self._parse_remaining_lines(remaining_lines)
+        keys, columns, self.multiline = self._parse_remaining_lines(remaining_lines)
 
         self.keys = tuple(keys)
-        self.hashes = HashList(self, hashes)
+        self.table = Table(self, keys, columns)
+        self._hashes = None
         self.described_at = StepDescription(line, filename)
 
         self.proposed_method_name, self.proposed_sentence = self.propose_definition()
         self.run_controller = None
 
+    @property
+    def hashes(self):
+        """The rows of the table of this step, as dicts, built out of
+        step.table once first asked for"""
+        if self._hashes is None:
+            self._hashes = HashList(self, self.table.dicts())
+
+        return self._hashes
+
+    @hashes.setter
+    def hashes(self, hashes):
+        self._hashes = HashList(self, hashes)
+        self.table = Table.from_hashes(self, self.keys, self._hashes)
+        self.forget_layout()
+
     def propose_definition(self):
 
         sentence = unicode(self.original_sentence)
@@ -239,24 +344,25 @@ class Step(object):
         return method_name, sentence
 
     def solve_and_clone(self, data):
+        """Returns a copy of this step with the placeholders of the
+        given outline row solved. The copy is shallow: it shares
+        everything but the sentence and the table with this step"""
+        new = copy(self)
         sentence = self.sentence
-        hashes = self.hashes[:]  # deep copy
+        table = Table(new, self.keys, self.table.columns)
         for k, v in data.items():
-            def evaluate(stuff):
-                return stuff.replace(u'<%s>' % unicode(k), unicode(v))
-
-            def evaluate_hash_value(hash_row):
-                new_row = {}
-                for rkey, rvalue in hash_row.items():
-                    new_row[rkey] = evaluate(rvalue)
-                return new_row
-
-            sentence = evaluate(sentence)
-            hashes = map(evaluate_hash_value, hashes)
+            placeholder, value = u'<%s>' % unicode(k), unicode(v)
+            sentence = sentence.replace(placeholder, value)
+            table = table.solved(new, placeholder, value)
 
-        new = deepcopy(self)
         new.sentence = sentence
-        new.hashes = hashes
+        new.table = table
+        new._hashes = None
+        new._represented_hashes = None
+        new._max_length = None
+        if self.defined_at:
+            new.defined_at = StepDefinition(new, self.defined_at.function)
+
         return new
 
     def _calc_list_length(self, lst):
@@ -275,13 +381,28 @@ class Step(object):
     def _calc_value_length(self, data):
         return self._calc_list_length(data.values())
 
+    def forget_layout(self):
+        """Drops the lengths computed out of this step, and out of its
+        scenario and feature, once it changed"""
+        self._max_length = None
+        self._represented_hashes = None
+        scenario = getattr(self, 'scenario', None)
+        if isinstance(scenario, Scenario):
+            scenario.forget_layout()
+
     @property
     def max_length(self):
+        if self._max_length is None:
+            self._max_length = self._measure()
+
+        return self._max_length
+
+    def _measure(self):
         max_length_sentence = len(self.sentence) + self.indentation
         max_length_original = len(self.original_sentence) + self.indentation
 
         max_length = max([max_length_original, max_length_sentence])
-        for data in self.hashes:
+        for data in self.table.dicts():
             key_size = self._calc_key_length(data)
             if key_size > max_length:
                 max_length = key_size
@@ -300,24 +421,27 @@ class Step(object):
         return strings.rfill(head, self.scenario.feature.max_length + 1, append=u'# %s:%d\n' % (where.file, where.line))
 
     def represent_hashes(self):
-        lines = strings.dicts_to_string(self.hashes, self.keys).splitlines()
-        return u"\n".join([(u" " * self.table_indentation) + line for line in lines]) + "\n"
+        if self._represented_hashes is None:
+            columns = [self.table.column(key) for key in self.keys]
+            indentation = u" " * self.table_indentation
+            self._represented_hashes = u"".join(
+                [u"%s%s\n" % (indentation, line)
+                 for line in strings.columns_to_lines(self.keys, columns)])
+
+        return self._represented_hashes
 
     def __repr__(self):
         return u'<Step: "%s">' % self.sentence
 
     def _parse_remaining_lines(self, lines):
         multiline = strings.parse_multiline(lines)
-        keys, hashes = strings.parse_hashes(lines)
-        return keys, hashes, multiline
+        keys, columns = strings.parse_columns(lines)
+        return keys, columns, multiline
 
     def _get_match(self, ignore_case):
-        matched, func = None, lambda: None
-
-        for regex, func in STEP_REGISTRY.items():
-            matched = re.search(regex, self.sentence, ignore_case and re.I or 0)
-            if matched:
-                break
+        matched, func = STEP_INDEX.match(self.sentence, ignore_case)
+        if not matched:
+            func = lambda: None
 
         return matched, StepDefinition(self, func)
 
@@ -385,11 +509,15 @@ class Step(object):
         self.ran = True
         kw = matched.groupdict()
 
-        if kw:
-            step_definition(**kw)
-        else:
-            groups = matched.groups()
-            step_definition(*groups)
+        started = clock()
+        try:
+            if kw:
+                step_definition(**kw)
+            else:
+                groups = matched.groups()
+                step_definition(*groups)
+        finally:
+            self.duration = clock() - started
 
         self.passed = True
         return True
@@ -422,7 +550,7 @@ class Step(object):
                 step.pre_run(ignore_case, with_outline=outline)
 
                 if run_callbacks:
-                    call_hook('before_each', 'step', step)
+                    step.hooks_duration = call_hook('before_each', 'step', step)
 
                 if not steps_failed and not steps_undefined and (step.run_controller == None or step.run_controller.is_to_run_step(step)):
                     step.run(ignore_case)
@@ -442,7 +570,7 @@ class Step(object):
             finally:
                 all_steps.append(step)
                 if run_callbacks:
-                    call_hook('after_each', 'step', step)
+                    step.hooks_duration += call_hook('after_each', 'step', step)
 
         return (all_steps, steps_passed, steps_failed, steps_undefined, reasons_to_fail)
 
@@ -507,16 +635,22 @@ class PrevResultPersister(object):
         self.id_filename = id_filename
         
     def read_previous_results(self):
-        # Load up file which has list of all failed tests in it, if file is not there or empty then run all tests again
-        f = open(self.id_filename, "r")   # Dont use with syntax as stops older versions of python from working
+        # Load up file which has the ScenarioResultSummary of every scenario that ran before, if file is not there or broken then run all tests again
+        if not self.id_filename:
+            return {}
         try:
-            return pickle.load(f)
-        finally:
-            f.close()
-        return None
+            f = open(self.id_filename, "r")   # Dont use with syntax as stops older versions of python from working
+            try:
+                return pickle.load(f)
+            finally:
+                f.close()
+        except Exception:
+            return {}
         
     def write_results(self, results):
         # Write status map to file
+        if not self.id_filename:
+            return
         f = open(self.id_filename, "w")   # Dont use with syntax as stops older versions of python from working
         try:
             pickle.dump(results, f)
@@ -524,8 +658,17 @@ class PrevResultPersister(object):
             f.close()
         
 class RunController(object):
-    def __init__(self, prev_result_persister=None, only_run_failed=False, only_syntax_check=False, tags_to_run=None):
-        self.scenario_id_counter = 0
+    def __init__(self, prev_result_persister=None, only_run_failed=False, only_syntax_check=False, tags_to_run=None,
+                 changed_files=None, dependency_persister=None, max_failures=None):
+        self.max_failures = max_failures
+        self.failures = 0
+        # a multiprocessing.Value, while worker processes share the count
+        self.shared_failures = None
+        self.changed_files = changed_files
+        self.dependency_persister = dependency_persister
+        self.dependencies = {}
+        if dependency_persister:
+            self.dependencies = dependency_persister.read_dependencies()
         self.only_run_failed = only_run_failed
         self.only_syntax_check = only_syntax_check
         self.prev_result_persister = prev_result_persister
@@ -535,28 +678,55 @@ class RunController(object):
                 self.tags_to_run.append(t.replace("@",""))
         if only_run_failed:
             assert prev_result_persister!=None, "Must have persister if running only failed"
-            self.previous_results = prev_result_persister.read_previous_results()
-        else:
-            self.previous_results = None
-
-    def get_next_scenario_id(self):
-        self.scenario_id_counter += 1
-        return self.scenario_id_counter
+        self.previous_results = {}
+        if prev_result_persister:
+            self.previous_results = prev_result_persister.read_previous_results() or {}
 
     def is_to_run_step(self, step):
         if self.only_syntax_check:
             return False
         return True
 
-    def is_to_run_scenario(self, scenario, scenario_id_counter):
+    def add_failure(self):
+        if self.shared_failures is None:
+            self.failures += 1
+        else:
+            lock = self.shared_failures.get_lock()
+            lock.acquire()
+            try:
+                self.shared_failures.value += 1
+            finally:
+                lock.release()
+
+    def scenario_finished(self, scenario_result):
+        if not scenario_result.not_run and not scenario_result.passed:
+            self.add_failure()
+
+    def should_stop(self):
+        """Tells whether so many scenarios have failed that no more of
+        them should run"""
+        if not self.max_failures:
+            return False
+
+        failures = self.failures
+        if self.shared_failures is not None:
+            failures = self.shared_failures.value
+
+        return failures >= self.max_failures
+
+    def is_to_run_scenario(self, scenario, scenario_id):
+        if self.should_stop():
+            return False
         if self.only_run_failed:
-            if self.previous_results != None and scenario_id_counter in self.previous_results:
-                prev_scenario_result_summary = self.previous_results[scenario_id_counter]
+            if scenario_id in self.previous_results:
+                prev_scenario_result_summary = self.previous_results[scenario_id]
                 if ScenarioResultSummary.FAILED != prev_scenario_result_summary.status:
                     print "Skipping"
                     return False
                 else:
-                    print "Previously step "+str(scenario_id_counter)+" failed, so re-running"
+                    print "Previously scenario \""+scenario.name.encode('utf-8')+"\" failed, so re-running"
+        if self.changed_files is not None and not self.is_affected(scenario):
+            return False
         # Check tags
         if len(self.tags_to_run) > 0:
             for check_tags in self.tags_to_run:
@@ -573,20 +743,52 @@ class RunController(object):
             return False
         return True
 
+    def is_affected(self, scenario):
+        """Tells whether the given scenario depends on any of the changed
+        files. Scenarios never ran before are always affected, and so are
+        those with undefined steps once any python module changed."""
+        key = scenario.identity()
+        if scenario.with_file and scenario.with_file in self.changed_files:
+            return True
+
+        if key not in self.dependencies:
+            return True
+
+        dependencies = self.dependencies[key]
+        if changes.UNDEFINED_STEPS in dependencies:
+            if self.changed_files.has_changed_modules():
+                return True
+
+        return any([name in self.changed_files for name in dependencies
+                    if name != changes.UNDEFINED_STEPS])
+
+    def record_dependencies(self, totals):
+        found = {}
+        for feature_result in totals.feature_results:
+            for scenario_result in feature_result.scenario_results:
+                if scenario_result.not_run:
+                    continue
+
+                key = scenario_result.scenario.identity()
+                modules = changes.used_modules(scenario_result)
+                found[key] = found.get(key, set()) | modules
+
+        self.dependencies.update(found)
+        self.dependency_persister.write_dependencies(self.dependencies)
+
     def finished(self, totals):
-        if not self.prev_result_persister:
+        if self.dependency_persister and not self.only_syntax_check:
+            self.record_dependencies(totals)
+
+        if not self.prev_result_persister or self.only_syntax_check:
             return
-        # Make a map of id->ScenarioResultSummary
-        results = {}
+        # Make a map of id->ScenarioResultSummary, keeping those of the
+        # scenarios that did not take part in this run (e.g. other shards)
+        results = dict(self.previous_results)
         for feature_result in totals.feature_results:
             for scenario_result in feature_result.scenario_results:
-                status = ScenarioResultSummary.PASSED
-                if scenario_result.not_run:
-                    status = ScenarioResultSummary.NOT_RUN
-                elif not scenario_result.passed:
-                    status = ScenarioResultSummary.FAILED
-                # In future we could add status of skipped or other, for tags
-                results[scenario_result.id] = ScenarioResultSummary(scenario_result.id, status)
+                previous = self.previous_results.get(scenario_result.id)
+                results[scenario_result.id] = ScenarioResultSummary.from_result(scenario_result, previous)
         self.prev_result_persister.write_results(results)
 
 class Scenario(object):
@@ -594,8 +796,11 @@ class Scenario(object):
     described_at = None
     indentation = 2
     table_indentation = indentation + 2
+    _examples_lines = None
+    _max_length = None
     def __init__(self, name, remaining_lines, keys, outlines, with_file=None,
-                 original_string=None, language=None, tags=None):
+                 original_string=None, language=None, tags=None, steps=None,
+                 described_at=None):
 
         if not language:
             language = language()
@@ -603,26 +808,43 @@ class Scenario(object):
         self.name = name
         self.tags = tags or []
         self.language = language
-        self.steps = self._parse_remaining_lines(remaining_lines,
-                                                 with_file,
-                                                 original_string)
+        if steps is None:
+            steps = self._parse_remaining_lines(remaining_lines,
+                                                with_file,
+                                                original_string)
+        self.steps = steps
         self.keys = keys
         self.outlines = outlines
         self.with_file = with_file
         self.original_string = original_string
 
-        if with_file and original_string:
+        if described_at:
+            self._set_definition(described_at)
+        elif with_file and original_string:
             scenario_definition = ScenarioDescription(self, with_file,
                                                       original_string,
                                                       language)
             self._set_definition(scenario_definition)
 
-        self.solved_steps = list(self._resolve_steps(self.steps, self.outlines,
-                                                     with_file, original_string))
         self._add_myself_to_steps()
 
+    def forget_layout(self):
+        """Drops the lengths computed out of this scenario, and out of
+        its feature, once it changed"""
+        self._max_length = None
+        self._examples_lines = None
+        feature = getattr(self, 'feature', None)
+        if isinstance(feature, Feature):
+            feature.forget_layout()
+
     @property
     def max_length(self):
+        if self._max_length is None:
+            self._max_length = self._measure()
+
+        return self._max_length
+
+    def _measure(self):
         if self.outlines:
             prefix = self.language.first_of_scenario_outline + ":"
         else:
@@ -688,16 +910,36 @@ class Scenario(object):
     def failed(self):
         return any([step.failed for step in self.steps])
 
+    def identity(self, outline=None):
+        """Identifies this scenario, or one row of its outline, across runs
+        no matter which other scenarios run, nor in which order, nor from
+        which dir: the path of its feature file within its project, its
+        name, which one of the scenarios with that name it is (1-based)
+        and a hash of the outline row"""
+        row = None
+        if outline is not None:
+            row = hashlib.md5(repr(sorted(outline.items()))).hexdigest()
+
+        occurrence = 1
+        feature = getattr(self, 'feature', None)
+        if feature is not None:
+            namesakes = [scenario for scenario in feature.scenarios
+                         if scenario.name == self.name]
+            occurrence = namesakes.index(self) + 1
+
+        filename = self.with_file and fs.project_path(self.with_file) or None
+        return filename, self.name, occurrence, row
+
     def run(self, run_controller, ignore_case):
         """Runs a scenario, running each of its steps. Also call
         before_each and after_each callbacks for steps and scenario"""
 
         results = []
-        call_hook('before_each', 'scenario', self)
+        hooks_before = call_hook('before_each', 'scenario', self)
 
         def run_scenario(almost_self, run_controller, order=-1, outline=None, run_callbacks=False):
+            this_scenario_id = self.identity(outline)
             if run_controller:
-                this_scenario_id = run_controller.get_next_scenario_id()
                 if not run_controller.is_to_run_scenario(self, this_scenario_id):
                     return ScenarioResult(
                         self,
@@ -708,27 +950,33 @@ class Scenario(object):
                         True,
                         this_scenario_id
                         )
-            else:
-                this_scenario_id = -1
 
+            started = clock()
+            hooks_duration = 0.0
             all_steps, steps_passed, steps_failed, steps_undefined, reasons_to_fail = Step.run_all(self.steps, run_controller, outline, run_callbacks, ignore_case)
             skip = lambda x: x not in steps_passed and x not in steps_undefined and x not in steps_failed
 
             steps_skipped = filter(skip, all_steps)
             if outline:
-                call_hook(
+                hooks_duration = call_hook(
                     'outline', 'scenario', self, order, outline, reasons_to_fail
                 )
 
-            return ScenarioResult(
+            result = ScenarioResult(
                 self,
                 steps_passed,
                 steps_failed,
                 steps_skipped,
                 steps_undefined,
                 False,
-                this_scenario_id
+                this_scenario_id,
+                all_steps
             )
+            result.duration = clock() - started
+            result.hooks_duration = hooks_duration
+            if run_controller:
+                run_controller.scenario_finished(result)
+            return result
 
         if self.outlines:
             first = True
@@ -738,21 +986,34 @@ class Scenario(object):
         else:
             results.append(run_scenario(self, run_controller, run_callbacks=True))
 
-        call_hook('after_each', 'scenario', self)
+        hooks_after = call_hook('after_each', 'scenario', self)
+        if results:
+            results[0].hooks_duration += hooks_before
+            results[-1].hooks_duration += hooks_after
+
         return results
 
+    def not_run(self):
+        """Returns a ScenarioResult telling this scenario did not run, for
+        each outline row if it has any"""
+        return [ScenarioResult(self, [], [], [], [], True, self.identity(outline))
+                for outline in self.outlines or [None]]
+
     def _add_myself_to_steps(self):
         for step in self.steps:
             step.scenario = self
 
-        for step in self.solved_steps:
-            step.scenario = self
-
-    def _resolve_steps(self, steps, outlines, with_file, original_string):
-        for outline in outlines:
-            for step in steps:
+    def iter_solved_steps(self):
+        """Yields the steps of each outline row, solved only when they
+        are reached"""
+        for outline in self.outlines:
+            for step in self.steps:
                 yield step.solve_and_clone(outline)
 
+    @property
+    def solved_steps(self):
+        return list(self.iter_solved_steps())
+
     def _parse_remaining_lines(self, lines, with_file, original_string):
         invalid_first_line_error = '\nInvalid step on scenario "%s".\n' \
             'Maybe you killed the first step text of that scenario\n'
@@ -778,8 +1039,18 @@ class Scenario(object):
 
         return strings.rfill(head, self.feature.max_length + 1, append=u'# %s:%d\n' % (self.described_at.file, self.described_at.line))
 
+    def examples_lines(self):
+        """Returns the lines of the examples table, its head first,
+        rendered once"""
+        if self._examples_lines is None:
+            columns = [[outline.get(key, u'') for outline in self.outlines]
+                       for key in self.keys]
+            self._examples_lines = list(strings.columns_to_lines(self.keys, columns))
+
+        return self._examples_lines
+
     def represent_examples(self):
-        lines = strings.dicts_to_string(self.outlines, self.keys).splitlines()
+        lines = self.examples_lines()
         return "\n".join([(u" " * self.table_indentation) + line for line in lines]) + '\n'
 
     @classmethod
@@ -822,11 +1093,28 @@ class Scenario(object):
 
         return scenario
 
+class Layout(object):
+    """The lengths a feature is printed along: each line is padded up
+    to `width` columns, where the comment telling where it comes from
+    starts, `max_length` being the length of its longest line. The
+    output plugins share the one of each feature (see Feature.layout)
+    """
+    def __init__(self, max_length):
+        self.max_length = max_length
+        self.width = max_length + 1
+
 class Feature(object):
     """ Object that represents a feature."""
     described_at = None
+    parse_duration = None
+    _layout = None
+
+    # either "single-pass" (lettuce.parser) or "regex"
+    parser = 'single-pass'
+
     def __init__(self, name, remaining_lines, with_file, original_string,
-                 language=None, tags=None):
+                 language=None, tags=None, scenarios=None, description=None,
+                 described_at=None):
 
         if not language:
             language = language()
@@ -835,15 +1123,20 @@ class Feature(object):
         self.tags = tags or []
         self.language = language
 
-        self.scenarios, self.description = self._parse_remaining_lines(
-            remaining_lines,
-            original_string,
-            with_file
-        )
+        if scenarios is None:
+            scenarios, description = self._parse_remaining_lines(
+                remaining_lines,
+                original_string,
+                with_file
+            )
+
+        self.scenarios, self.description = scenarios, description
 
         self.original_string = original_string
 
-        if with_file:
+        if described_at:
+            self._set_definition(described_at)
+        elif with_file:
             feature_definition = FeatureDescription(self,
                                                     with_file,
                                                     original_string,
@@ -852,8 +1145,23 @@ class Feature(object):
 
         self._add_myself_to_scenarios()
 
+    @property
+    def layout(self):
+        """The Layout this feature is printed with, computed once"""
+        if self._layout is None:
+            self._layout = Layout(self._measure())
+
+        return self._layout
+
+    def forget_layout(self):
+        """Drops the layout of this feature, once it changed"""
+        self._layout = None
+
     @property
     def max_length(self):
+        return self.layout.max_length
+
+    def _measure(self):
         max_length = len(u"%s: %s" % (self.language.first_of_feature, self.name))
         for line in self.description.splitlines():
             length = len(line.strip()) + Scenario.indentation
@@ -877,7 +1185,7 @@ class Feature(object):
         return u"%s: %s" % (self.language.first_of_feature, self.name)
 
     def represented(self):
-        length = self.max_length + 1
+        length = self.layout.width
 
         filename = self.described_at.file
         line = self.described_at.line
@@ -888,8 +1196,22 @@ class Feature(object):
         return head
 
     @classmethod
-    def from_string(new_feature, string, with_file=None, language=None):
-        """Creates a new feature from string"""
+    def from_string(new_feature, string, with_file=None, language=None,
+                    parser=None):
+        """Creates a new feature from string, with the given parser,
+        either "single-pass" or "regex", or else Feature.parser"""
+        if not language:
+            language = Language()
+
+        if (parser or new_feature.parser) == 'regex':
+            return new_feature.from_string_with_regexes(string, with_file, language)
+
+        from lettuce.parser import Parser
+        return Parser(new_feature, Scenario, Step).parse(string, with_file, language)
+
+    @classmethod
+    def from_string_with_regexes(new_feature, string, with_file=None, language=None):
+        """Creates a new feature from string, splitting it with regexes"""
         lines = strings.get_stripped_lines(string, ignore_lines_starting_with='#')
         tags = []
         if not language:
@@ -928,13 +1250,28 @@ class Feature(object):
         return feature
 
     @classmethod
-    def from_file(new_feature, filename):
-        """Creates a new feature from filename"""
+    def from_file(new_feature, filename, cache=None, parser=None):
+        """Creates a new feature from filename, with the given parser
+        (see from_string). If a FeatureCache is given, tries to take the
+        feature from there before parsing"""
+        started = clock()
+        parser = parser or new_feature.parser
+        feature = cache and cache.load(filename, parser)
+        if feature:
+            feature.parse_duration = clock() - started
+            return feature
+
         f = codecs.open(filename, "r", "utf-8")
         string = f.read()
         f.close()
         language = Language.guess_from_string(string)
-        feature = new_feature.from_string(string, with_file=filename, language=language)
+        feature = new_feature.from_string(string, with_file=filename,
+                                          language=language, parser=parser)
+        parse_duration = clock() - started
+        if cache:
+            cache.store(filename, string, feature, parser)
+
+        feature.parse_duration = parse_duration
         return feature
 
     def _set_definition(self, definition):
@@ -985,41 +1322,90 @@ class Feature(object):
             scenarios.append(Scenario.from_string(s, scenario_tags, **kw))
         return scenarios, description
 
-    def run(self, run_controller=None, scenarios=None, ignore_case=True):
-        call_hook('before_each', 'feature', self)
-        scenarios_ran = []
-
+    def select_scenarios(self, scenarios=None):
+        """Returns the scenarios at the given 1-based positions, or all of
+        them"""
+        scenarios_to_run = None
         if isinstance(scenarios, (tuple, list)):
             if all(map(lambda x: isinstance(x, int), scenarios)):
                 scenarios_to_run = scenarios
         else:
             scenarios_to_run = range(1, len(self.scenarios) + 1)
 
+        selected = []
         for index, scenario in enumerate(self.scenarios):
             if scenarios_to_run and (index + 1) not in scenarios_to_run:
                 continue
 
-            scenarios_ran.extend(scenario.run(run_controller, ignore_case))
+            selected.append(scenario)
+
+        return selected
+
+    def not_run(self, scenarios=None):
+        """Returns a FeatureResult telling the scenarios at the given
+        1-based positions (or all of them) did not run"""
+        results = []
+        for scenario in self.select_scenarios(scenarios):
+            results.extend(scenario.not_run())
+
+        return FeatureResult(self, *results)
+
+    def run(self, run_controller=None, scenarios=None, ignore_case=True, ordering=None):
+        """Runs the scenarios of this feature (only those at the given
+        1-based positions, if any), in the order the given ordering from
+        lettuce.ordering tells, or in file order"""
+        started = clock()
+        hooks_duration = call_hook('before_each', 'feature', self)
+        scenarios_ran = []
 
-        call_hook('after_each', 'feature', self)
-        return FeatureResult(self, *scenarios_ran)
+        selected = self.select_scenarios(scenarios)
+        if ordering:
+            selected = ordering.sort_scenarios(selected)
+
+        for scenario in selected:
+            if run_controller and run_controller.should_stop():
+                scenarios_ran.extend(scenario.not_run())
+            else:
+                scenarios_ran.extend(scenario.run(run_controller, ignore_case))
+
+        hooks_duration += call_hook('after_each', 'feature', self)
+        result = FeatureResult(self, *scenarios_ran)
+        result.duration = clock() - started
+        result.hooks_duration = hooks_duration
+        return result
 
 class FeatureResult(object):
     """Object that holds results of each scenario ran from within a feature"""
+    duration = None
+    hooks_duration = 0.0
+
     def __init__(self, feature, *scenario_results):
         self.feature = feature
         self.scenario_results = scenario_results
 
+    @property
+    def parse_duration(self):
+        return self.feature.parse_duration
+
     @property
     def passed(self):
         return all([result.passed for result in self.scenario_results])
 
+    @property
+    def not_run(self):
+        return bool(self.scenario_results) and \
+            all([result.not_run for result in self.scenario_results])
+
 class ScenarioResult(object):
     """Object that holds results of each step ran from within a scenario"""
+    duration = None
+    hooks_duration = 0.0
+
     def __init__(self, scenario, steps_passed, steps_failed, steps_skipped,
-                 steps_undefined, not_run, scenario_id):
+                 steps_undefined, not_run, scenario_id, all_steps=None):
 
         self.scenario = scenario
+        self.all_steps = all_steps or []
 
         self.steps_passed = steps_passed
         self.steps_failed = steps_failed
@@ -1040,14 +1426,55 @@ class ScenarioResult(object):
         return len(self.steps_failed) > 0
 
 class ScenarioResultSummary(object):
+    """What was persisted about a scenario: its status on the last run,
+    how long it took (and how many steps it had) the last time it ran and
+    how many of the runs so far it failed"""
     PASSED=1
     FAILED=2
     NOT_RUN=3
-    def __init__(self, scenario_id, status):
+    duration = None
+    steps = None
+    runs = 0
+    failures = 0
+    def __init__(self, scenario_id, status, duration=None, runs=0, failures=0, steps=None):
         self.id = scenario_id
         self.status = status
+        self.duration = duration
+        self.runs = runs
+        self.failures = failures
+        self.steps = steps
+
+    @classmethod
+    def from_result(cls, scenario_result, previous=None):
+        """Summarizes the given ScenarioResult, carrying over the history
+        of the previous summary of the same scenario"""
+        duration = previous and previous.duration
+        steps = previous and previous.steps
+        runs = previous and previous.runs or 0
+        failures = previous and previous.failures or 0
+
+        status = cls.PASSED
+        if scenario_result.not_run:
+            status = cls.NOT_RUN
+            # a failure stays one until the scenario runs again
+            if previous and previous.status == cls.FAILED:
+                status = cls.FAILED
+        elif not scenario_result.passed:
+            status = cls.FAILED
+        # In future we could add status of skipped or other, for tags
+
+        if not scenario_result.not_run:
+            duration = scenario_result.duration
+            steps = scenario_result.total_steps
+            runs += 1
+            if status == cls.FAILED:
+                failures += 1
+
+        return cls(scenario_result.id, status, duration, runs, failures, steps)
 
 class TotalResult(object):
+    load_duration = None
+
     def __init__(self, feature_results, only_syntax_check):
         self.feature_results = feature_results
         self.scenario_results = []
@@ -1088,6 +1515,10 @@ class TotalResult(object):
     def features_passed(self):
         return len([result for result in self.feature_results if result.passed])
 
+    @property
+    def features_not_run(self):
+        return len([result for result in self.feature_results if result.not_run])
+
     @property
     def scenarios_not_run(self):
         return len([result for result in self.scenario_results if result.not_run])
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""A long lived lettuce: `lettuce serve` and `lettuce client`
+
+`lettuce serve` imports terrain and the step definitions once, and then
+waits for runs on a unix socket. `lettuce client` sends it the usual
+command line, and gets back what lettuce would have printed along with
+its exit status.
+
+Each request is a line of JSON, with the arguments, the current dir and
+the size of the terminal of the client. The daemon answers with frames,
+each made of a kind ('o' for stdout, 'e' for stderr or 'x' for the exit
+status), the length of the payload as 4 bytes (big endian), and the
+payload itself.
+
+Before each run, the step modules that changed since the previous one
+are imported again (see watch.Watcher). Runs are served one at a time.
+"""
+import os
+import sys
+import json
+import glob
+import socket
+import struct
+import traceback
+
+from lettuce import console
+from lettuce import terminal
+from lettuce.watch import Watcher, forget_definitions
+from lettuce.changes import source_file
+
+DEFAULT_SOCKET = '.lettuce.sock'
+
+def write_frame(connection, kind, payload):
+    if isinstance(payload, unicode):
+        payload = payload.encode('utf-8')
+
+    connection.sendall(kind + struct.pack('>I', len(payload)) + payload)
+
+def _read_exactly(connection, size):
+    data = ''
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+
+    return data
+
+def read_frame(connection):
+    """Returns the kind and the payload of the next frame, or (None,
+    None) once the connection is closed"""
+    header = _read_exactly(connection, 5)
+    if header is None:
+        return None, None
+
+    size = struct.unpack('>I', header[1:])[0]
+    return header[0], _read_exactly(connection, size) or ''
+
+class FrameWriter(object):
+    """File-like object that sends whatever is written to it as frames
+    of the given kind"""
+    def __init__(self, connection, kind):
+        self.connection = connection
+        self.kind = kind
+
+    def write(self, data):
+        if data:
+            write_frame(self.connection, self.kind, data)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+def forget_output_plugins():
+    """Removes the callbacks the output plugins of the previous run
+    have registered, so that the next run has its own ones only"""
+    from lettuce import plugins
+    plugins_dir = os.path.dirname(source_file(plugins.__file__))
+    forget_definitions(set(glob.glob(os.path.join(plugins_dir, '*.py'))))
+
+class Daemon(object):
+    """Serves runs of the features under `base_path`, building a Runner
+    for each request out of its arguments with `create_runner(args,
+    base_path)` (see lettuce_cli)"""
+    def __init__(self, base_path, socket_path=DEFAULT_SOCKET, create_runner=None):
+        self.base_path = os.path.abspath(base_path)
+        self.socket_path = os.path.abspath(socket_path)
+        self.create_runner = create_runner
+        self.watcher = None
+
+    def start(self):
+        """Loads the step definitions under the served path, once"""
+        runner = self.create_runner([], self.base_path)
+        forget_output_plugins()
+        runner.loader.find_and_load_step_definitions()
+        self.watcher = Watcher(runner)
+        self.watcher.mtimes = self.watcher.snapshot()
+
+    def is_served(self, runner):
+        base_dir = source_file(runner.loader.base_dir)
+        served = source_file(self.base_path)
+        return base_dir == served or base_dir.startswith(served + os.sep)
+
+    def run(self, args):
+        """Runs lettuce with the given command line arguments, returning
+        its exit status"""
+        runner = self.create_runner(args, self.base_path)
+        if isinstance(runner, Watcher):
+            sys.stderr.write("lettuce serve can't watch for changes, "
+                             "run lettuce --watch instead\n")
+            return 2
+
+        modules = [filename for filename in self.watcher.changes()
+                   if filename.endswith('.py')]
+        if modules:
+            self.watcher.reload(modules)
+
+        if not self.is_served(runner):
+            # its step definitions have to be loaded as usual
+            result = runner.run()
+        elif runner.single_feature:
+            result = runner.run([runner.single_feature])
+        else:
+            result = runner.run(runner.loader.find_feature_files())
+
+        if not result or result.steps != result.steps_passed:
+            return 1
+
+        return 0
+
+    def handle(self, connection):
+        request = ''
+        while not request.endswith('\n'):
+            chunk = connection.recv(4096)
+            if not chunk:
+                return
+            request += chunk
+
+        request = json.loads(request)
+        old_cwd = os.getcwd()
+        old_streams = sys.stdout, sys.stderr
+        old_environ = dict(os.environ)
+        sys.stdout = FrameWriter(connection, 'o')
+        sys.stderr = FrameWriter(connection, 'e')
+        try:
+            os.chdir(request['cwd'])
+            if request.get('size'):
+                columns, lines = request['size']
+                os.environ['COLUMNS'], os.environ['LINES'] = str(columns), str(lines)
+            try:
+                status = self.run(request['args'])
+            except SystemExit, e:
+                status = e.code
+            except Exception:
+                traceback.print_exc()
+                status = 2
+        finally:
+            console.flush()
+            forget_output_plugins()
+            sys.stdout, sys.stderr = old_streams
+            os.environ.clear()
+            os.environ.update(old_environ)
+            os.chdir(old_cwd)
+
+        write_frame(connection, 'x', str(status or 0))
+
+    def serve_forever(self):
+        self.start()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen(5)
+        print "(lettuce serving %s on %s, press Ctrl-C to stop)" % (
+            self.base_path, self.socket_path)
+        try:
+            while True:
+                connection, address = server.accept()
+                try:
+                    self.handle(connection)
+                except socket.error:
+                    # the client went away
+                    pass
+                finally:
+                    connection.close()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            os.remove(self.socket_path)
+
+def send_request(connection, args):
+    try:
+        size = terminal.get_size()
+    except Exception:
+        # not within a terminal
+        size = None
+
+    connection.sendall(json.dumps({
+        'args': args,
+        'cwd': os.getcwd(),
+        'size': size,
+    }) + '\n')
+
+def read_response(connection, stdout=None, stderr=None):
+    """Writes out what the daemon prints, and returns its exit status"""
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    while True:
+        kind, payload = read_frame(connection)
+        if kind == 'o':
+            stdout.write(payload)
+        elif kind == 'e':
+            stderr.write(payload)
+        elif kind == 'x':
+            return int(payload)
+        else:
+            stderr.write("lettuce serve went away\n")
+            return 2
+
+def request(args, socket_path=DEFAULT_SOCKET):
+    """Has the daemon listening on `socket_path` run lettuce with the
+    given arguments, writing out what it prints, and returns its exit
+    status"""
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(socket_path)
+    except socket.error, e:
+        sys.stderr.write("Could not reach lettuce serve on %s: %s\n" % (socket_path, e))
+        return 2
+
+    try:
+        send_request(connection, args)
+        return read_response(connection)
+    finally:
+        connection.close()
@@ -15,7 +15,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import re
-from lettuce.core import STEP_REGISTRY
+from lettuce.registry import STEP_REGISTRY
 from lettuce.exceptions import StepLoadingError
 
 def step(regex):
@@ -24,6 +24,7 @@ from django.test.utils import teardown_test_environment
 
 from lettuce import Runner
 from lettuce import registry
+from lettuce.sharding import parse_shard, shard_filename, suffixed_filename
 
 from lettuce.django import server
 from lettuce.django import harvest_lettuces
@@ -58,6 +59,33 @@ class Command(BaseCommand):
 
         make_option('--xunit-file', action='store', dest='xunit_file', default=None,
             help='Write JUnit XML to this file. Defaults to lettucetests.xml'),
+
+        make_option('--xunit-testcases', action='store', dest='xunit_testcases', default='step',
+            type='choice', choices=['step', 'scenario'],
+            help='What each JUnit XML testcase is, either a step (default) or a scenario'),
+
+        make_option('--xunit-suite-per-feature', action='store_true', dest='xunit_suite_per_feature', default=False,
+            help='Group JUnit XML testcases within a testsuite per feature'),
+
+        make_option('--with-hotspots', action='store_true', dest='enable_hotspots', default=False,
+            help='Output how long each step definition took, altogether, to a JSON file'),
+
+        make_option('--hotspots-file', action='store', dest='hotspots_file', default=None,
+            help='Write the step definition hotspots to this file. Defaults to lettucehotspots.json'),
+
+        make_option('--with-results', action='store_true', dest='enable_results', default=False,
+            help='Output the results of every scenario and step to a JSON file, that lettuce merge-results reads'),
+
+        make_option('--results-file', action='store', dest='results_file', default=None,
+            help='Write the results to this file. Defaults to lettuceresults.json'),
+
+        make_option('--shard', action='store', dest='shard', default=None,
+            help='Run only the K-th out of N shards of about the same duration, given as K/N. '
+                 'Each shard writes its results, and JUnit XML, to files of its own (e.g. lettuceresults-K.json)'),
+
+        make_option('--shard-history', action='store', dest='shard_history', default=None,
+            help='Split shards by the durations within this .lettuceids file, that every shard has to be given, '
+                 'rather than by step counts. It is only read'),
     )
     def stopserver(self, failed=False):
         raise SystemExit(int(failed))
@@ -85,6 +113,27 @@ class Command(BaseCommand):
         apps_to_avoid = tuple(options.get('avoid_apps', '').split(","))
         run_server = not options.get('no_server', False)
 
+        shard = None
+        shard_history = options.get('shard_history')
+        enable_results = options.get('enable_results')
+        xunit_file = options.get('xunit_file') or "lettucetests.xml"
+        results_file = options.get('results_file') or "lettuceresults.json"
+        hotspots_file = options.get('hotspots_file') or "lettucehotspots.json"
+        if options.get('shard'):
+            try:
+                shard = parse_shard(options['shard'])
+            except ValueError, e:
+                sys.stderr.write("%s\n" % e)
+                sys.exit(1)
+
+            if shard_history and not os.path.exists(shard_history):
+                sys.stderr.write("There is no shard history file %s\n" % shard_history)
+                sys.exit(1)
+
+            enable_results = True
+            xunit_file = options.get('xunit_file') or shard_filename(xunit_file, shard)
+            results_file = options.get('results_file') or shard_filename(results_file, shard)
+
         paths = self.get_paths(args, apps_to_run, apps_to_avoid)
         if run_server:
             server.start()
@@ -105,9 +154,24 @@ class Command(BaseCommand):
                 if app_module is not None:
                     registry.call_hook('before_each', 'app', app_module)
 
+                # or each app would write over the files of the previous one
+                app_filename = lambda filename: filename
+                if len(paths) > 1:
+                    name = app_module and app_module.__name__ or \
+                        os.path.basename(os.path.normpath(path))
+                    app_filename = lambda filename: suffixed_filename(filename, name)
+
                 runner = Runner(path, options.get('scenarios'), verbosity,
                                 enable_xunit=options.get('enable_xunit'),
-                                xunit_filename=options.get('xunit_file'))
+                                xunit_filename=app_filename(xunit_file),
+                                xunit_testcases=options.get('xunit_testcases', 'step'),
+                                xunit_suite_per_feature=options.get('xunit_suite_per_feature'),
+                                enable_hotspots=options.get('enable_hotspots'),
+                                hotspots_filename=app_filename(hotspots_file),
+                                shard=shard,
+                                shard_history=shard_history,
+                                enable_results=enable_results,
+                                results_filename=app_filename(results_file))
                 result = runner.run()
                 if app_module is not None:
                     registry.call_hook('after_each', 'app', app_module, result)
@@ -48,3 +48,13 @@ class LettuceSyntaxError(SyntaxError):
 class StepLoadingError(Exception):
     """Raised when a step cannot be loaded."""
     pass
+
+class WorkerError(Exception):
+    """Raised when a worker process dies while running a feature. Holds
+    the traceback from within the worker."""
+    pass
+
+class ChangeDetectionError(Exception):
+    """Raised when lettuce cannot tell which files have changed, e.g.
+    because git is not there or does not know the given ref."""
+    pass
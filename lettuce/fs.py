@@ -25,33 +25,94 @@ import zipfile
 from glob import glob
 from os.path import abspath, join, dirname, curdir, exists
 
+from lettuce.registry import STEP_INDEX, STEP_REGISTRY
+
 class FeatureLoader(object):
     """Loader class responsible for findind features and step
-    definitions along a given path on filesystem"""
-    def __init__(self, base_dir):
+    definitions along a given path on filesystem
+
+    Takes a cache.FileListCache, so that the files under base_dir are
+    only listed again when some directory changed, how many threads list
+    directories at once, and a manifest.StepManifest, telling step
+    definitions without importing them."""
+
+    def __init__(self, base_dir, file_cache=None, walk_threads=1,
+                 step_manifest=None):
         self.base_dir = FileSystem.abspath(base_dir)
+        self.file_cache = file_cache
+        self.walk_threads = walk_threads
+        self.step_manifest = step_manifest
+        self.files = None
+
+    def find_files(self):
+        """Lists every file under base_dir, once"""
+        if self.files is None:
+            files = None
+            if self.file_cache:
+                files = self.file_cache.load(self.base_dir)
+
+            if files is None:
+                files, mtimes = FileSystem.scan(self.base_dir, self.walk_threads)
+                if self.file_cache:
+                    self.file_cache.store(self.base_dir, files, mtimes)
+
+            self.files = files
+
+        return self.files
+
+    def locate(self, match):
+        return [filename for filename in self.find_files()
+                if fnmatch.fnmatch(FileSystem.filename(filename), match)]
+
+    def load_step_definitions(self, filename):
+        root = FileSystem.dirname(filename)
+        sys.path.insert(0, root)
+        to_load = FileSystem.filename(filename, with_extension=False)
+        fresh = to_load not in sys.modules
+        try:
+            module = __import__(to_load)
+        except ValueError, e:
+            import traceback
+            err_msg = traceback.format_exc(e)
+            if 'empty module name' in err_msg.lower():
+                return
+            else:
+                raise e
+
+        if not fresh:
+            # it was imported before, maybe from elsewhere, or
+            # changed since then: always take fresh meat :)
+            reload(module)
+        sys.path.remove(root)
 
     def find_and_load_step_definitions(self):
-        files = FileSystem.locate(self.base_dir, '*.py')
+        files = self.locate('*.py')
         for filename in files:
-            root = FileSystem.dirname(filename)
-            sys.path.insert(0, root)
-            to_load = FileSystem.filename(filename, with_extension=False)
-            try:
-                module = __import__(to_load)
-            except ValueError, e:
-                import traceback
-                err_msg = traceback.format_exc(e)
-                if 'empty module name' in err_msg.lower():
-                    continue
-                else:
-                    raise e
+            self.load_step_definitions(filename)
+
+        STEP_INDEX.build()
+
+    def find_and_declare_step_definitions(self, before_importing=None):
+        """Registers the step definitions the step manifest tells of,
+        importing only the modules it can't tell about, after calling
+        `before_importing` once, if given. The steps can then be
+        matched, but not run."""
+        files = self.locate('*.py')
+        for filename in files:
+            declared = self.step_manifest.declare(filename)
+            if declared is None:
+                if before_importing:
+                    before_importing()
+                    before_importing = None
+                self.load_step_definitions(filename)
+            else:
+                STEP_REGISTRY.update(declared)
 
-            reload(module) # always take fresh meat :)
-            sys.path.remove(root)
+        self.step_manifest.save()
+        STEP_INDEX.build()
 
     def find_feature_files(self):
-        paths = FileSystem.locate(self.base_dir, "*.feature")
+        paths = self.locate("*.feature")
         return paths
 
 class FileSystem(object):
@@ -59,6 +120,10 @@ class FileSystem(object):
     lettuce can be well unit-tested :)
     """
     stack = []
+    # what tells the root directory of a project apart
+    project_markers = ('.git', '.hg', '.svn', '.bzr', 'setup.py')
+    # the root of the project holding each directory asked about
+    project_roots = {}
 
     def __init__(self):
         self.stack = []
@@ -66,13 +131,13 @@ class FileSystem(object):
     @classmethod
     def _import(cls, name):
         sys.path.insert(0, cls.current_dir())
-        fp, pathname, description = imp.find_module(name)
+        fp = None
 
         try:
-            module = imp.load_module(name, fp, pathname, description)
-            sys.path.remove(cls.current_dir())
-            return module
+            fp, pathname, description = imp.find_module(name)
+            return imp.load_module(name, fp, pathname, description)
         finally:
+            sys.path.remove(cls.current_dir())
             # Since we may exit via an exception, close fp explicitly.
             if fp:
                 fp.close()
@@ -162,6 +227,38 @@ class FileSystem(object):
         absolute_path = cls.abspath(path)
         return re.sub("^" + re.escape(current_path), '', absolute_path).lstrip("/")
 
+    @classmethod
+    def project_root(cls, directory):
+        '''Returns the closest directory, from the given one up, holding
+        a version control directory or a setup.py, if any.'''
+        if directory not in cls.project_roots:
+            root = None
+            parent = directory
+            while root is None:
+                if [marker for marker in cls.project_markers
+                    if exists(join(parent, marker))]:
+                    root = parent
+                elif dirname(parent) == parent:
+                    break
+
+                parent = dirname(parent)
+
+            cls.project_roots[directory] = root
+
+        return cls.project_roots[directory]
+
+    @classmethod
+    def project_path(cls, path):
+        '''Returns the given path relative to the root of the project
+        holding it (see project_root), or absolute outside any project,
+        no matter the current dir.'''
+        path = os.path.realpath(path)
+        root = cls.project_root(dirname(path))
+        if root is None:
+            return path
+
+        return os.path.relpath(path, root)
+
     @classmethod
     def join(cls, *args):
         '''Returns the concatenated path for the given arguments.'''
@@ -177,6 +274,65 @@ class FileSystem(object):
         '''Walks through filesystem'''
         return os.walk(path)
 
+    @classmethod
+    def scan(cls, path, threads=1):
+        """Lists every file under `path`, in the same order as walking
+        through it would, returning a tuple with those files and a dict
+        with the mtime of each directory. Many threads list directories
+        at once, if asked to."""
+        root_path = cls.abspath(path)
+
+        def list_dir(directory):
+            try:
+                mtime = os.stat(directory).st_mtime
+                names = os.listdir(directory)
+            except OSError:
+                return directory, None, [], []
+
+            files, dirs = [], []
+            for name in names:
+                full = cls.join(directory, name)
+                if os.path.isdir(full):
+                    # just like walk does, not following links
+                    if not os.path.islink(full):
+                        dirs.append(full)
+                else:
+                    files.append(full)
+
+            return directory, mtime, files, dirs
+
+        pool = None
+        if threads > 1:
+            from multiprocessing.pool import ThreadPool
+            pool = ThreadPool(threads)
+
+        listed = {}
+        try:
+            level = [root_path]
+            while level:
+                found = pool and pool.map(list_dir, level) or map(list_dir, level)
+                level = []
+                for directory, mtime, files, dirs in found:
+                    listed[directory] = mtime, files, dirs
+                    level.extend(dirs)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        return_files = []
+        mtimes = {}
+        pending = [root_path]
+        while pending:
+            directory = pending.pop()
+            mtime, files, dirs = listed[directory]
+            if mtime is not None:
+                mtimes[directory] = mtime
+            return_files.extend(files)
+            pending.extend(reversed(dirs))
+
+        return return_files, mtimes
+
     @classmethod
     def locate(cls, path, match, recursive=True):
         """Locate files recursively in a given path"""
@@ -20,7 +20,16 @@ import sys
 import optparse
 
 import lettuce
+from lettuce import console
 from lettuce.core import RunController, PrevResultPersister
+from lettuce.cache import FeatureCache, FileListCache
+from lettuce.manifest import StepManifest
+from lettuce.watch import Watcher
+from lettuce import daemon
+from lettuce.ordering import ORDERINGS
+from lettuce.sharding import parse_shard, shard_filename, merge_results
+from lettuce.changes import ChangedFiles, DependencyPersister
+from lettuce.exceptions import ChangeDetectionError
 
 def create_runner(args, base_path):
     parser = optparse.OptionParser(
@@ -44,11 +53,38 @@ def create_runner(args, base_path):
                       default=False,
                       help='Only re-run tests that failed last time')
 
+    parser.add_option("--changed-since",
+                      dest="changed_since",
+                      default=None,
+                      help='Only run scenarios whose feature file or step '
+                      'definition modules have changed since this git ref, '
+                      'or this mtime (seconds since the epoch)')
+
+    parser.add_option("--deps-file",
+                      dest="deps_file",
+                      default=".lettucedeps",
+                      help='Filename to keep the files each scenario depends '
+                      'on, default is .lettucedeps, set to None to disable')
+
+    parser.add_option("--failfast",
+                      dest="max_failures",
+                      action="store_const",
+                      const=1,
+                      help='Stop running scenarios as soon as one fails')
+
+    parser.add_option("--max-failures",
+                      dest="max_failures",
+                      default=None,
+                      type="int",
+                      help='Stop running scenarios once this many of them '
+                      'have failed, reporting the rest as not run')
+
     parser.add_option("--syntax",
                       action="store_true",
                       dest="only_syntax_check",
                       default=False,
-                      help='Only syntax check, do not actually run any tests (so quick)')
+                      help='Only syntax check, do not actually run any tests (so quick). '
+                      'Step definitions are read rather than imported, when possible')
 
     parser.add_option("--id-file",
                       dest="id_file",
@@ -74,10 +110,169 @@ def create_runner(args, base_path):
                       help='Write JUnit XML to this file. Defaults to '
                       'lettucetests.xml')
 
+    parser.add_option("--xunit-testcases",
+                      dest="xunit_testcases",
+                      default="step",
+                      type="choice",
+                      choices=["step", "scenario"],
+                      help='What each JUnit XML testcase is, either a step '
+                      '(default) or a scenario')
+
+    parser.add_option("--xunit-suite-per-feature",
+                      dest="xunit_suite_per_feature",
+                      action="store_true",
+                      default=False,
+                      help='Group JUnit XML testcases within a testsuite '
+                      'per feature')
+
+    parser.add_option("--with-hotspots",
+                      dest="enable_hotspots",
+                      action="store_true",
+                      default=False,
+                      help='Output how long each step definition took, '
+                      'altogether, to a JSON file')
+
+    parser.add_option("--hotspots-file",
+                      dest="hotspots_file",
+                      default=None,
+                      type="string",
+                      help='Write the step definition hotspots to this file. '
+                      'Defaults to lettucehotspots.json')
+
+    parser.add_option("--with-results",
+                      dest="enable_results",
+                      action="store_true",
+                      default=False,
+                      help='Output the results of every scenario and step '
+                      'to a JSON file, that lettuce merge-results reads')
+
+    parser.add_option("--results-file",
+                      dest="results_file",
+                      default=None,
+                      type="string",
+                      help='Write the results to this file. Defaults to '
+                      'lettuceresults.json')
+
+    parser.add_option("--with-events",
+                      dest="enable_events",
+                      action="store_true",
+                      default=False,
+                      help='Output an event per line (NDJSON) as each '
+                      'feature, scenario and step starts or ends')
+
+    parser.add_option("--events-file",
+                      dest="events_file",
+                      default=None,
+                      type="string",
+                      help='Write the events to this file. Defaults to '
+                      'lettuceevents.ndjson')
+
+    parser.add_option("--shard",
+                      dest="shard",
+                      default=None,
+                      help='Run only the K-th out of N shards of about the '
+                      'same duration, given as K/N. Each shard writes its '
+                      'results, and JUnit XML, to files of its own (e.g. '
+                      'lettuceresults-K.json), see lettuce merge-results')
+
+    parser.add_option("--shard-history",
+                      dest="shard_history",
+                      default=None,
+                      help='Split shards by the durations within this '
+                      '.lettuceids file, that every shard has to be given, '
+                      'rather than by step counts. It is only read')
+
+    parser.add_option("-p", "--processes",
+                      dest="processes",
+                      default=1,
+                      type="int",
+                      help='Run features across this many worker processes, '
+                      'defaults to 1 (no worker processes at all)')
+
+    parser.add_option("--cache-dir",
+                      dest="cache_dir",
+                      default=".lettuce_cache",
+                      help='Directory to keep parsed features, and the '
+                      'files found under the base path, in, so that '
+                      'unchanged feature files are not parsed again, '
+                      'default is .lettuce_cache, set to None to disable')
+
+    parser.add_option("--walk-threads",
+                      dest="walk_threads",
+                      default=1,
+                      type="int",
+                      help='List the directories under the base path with '
+                      'this many threads, which helps on network file '
+                      'systems, defaults to 1')
+
+    parser.add_option("--parser",
+                      dest="parser",
+                      default="single-pass",
+                      type="choice",
+                      choices=["single-pass", "regex"],
+                      help='Parser for feature files, either single-pass '
+                      '(default) or regex')
+
+    parser.add_option("--order",
+                      dest="order",
+                      default="file",
+                      type="choice",
+                      choices=sorted(ORDERINGS),
+                      help='Order to run features and scenarios in: file '
+                      '(default), failed-first (previous failures, then new '
+                      'or changed scenarios) or slowest-first (longest '
+                      'first, which packs worker processes best)')
+
+    parser.add_option("--watch",
+                      dest="watch",
+                      action="store_true",
+                      default=False,
+                      help='Keep running, and whenever feature files or step '
+                      'definition modules change, run again the scenarios '
+                      'they affect')
+
+    parser.add_option("--watch-interval",
+                      dest="watch_interval",
+                      default=1.0,
+                      type="float",
+                      help='Seconds between checks for changes in watch '
+                      'mode, defaults to 1')
+
+    parser.add_option("--output-buffer",
+                      dest="output_buffer",
+                      default=None,
+                      type="int",
+                      help='Bytes of output to gather before writing them '
+                      'out, besides at the end of each scenario and on '
+                      'failures, defaults to 0 within a terminal and 65536 '
+                      'otherwise')
+
+    parser.add_option("--profile",
+                      dest="profile_dir",
+                      default=None,
+                      help='Profile each feature, writing its cProfile '
+                      'stats and a report of the slowest steps and step '
+                      'definitions to this directory')
+
     options, args = parser.parse_args(args)
     if args:
         base_path = os.path.abspath(args[0])
 
+    shard = None
+    if options.shard:
+        try:
+            shard = parse_shard(options.shard)
+        except ValueError, e:
+            parser.error(str(e))
+
+        if options.shard_history and not os.path.exists(options.shard_history):
+            parser.error("There is no shard history file %s" % options.shard_history)
+
+        options.enable_results = True
+        options.xunit_file = options.xunit_file or shard_filename("lettucetests.xml", shard)
+        options.results_file = options.results_file or shard_filename("lettuceresults.json", shard)
+        options.events_file = options.events_file or shard_filename("lettuceevents.ndjson", shard)
+
     try:
         options.verbosity = int(options.verbosity)
     except ValueError:
@@ -87,16 +282,127 @@ def create_runner(args, base_path):
     if "None" == filename:  # Else there is no way to disable writing ids to file
         filename = None
     persister = PrevResultPersister(filename)
-    run_controller = RunController(persister, options.only_run_failed, options.only_syntax_check, options.tags_to_run)
+
+
+    dependency_persister = None
+    if "None" != options.deps_file:
+        dependency_persister = DependencyPersister(options.deps_file)
+
+    changed_files = None
+    if options.changed_since:
+        try:
+            changed_files = ChangedFiles(options.changed_since, base_path)
+        except ChangeDetectionError, e:
+            sys.stderr.write("%s\n" % e)
+            raise SystemExit(2)
+
+    feature_cache = None
+    file_cache = None
+    manifest_dir = None
+    if "None" != options.cache_dir:
+        feature_cache = FeatureCache(options.cache_dir)
+        file_cache = FileListCache(options.cache_dir)
+        manifest_dir = options.cache_dir
+
+    run_controller = RunController(persister, options.only_run_failed, options.only_syntax_check, options.tags_to_run,
+                                   changed_files, dependency_persister, options.max_failures)
     runner = lettuce.Runner(base_path, scenarios=options.scenarios,
                             verbosity=options.verbosity,
                             enable_xunit=options.enable_xunit,
                             xunit_filename=options.xunit_file,
-                            run_controller = run_controller)
+                            xunit_testcases=options.xunit_testcases,
+                            xunit_suite_per_feature=options.xunit_suite_per_feature,
+                            run_controller = run_controller,
+                            processes=options.processes,
+                            feature_cache=feature_cache,
+                            profile_dir=options.profile_dir,
+                            enable_hotspots=options.enable_hotspots,
+                            hotspots_filename=options.hotspots_file,
+                            order=options.order,
+                            shard=shard,
+                            shard_history=options.shard_history,
+                            enable_results=options.enable_results,
+                            results_filename=options.results_file,
+                            enable_events=options.enable_events,
+                            events_filename=options.events_file,
+                            file_cache=file_cache,
+                            step_manifest=StepManifest(manifest_dir),
+                            walk_threads=options.walk_threads,
+                            parser=options.parser,
+                            output_buffer=options.output_buffer)
+    if options.watch:
+        return Watcher(runner, options.watch_interval)
+
     return runner
 
+def merge(args):
+    """lettuce merge-results: sums up the results files written by the
+    shards of a run"""
+    parser = optparse.OptionParser(
+        usage="%prog merge-results RESULTS_FILE...",
+        version=lettuce.version
+    )
+    options, filenames = parser.parse_args(args)
+    if not filenames:
+        parser.error("Give the results files written by each shard")
+
+    total = merge_results(filenames)
+    for feature_result in total.feature_results:
+        for scenario_result in feature_result.scenario_results:
+            if scenario_result.failed:
+                sys.stdout.write("\nFailed: %s (%s)\n" % (
+                    scenario_result.name.encode('utf-8'), feature_result.file))
+                for traceback in scenario_result.tracebacks:
+                    sys.stdout.write(traceback.encode('utf-8'))
+
+    from lettuce.plugins import shell_output
+    shell_output.print_end(total)
+    console.flush()
+    return total
+
+def serve(args, base_path):
+    """lettuce serve: keeps terrain and step definitions loaded, running
+    features whenever lettuce client asks to"""
+    parser = optparse.OptionParser(
+        usage="%prog serve [--socket SOCKET] [PATH]",
+        version=lettuce.version
+    )
+    parser.add_option("--socket",
+                      dest="socket",
+                      default=daemon.DEFAULT_SOCKET,
+                      help='Unix socket to wait for runs on, default is '
+                      '.lettuce.sock')
+    options, paths = parser.parse_args(args)
+    if paths:
+        base_path = os.path.abspath(paths[0])
+
+    daemon.Daemon(base_path, options.socket, create_runner).serve_forever()
+
+def client(args):
+    """lettuce client: has lettuce serve run the given command line,
+    returning its exit status"""
+    socket_path = daemon.DEFAULT_SOCKET
+    if args[:1] == ['--socket']:
+        socket_path, args = args[1], args[2:]
+    elif args and args[0].startswith('--socket='):
+        socket_path, args = args[0].split('=', 1)[1], args[1:]
+
+    return daemon.request(args, socket_path)
+
 def main(args=sys.argv[1:]):
+    if args and args[0] == 'merge-results':
+        result = merge(args[1:])
+        if result.steps != result.steps_passed:
+            raise SystemExit(1)
+        return
+
     base_path = os.path.join(os.path.dirname(os.curdir), 'features')
+    if args and args[0] == 'serve':
+        return serve(args[1:], base_path)
+
+    if args and args[0] == 'client':
+        raise SystemExit(client(args[1:]))
+
     runner = create_runner(args, base_path)
 
     result = runner.run()
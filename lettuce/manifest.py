@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Step definitions told by reading their modules rather than importing
+them.
+
+Checking the syntax of features only needs the regex of each step
+definition, so there is no point in importing step modules (along with
+django, selenium and whatnot) just to learn them. Each module is parsed
+with `ast` instead, and its `@step(...)` regexes, lines and function
+names are kept in a manifest, until the module changes.
+
+Modules that register steps in any way that can't be told for sure
+without running them (computed regexes, decorators of their own, steps
+defined within functions, importing * from other modules...) are left
+out of the manifest, and imported as usual. So are modules importing
+others that may register steps as a side effect: the imports of a step
+module are followed through the modules of the project, and any of them
+that mentions lettuce, or any module of a library that does, has it
+imported. Modules of the standard library are not followed at all.
+"""
+import os
+import re
+import ast
+import imp
+import sys
+import cPickle as pickle
+from distutils import sysconfig
+
+from lettuce.fs import FileSystem
+
+# bump it whenever the entries change, so that manifests written by
+# older lettuces are just ignored
+FORMAT = 2
+
+LETTUCE_MODULES = ('lettuce', 'lettuce.decorators', 'lettuce.terrain')
+
+STANDARD_LIB = os.path.realpath(sysconfig.get_python_lib(standard_lib=True))
+
+def _is_hook(node, hook_names):
+    """Tells whether a decorator is one of before.*, after.* or
+    world.absorb, that do not define steps"""
+    if isinstance(node, ast.Call):
+        node = node.func
+
+    return isinstance(node, ast.Attribute) and \
+        isinstance(node.value, ast.Name) and node.value.id in hook_names
+
+def find_module_files(name, directory=None):
+    """Returns the files of the module with the given dotted name, and
+    of the packages holding it, as an import from a module within the
+    given directory would find them. Builtin and extension modules have
+    no files, modules that can't be found give None."""
+    if name in sys.builtin_module_names:
+        return []
+
+    files = []
+    # step modules are imported with their own dir on sys.path
+    path = ([directory] if directory else []) + sys.path
+    for part in name.split('.'):
+        try:
+            found, filename, (suffix, mode, kind) = imp.find_module(part, path)
+        except ImportError:
+            return None
+
+        if found:
+            found.close()
+
+        if kind == imp.PKG_DIRECTORY:
+            files.append(os.path.join(filename, '__init__.py'))
+            path = [filename]
+        elif kind == imp.PY_SOURCE:
+            files.append(filename)
+            path = []
+        elif kind in (imp.C_EXTENSION, imp.C_BUILTIN):
+            path = []
+        else:
+            # compiled only, there is no source to read
+            return None
+
+    return files
+
+def is_library(filename):
+    parts = filename.split(os.sep)
+    return 'site-packages' in parts or 'dist-packages' in parts
+
+def is_standard(filename):
+    filename = os.path.realpath(filename)
+    return filename.startswith(STANDARD_LIB + os.sep) and not is_library(filename)
+
+def imported_modules(module):
+    """Yields the dotted names of the modules the given ast imports,
+    giving None for relative imports, that can't be told"""
+    for node in ast.walk(module):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                yield None
+                continue
+
+            yield node.module
+            for alias in node.names:
+                if alias.name != '*':
+                    # maybe a module of that package
+                    yield "%s.%s" % (node.module, alias.name)
+
+def may_register_steps(filename, followed):
+    """Tells whether importing the given module file may register step
+    definitions, going by its source: a module of the project does if it
+    mentions lettuce, or if any module it imports does; a module of a
+    library only if it mentions lettuce itself. Each module read is kept
+    in `followed`, along with the answer."""
+    if is_standard(filename):
+        return False
+
+    if filename not in followed:
+        # until told otherwise, so that import cycles end
+        followed[filename] = False
+        try:
+            f = FileSystem.open_raw(filename, 'rb')
+            try:
+                source = f.read()
+            finally:
+                f.close()
+        except IOError:
+            followed[filename] = True
+            return True
+
+        if 'lettuce' in source:
+            followed[filename] = True
+        elif not is_library(filename):
+            followed[filename] = imports_modules_registering_steps(
+                source, os.path.dirname(filename), followed)
+
+    return followed[filename]
+
+def imports_modules_registering_steps(source, directory=None, followed=None):
+    """Tells whether the module with the given source, within the given
+    directory, imports any module that may register steps. Modules that
+    can't be found are left alone: importing them would fail anyway."""
+    if followed is None:
+        followed = {}
+
+    try:
+        module = ast.parse(source)
+    except (SyntaxError, TypeError, ValueError):
+        return True
+
+    for name in imported_modules(module):
+        if name is None:
+            return True
+
+        if name in LETTUCE_MODULES:
+            continue
+
+        if name.split('.')[0] == 'lettuce':
+            # e.g. lettuce.django.steps, but not what is imported from
+            # lettuce itself, like lettuce.step
+            if find_module_files(name, directory) is not None:
+                return True
+            continue
+
+        for filename in find_module_files(name, directory) or []:
+            if may_register_steps(filename, followed):
+                return True
+
+    return False
+
+def extract_step_definitions(source, directory=None, followed=None):
+    """Returns a list with (regex, line, function name) for each step
+    definition within the given module source, found within the given
+    directory, or None if they can't be told without importing the
+    module. The modules its imports lead to are kept in `followed`."""
+    try:
+        module = ast.parse(source)
+    except (SyntaxError, TypeError, ValueError):
+        return None
+
+    if imports_modules_registering_steps(source, directory, followed):
+        return None
+
+    step_names = set()
+    lettuce_names = set()
+    hook_names = set(['world'])
+    for node in ast.walk(module):
+        if isinstance(node, ast.ImportFrom) and node.module not in LETTUCE_MODULES:
+            # e.g. step definitions shipped along some library
+            if [alias for alias in node.names if alias.name == '*']:
+                return None
+
+        if isinstance(node, ast.ImportFrom) and node.module in LETTUCE_MODULES:
+            for alias in node.names:
+                name = alias.asname or alias.name
+                if alias.name == 'step':
+                    step_names.add(name)
+                elif alias.name in ('before', 'after', 'world'):
+                    hook_names.add(name)
+                elif alias.name == '*':
+                    step_names.add('step')
+                    hook_names.update(['before', 'after'])
+
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name == 'lettuce':
+                    lettuce_names.add(alias.asname or alias.name)
+
+    def is_step(node):
+        if isinstance(node, ast.Name):
+            return node.id in step_names
+        return isinstance(node, ast.Attribute) and node.attr == 'step' and \
+            isinstance(node.value, ast.Name) and node.value.id in lettuce_names
+
+    definitions = []
+    allowed = set()
+    for node in module.body:
+        if not isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            continue
+
+        for decorator in node.decorator_list:
+            if _is_hook(decorator, hook_names):
+                continue
+
+            if not isinstance(node, ast.FunctionDef) or \
+               not isinstance(decorator, ast.Call) or \
+               not is_step(decorator.func) or \
+               len(decorator.args) != 1 or decorator.keywords or \
+               decorator.starargs or decorator.kwargs or \
+               not isinstance(decorator.args[0], ast.Str):
+                return None
+
+            regex = decorator.args[0].s
+            try:
+                re.compile(regex)
+            except re.error:
+                # importing it tells what is wrong
+                return None
+
+            allowed.add(id(decorator.func))
+            definitions.append((regex, node.lineno, node.name))
+
+    # the step decorator called anywhere else, or the registry itself,
+    # may define steps in ways only running the module tells
+    for node in ast.walk(module):
+        if isinstance(node, ast.Call) and is_step(node.func) and id(node.func) not in allowed:
+            return None
+
+        if isinstance(node, ast.Name) and node.id == 'STEP_REGISTRY':
+            return None
+
+    return definitions
+
+def declared_function(filename, line, name):
+    """Makes a function standing for a step definition that was not
+    imported, defined at the same file and line, so that steps tell
+    where their definitions are just like when they are imported"""
+    source = "%sdef %s(step, *args, **kw):\n" \
+             "    raise RuntimeError('%%s was not imported, only read' %% __file__)\n" % \
+             ("\n" * (line - 1), name)
+    namespace = {'__file__': filename}
+    exec compile(source, filename, 'exec') in namespace
+    return namespace[name]
+
+def _stat(filename):
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return stat.st_mtime, stat.st_size
+
+class StepManifest(object):
+    """Manifest of the step definitions within each step module, kept
+    under `cache_dir`, if any. An entry is valid while its module, and
+    the modules it imports, keep their mtime and size."""
+    def __init__(self, cache_dir='.lettuce_cache'):
+        self.filename = None
+        if cache_dir:
+            self.filename = FileSystem.join(FileSystem.abspath(cache_dir), 'steps.pickle')
+        self.entries = None
+        self.changed = False
+
+    def _read(self):
+        self.entries = {}
+        if not self.filename:
+            return
+
+        try:
+            f = open(self.filename, 'rb')
+            try:
+                manifest = pickle.load(f)
+            finally:
+                f.close()
+        except Exception:
+            return
+
+        if manifest.get('format') == FORMAT:
+            self.entries = manifest['entries']
+
+    def load(self, filename):
+        """Returns a list with (regex, line, function name) for each
+        step definition within the given module, or None if it has to
+        be imported to tell"""
+        if self.entries is None:
+            self._read()
+
+        filename = FileSystem.abspath(filename)
+        stat = _stat(filename)
+        if stat is None:
+            return None
+
+        entry = self.entries.get(filename)
+        if entry and (entry['mtime'], entry['size']) == stat and \
+           all(_stat(name) == known for name, known in entry['imports'].items()):
+            return entry['definitions']
+
+        followed = {}
+        f = FileSystem.open_raw(filename, 'rb')
+        try:
+            definitions = extract_step_definitions(
+                f.read(), FileSystem.dirname(filename), followed)
+        finally:
+            f.close()
+
+        self.entries[filename] = {
+            'mtime': stat[0],
+            'size': stat[1],
+            'definitions': definitions,
+            # the modules of the project it imports, that may start
+            # registering steps
+            'imports': dict([(name, _stat(name)) for name in followed]),
+        }
+        self.changed = True
+        return definitions
+
+    def declare(self, filename):
+        """Returns a dict with a stand-in function for each step
+        definition regex within the given module, or None if it has to
+        be imported to tell"""
+        definitions = self.load(filename)
+        if definitions is None:
+            return None
+
+        filename = FileSystem.abspath(filename)
+        return dict([(regex, declared_function(filename, line, name))
+                     for regex, line, name in definitions])
+
+    def save(self):
+        """Writes the manifest down, if anything changed. Failing to
+        write it never breaks the run."""
+        if not self.filename or not self.changed:
+            return
+
+        temporary = "%s.%d" % (self.filename, os.getpid())
+        try:
+            FileSystem.mkdir(FileSystem.dirname(self.filename))
+            f = open(temporary, 'wb')
+            try:
+                pickle.dump({'format': FORMAT, 'entries': self.entries},
+                            f, pickle.HIGHEST_PROTOCOL)
+            finally:
+                f.close()
+
+            os.rename(temporary, self.filename)
+            self.changed = False
+        except Exception:
+            if os.path.exists(temporary):
+                os.remove(temporary)
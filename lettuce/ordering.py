@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Orders in which features, and the scenarios within them, can run.
+
+An ordering sorts by the history PrevResultPersister keeps, that is the
+ScenarioResultSummary of each scenario id:
+
+    * file: in the order they are found, the default
+    * failed-first: what failed last time first, then what is new or
+      has changed, then what fails the most often
+    * slowest-first: the longest first, so that worker processes are
+      packed with the long ones first (LPT)
+
+Orderings are looked up by name within ORDERINGS, where new ones can be
+registered.
+"""
+import os
+
+from lettuce.core import ScenarioResultSummary
+
+class Estimator(object):
+    """Tells how long scenarios and features are expected to take, from
+    the durations recorded for them or, for the scenarios that never ran,
+    from how many steps they have"""
+    def __init__(self, history=None):
+        self.history = history or {}
+        durations = 0.0
+        steps = 0
+        for summary in self.history.values():
+            if summary.duration is not None and summary.steps:
+                durations += summary.duration
+                steps += summary.steps
+
+        # when nothing is known, durations are step counts
+        self.step_duration = steps and durations / steps or 1.0
+
+    def scenario(self, scenario):
+        total = 0.0
+        for outline in scenario.outlines or [None]:
+            summary = self.history.get(scenario.identity(outline))
+            if summary is not None and summary.duration is not None:
+                total += summary.duration
+            else:
+                total += len(scenario.steps) * self.step_duration
+
+        return total
+
+    def feature(self, feature):
+        return sum([self.scenario(scenario) for scenario in feature.scenarios])
+
+class FileOrder(object):
+    """Keeps features and scenarios in the order they were found. Other
+    orderings only have to tell the sorting key of a scenario and of a
+    feature, sorting is stable."""
+    def __init__(self, run_controller=None):
+        self.run_controller = run_controller
+        self.history = run_controller and run_controller.previous_results or {}
+
+    def scenario_key(self, scenario):
+        return 0
+
+    def feature_key(self, feature):
+        return 0
+
+    def sort_scenarios(self, scenarios):
+        return sorted(scenarios, key=self.scenario_key)
+
+    def sort_features(self, features):
+        return sorted(features, key=self.feature_key)
+
+class FailedFirstOrder(FileOrder):
+    def __init__(self, run_controller=None):
+        super(FailedFirstOrder, self).__init__(run_controller)
+        self.mtimes = {}
+
+    def is_changed(self, scenario, outline):
+        if scenario.identity(outline) not in self.history:
+            return True
+
+        controller = self.run_controller
+        if controller and controller.changed_files is not None:
+            return controller.is_affected(scenario)
+
+        return False
+
+    def mtime(self, filename):
+        if filename not in self.mtimes:
+            try:
+                self.mtimes[filename] = os.stat(filename).st_mtime
+            except (OSError, TypeError):
+                self.mtimes[filename] = 0
+
+        return self.mtimes[filename]
+
+    def scenario_key(self, scenario):
+        keys = []
+        for outline in scenario.outlines or [None]:
+            summary = self.history.get(scenario.identity(outline))
+            if summary and summary.status == ScenarioResultSummary.FAILED:
+                rank = 0
+            elif self.is_changed(scenario, outline):
+                rank = 1
+            else:
+                rank = 2
+
+            failure_rate = summary and summary.runs and \
+                float(summary.failures) / summary.runs or 0.0
+            keys.append((rank, -failure_rate))
+
+        rank, failure_rate = min(keys)
+        return rank, failure_rate, -self.mtime(scenario.with_file)
+
+    def feature_key(self, feature):
+        if not feature.scenarios:
+            return ()
+
+        return min(map(self.scenario_key, feature.scenarios))
+
+class SlowestFirstOrder(FileOrder):
+    def __init__(self, run_controller=None):
+        super(SlowestFirstOrder, self).__init__(run_controller)
+        self.estimator = Estimator(self.history)
+
+    def scenario_key(self, scenario):
+        return -self.estimator.scenario(scenario)
+
+    def feature_key(self, feature):
+        return -self.estimator.feature(feature)
+
+ORDERINGS = {
+    'file': FileOrder,
+    'failed-first': FailedFirstOrder,
+    'slowest-first': SlowestFirstOrder,
+}
+
+def get_ordering(name, run_controller=None):
+    """Returns the ordering registered under the given name"""
+    if name not in ORDERINGS:
+        raise ValueError('Unknown order "%s", choose one of: %s' % (
+            name, ", ".join(sorted(ORDERINGS))))
+
+    return ORDERINGS[name](run_controller)
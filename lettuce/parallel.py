@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Runs features across a pool of worker processes.
+
+The main process parses every feature and then forks the workers, so
+that each of them gets terrain, step definitions and the parsed
+features for free. A worker runs one feature at a time, with all the
+hooks, and sends back the output it has written plus a summary of the
+results. The main process replays that summary on top of its own copy
+of the feature, so that it ends up with the very same FeatureResult a
+sequential run would give.
+"""
+import sys
+import pickle
+import traceback
+import multiprocessing
+from StringIO import StringIO
+
+from lettuce import console
+from lettuce.core import FeatureResult
+from lettuce.core import ScenarioResult
+from lettuce.exceptions import ReasonToFail
+from lettuce.exceptions import NoDefinitionFound
+from lettuce.exceptions import WorkerError
+from lettuce.plugins import xunit_output
+
+# set by run_features right before forking the workers
+context = None
+
+class WorkerContext(object):
+    def __init__(self, features, run_controller, feature_scenarios,
+                 profiler=None, ordering=None, output=None):
+        self.features = features
+        self.run_controller = run_controller
+        self.feature_scenarios = feature_scenarios
+        self.profiler = profiler
+        self.ordering = ordering
+        self.output = output
+
+def dump_reason(why):
+    if why is None:
+        return None
+
+    try:
+        exception = pickle.dumps(why.exception, pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        exception = None
+
+    return {
+        'cause': why.cause,
+        'traceback': why.traceback,
+        'exception': exception,
+        'assertion': isinstance(why.exception, AssertionError),
+    }
+
+def load_reason(data):
+    if data is None:
+        return None
+
+    exception = None
+    if data['exception'] is not None:
+        try:
+            exception = pickle.loads(data['exception'])
+        except Exception:
+            pass
+
+    if exception is None:
+        kind = data['assertion'] and AssertionError or Exception
+        exception = kind(data['cause'])
+
+    why = ReasonToFail.__new__(ReasonToFail)
+    why.exception = exception
+    why.cause = data['cause']
+    why.traceback = data['traceback']
+    return why
+
+def dump_feature_result(feature, result):
+    """Turns a FeatureResult into plain data that can be sent between
+    processes"""
+    scenario_results = []
+    for scenario_result in result.scenario_results:
+        steps = []
+        for step in scenario_result.all_steps:
+            if step in scenario_result.steps_failed:
+                status = 'failed'
+            elif step in scenario_result.steps_undefined:
+                status = 'undefined'
+            elif step in scenario_result.steps_passed:
+                status = 'passed'
+            else:
+                status = 'skipped'
+
+            steps.append({
+                'status': status,
+                'ran': step.ran,
+                'passed': step.passed,
+                'failed': step.failed,
+                'why': dump_reason(step.why),
+                'duration': step.duration,
+                'hooks_duration': step.hooks_duration,
+            })
+
+        scenario_results.append({
+            'index': feature.scenarios.index(scenario_result.scenario),
+            'id': scenario_result.id,
+            'not_run': scenario_result.not_run,
+            'steps': steps,
+            'duration': scenario_result.duration,
+            'hooks_duration': scenario_result.hooks_duration,
+        })
+
+    return scenario_results
+
+def load_feature_result(feature, scenario_results, ignore_case=True):
+    """Rebuilds a FeatureResult out of the data given by
+    dump_feature_result"""
+    results = []
+    outlines_ran = {}
+    for data in scenario_results:
+        scenario = feature.scenarios[data['index']]
+        outline = None
+        if scenario.outlines:
+            order = outlines_ran.get(data['index'], 0)
+            outlines_ran[data['index']] = order + 1
+            outline = scenario.outlines[order]
+
+        lists = {
+            'passed': [],
+            'failed': [],
+            'skipped': [],
+            'undefined': [],
+        }
+        all_steps = []
+        for template, state in zip(scenario.steps, data['steps']):
+            step = template
+            if outline:
+                step = template.solve_and_clone(outline)
+                step.scenario = scenario
+
+            try:
+                step.pre_run(ignore_case, with_outline=outline)
+            except NoDefinitionFound:
+                pass
+
+            step.ran = state['ran']
+            step.passed = state['passed']
+            step.failed = state['failed']
+            step.why = load_reason(state['why'])
+            step.duration = state['duration']
+            step.hooks_duration = state['hooks_duration']
+
+            lists[state['status']].append(step)
+            all_steps.append(step)
+
+        result = ScenarioResult(
+            scenario,
+            lists['passed'],
+            lists['failed'],
+            lists['skipped'],
+            lists['undefined'],
+            data['not_run'],
+            data['id'],
+            all_steps
+        )
+        result.duration = data['duration']
+        result.hooks_duration = data['hooks_duration']
+        results.append(result)
+
+    return FeatureResult(feature, *results)
+
+def detach_failures(feature):
+    """Takes the failures the output plugin has gathered within its
+    hooks, if it does, as plain data"""
+    failures = getattr(context.output, 'failures', None)
+    if failures is None:
+        return []
+
+    return [(feature.scenarios.index(scenario), dump_reason(why))
+            for scenario, why in failures.detach()]
+
+def attach_failures(output, feature, failures):
+    """Hands the failures detached within a worker process over to the
+    output plugin of the main process, so that it shows them at the end
+    of the run as if it had gathered them itself"""
+    gathered = getattr(output, 'failures', None)
+    if gathered is None:
+        return
+
+    gathered.attach([(feature.scenarios[index], load_reason(why))
+                     for index, why in failures])
+
+def run_feature(index):
+    """Runs within a worker process: runs the feature at the given
+    index, capturing everything the output plugins write"""
+    feature = context.features[index]
+    scenarios = context.feature_scenarios[index]
+    run_controller = context.run_controller
+
+    payload = {'output': '', 'error': None, 'results': [], 'xunit': [],
+               'failures': [], 'duration': None, 'hooks_duration': 0.0}
+    if run_controller and run_controller.should_stop():
+        # leaving the feature alone, hooks and all
+        payload['results'] = dump_feature_result(feature, feature.not_run(scenarios))
+        return payload
+
+    xunit_output.capture_test_cases()
+    stdout = sys.stdout
+    sys.stdout = console.Stdout(StringIO(), console.console)
+    try:
+        try:
+            if context.profiler:
+                result = context.profiler.run(feature, run_controller,
+                                              scenarios,
+                                              ordering=context.ordering)
+            else:
+                result = feature.run(run_controller, scenarios,
+                                     ordering=context.ordering)
+
+            payload['results'] = dump_feature_result(feature, result)
+            payload['duration'] = result.duration
+            payload['hooks_duration'] = result.hooks_duration
+        except BaseException:
+            payload['error'] = traceback.format_exc()
+    finally:
+        console.flush()
+        payload['output'] = sys.stdout.getvalue()
+        sys.stdout = stdout
+
+    payload['xunit'] = xunit_output.detach_test_cases()
+    payload['failures'] = detach_failures(feature)
+    return payload
+
+def run_features(features, processes, run_controller=None, scenarios=None,
+                 profiler=None, ordering=None, feature_scenarios=None,
+                 output=None):
+    """Runs the given (already parsed) features within `processes`
+    worker processes, writing each feature's output as soon as it is
+    done, in the order the features were given. Each worker profiles
+    the features it runs if a timing.Profiler is given, and orders their
+    scenarios by the given ordering from lettuce.ordering.
+
+    Either `scenarios` tells which scenarios to run of every feature, or
+    `feature_scenarios` tells it for each feature.
+
+    Features are handed out to the workers in the order they were given,
+    so giving the longest first packs the workers best.
+
+    Failures the given output plugin gathers within its hooks (see
+    lettuce.plugins.Failures) are handed back to it in the main process.
+
+    Returns a list of FeatureResult objects, one per feature.
+    """
+    global context
+
+    if feature_scenarios is None:
+        feature_scenarios = [scenarios] * len(features)
+
+    context = WorkerContext(features, run_controller, feature_scenarios,
+                            profiler, ordering, output)
+    if run_controller:
+        # so that workers stop as soon as too many scenarios failed in any
+        # of them
+        run_controller.shared_failures = multiprocessing.Value('i', run_controller.failures)
+
+    # or the workers would write it out again
+    console.flush()
+    pool = multiprocessing.Pool(processes)
+    results = []
+    try:
+        payloads = pool.imap(run_feature, range(len(features)), 1)
+        for feature, payload in zip(features, payloads):
+            written = payload['output']
+            if isinstance(written, unicode):
+                written = written.encode('utf-8')
+
+            sys.stdout.write(written)
+            if payload['error']:
+                raise WorkerError(payload['error'])
+
+            xunit_output.attach_test_cases(payload['xunit'])
+            attach_failures(output, feature, payload['failures'])
+            result = load_feature_result(feature, payload['results'])
+            result.duration = payload['duration']
+            result.hooks_duration = payload['hooks_duration']
+            results.append(result)
+
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+        context = None
+        if run_controller:
+            run_controller.failures = run_controller.shared_failures.value
+            run_controller.shared_failures = None
+
+    return results
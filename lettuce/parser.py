@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Single-pass parser for feature files.
+
+The Tokenizer walks the lines of a feature once, turning each one into
+a Token that knows its kind and its line number. The Parser is a
+small state machine that consumes those tokens and builds the very
+same Feature, Scenario and Step objects the regex-based parser within
+lettuce.core builds.
+"""
+import re
+
+from lettuce import strings
+from lettuce.core import FeatureDescription
+from lettuce.core import ScenarioDescription
+from lettuce.exceptions import LettuceSyntaxError
+
+FEATURE = 'feature'
+SCENARIO = 'scenario'
+EXAMPLES = 'examples'
+TAGS = 'tags'
+TABLE = 'table'
+MULTILINE = 'multiline'
+TEXT = 'text'
+
+class Token(object):
+    """A single meaningful line of a feature file.
+
+    `text` is the stripped line, `value` depends on the kind: the name
+    for features and scenarios, the list of tag names for tags.
+    """
+    def __init__(self, kind, text, line, value=None):
+        self.kind = kind
+        self.text = text
+        self.line = line
+        self.value = value
+
+    def __repr__(self):
+        return '<Token %s at line %d: %r>' % (self.kind, self.line, self.text)
+
+class Tokenizer(object):
+    """Splits a feature string into tokens, in a single pass"""
+    _regexes = {}
+
+    def __init__(self, language):
+        self.language = language
+        if language.code not in self._regexes:
+            make = lambda words: re.compile(
+                u'^(?:%s):(?P<rest>.*)$' % words, re.U | re.I)
+
+            self._regexes[language.code] = (
+                make(language.feature),
+                make(language.scenario_separator),
+                make(language.examples),
+            )
+
+        self.feature, self.scenario, self.examples = self._regexes[language.code]
+
+    def tokenize(self, string):
+        in_multiline = False
+        for number, line in enumerate(unicode(string).splitlines()):
+            line = line.strip()
+            if not line or line.startswith(u'#'):
+                continue
+
+            number += 1
+            if line.startswith(u'"""'):
+                in_multiline = not in_multiline
+                yield Token(MULTILINE, line, number)
+                continue
+
+            if in_multiline:
+                yield Token(MULTILINE, line, number)
+                continue
+
+            if line.startswith(u'|'):
+                yield Token(TABLE, line, number)
+                continue
+
+            if u'@' in line:
+                tags = []
+                if strings.steal_tags_from_line(line, tags):
+                    yield Token(TAGS, line, number, tags)
+                    continue
+
+            matched = self.scenario.match(line)
+            if matched:
+                yield Token(SCENARIO, line, number, matched.group('rest').strip())
+                continue
+
+            matched = self.examples.match(line)
+            if matched:
+                yield Token(EXAMPLES, line, number)
+                continue
+
+            matched = self.feature.match(line)
+            if matched:
+                yield Token(FEATURE, line, number, matched.group('rest').strip())
+                continue
+
+            yield Token(TEXT, line, number)
+
+class ScenarioDraft(object):
+    """Everything the parser has gathered so far about a scenario"""
+    def __init__(self, token, tags):
+        self.name = token.value
+        self.line = token.line
+        self.tags = tags
+        self.steps = []
+        self.examples = []
+
+class Parser(object):
+    """Builds a Feature out of the tokens of a feature file.
+
+    The feature, scenario and step classes are taken as arguments, so
+    that subclasses of them can be built as well. Line numbers come
+    straight from the tokens, so no description has to look for its
+    line within the feature string.
+    """
+    invalid_scenario_error = '\nInvalid step on scenario "%s".\n' \
+        'Maybe you killed the first step text of that scenario\n'
+    invalid_step_error = '\nFirst line of step "%s" is in %s form.'
+    feature_name_error = 'Features must have a name that start with a word ' \
+        'letter (not an odd character). e.g: "Feature: This is my name"'
+
+    def __init__(self, feature_class, scenario_class, step_class):
+        self.feature_class = feature_class
+        self.scenario_class = scenario_class
+        self.step_class = step_class
+
+    def parse(self, string, with_file=None, language=None):
+        tokenizer = Tokenizer(language)
+
+        feature = None
+        feature_tags = []
+        pending_tags = []
+        description = []
+        scenarios = []
+        scenario = None
+        in_examples = skip_header = False
+
+        for token in tokenizer.tokenize(string):
+            kind = token.kind
+            if kind == TAGS:
+                if feature is None:
+                    feature_tags.extend(token.value)
+                else:
+                    pending_tags.extend(token.value)
+
+            elif kind == FEATURE:
+                if feature is not None:
+                    raise LettuceSyntaxError(
+                        with_file,
+                        'A feature file must contain ONLY ONE feature!'
+                    )
+
+                if not re.match(r'\w', token.value, re.U):
+                    raise LettuceSyntaxError(with_file, self.feature_name_error)
+
+                feature = token
+
+            elif feature is None:
+                # anything before the feature's heading is ignored
+                continue
+
+            elif kind == SCENARIO:
+                scenario = ScenarioDraft(token, pending_tags)
+                scenarios.append(scenario)
+                pending_tags = []
+                in_examples = False
+
+            elif scenario is None:
+                description.append(token)
+
+            elif kind == EXAMPLES:
+                # further examples tables share the first one's header
+                skip_header = bool(scenario.examples)
+                in_examples = True
+
+            elif in_examples:
+                if skip_header:
+                    skip_header = False
+                else:
+                    scenario.examples.append(token.text)
+
+            elif kind == TEXT:
+                scenario.steps.append((token, [token.text]))
+
+            elif not scenario.steps:
+                if kind == TABLE:
+                    raise LettuceSyntaxError(
+                        with_file,
+                        self.invalid_scenario_error % scenario.name)
+
+                raise LettuceSyntaxError(
+                    None,
+                    self.invalid_step_error % (token.text, kind))
+
+            else:
+                scenario.steps[-1][1].append(token.text)
+
+        if feature is None:
+            raise LettuceSyntaxError(with_file, self.feature_name_error)
+
+        built = [self.build_scenario(draft, feature_tags, string, with_file, language)
+                 for draft in scenarios]
+
+        described_at = None
+        if with_file:
+            described_at = FeatureDescription(
+                None, with_file, None, language, line=feature.line,
+                description_at=[token.line for token in description])
+
+        return self.feature_class(
+            name=feature.value,
+            remaining_lines=None,
+            with_file=with_file,
+            original_string=string,
+            language=language,
+            tags=feature_tags,
+            scenarios=built,
+            description=u"\n".join([token.text for token in description]),
+            described_at=described_at,
+        )
+
+    def build_scenario(self, draft, feature_tags, string, with_file, language):
+        steps = []
+        for token, lines in draft.steps:
+            steps.append(self.step_class(
+                token.text,
+                remaining_lines=lines[1:],
+                line=with_file and token.line or None,
+                filename=with_file,
+            ))
+
+        described_at = None
+        if with_file:
+            described_at = ScenarioDescription(
+                draft, with_file, None, language, line=draft.line)
+
+        keys, outlines = strings.parse_hashes(draft.examples)
+        return self.scenario_class(
+            name=draft.name,
+            remaining_lines=None,
+            keys=keys,
+            outlines=outlines,
+            with_file=with_file,
+            original_string=string,
+            language=language,
+            tags=draft.tags + feature_tags,
+            steps=steps,
+            described_at=described_at,
+        )
@@ -14,3 +14,53 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+class Failures(object):
+    """The reason each failed scenario has failed, in the order they
+    failed, for the output plugins that show them at the end of the run.
+
+    Plugins are reloaded for every run, so each one keeps its own
+    instance at module level, as `failures`, for lettuce.parallel to
+    hand over what worker processes have gathered."""
+
+    def __init__(self):
+        self.scenarios = []
+        self.reasons = {}
+
+    def __iter__(self):
+        for scenario in self.scenarios:
+            yield scenario, self.reasons[scenario]
+
+    def __getitem__(self, scenario):
+        return self.reasons[scenario]
+
+    def add(self, scenario, why):
+        if scenario not in self.reasons:
+            self.reasons[scenario] = why
+            self.scenarios.append(scenario)
+
+    def gather(self, step):
+        """Meant to be called after each step: keeps the first failure
+        of each scenario"""
+        if step.failed:
+            self.add(step.scenario, step.why)
+
+    def detach(self):
+        """Takes the failures gathered so far within a worker process, to
+        be handed back to the main process"""
+        failures = list(self)
+        self.__init__()
+        return failures
+
+    def attach(self, failures):
+        """Gathers the failures a worker process has detached"""
+        for scenario, why in failures:
+            self.add(scenario, why)
+
+
+def wrt_output(filename, content):
+    """Writes a report file of the output plugins that have one"""
+    f = open(filename, "w")
+    f.write(content)
+    f.close()
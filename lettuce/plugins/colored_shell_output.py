@@ -16,19 +16,17 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import os
 import re
-import sys
 import platform
 import struct
 
 from lettuce import core
-from lettuce import strings
-from lettuce import terminal
+from lettuce import console
 
 from lettuce.terrain import after
 from lettuce.terrain import before
 
 def wrt(what):
-    sys.stdout.write(what.encode('utf-8'))
+    console.write(what)
 
 def wrap_file_and_line(string, start, end):
     return re.sub(r'([#] [^:]+[:]\d+)', '%s\g<1>%s' % (start, end), string)
@@ -63,7 +61,7 @@ def print_step_running(step):
     string = step.represent_string(step.original_sentence)
     string = wrap_file_and_line(string, '\033[1;30m', '\033[0m')
     write_out("%s%s" % (color, string))
-    if step.hashes and step.defined_at:
+    if step.table and step.defined_at:
         for line in step.represent_hashes().splitlines():
             write_out("\033[1;30m%s\033[0m\n" % line)
 
@@ -72,8 +70,8 @@ def print_step_ran(step):
     if step.scenario.outlines:
         return
 
-    if step.hashes and step.defined_at:
-        write_out("\033[A" * (len(step.hashes) + 1))
+    if step.table and step.defined_at:
+        write_out("\033[A" * (len(step.table) + 1))
 
     string = step.represent_string(step.original_sentence)
 
@@ -82,14 +80,6 @@ def print_step_ran(step):
 
 
     prefix = '\033[A'
-    width, height = terminal.get_size()
-    lines_up = len(string) / float(width)
-    if lines_up < 1:
-        lines_up = 1
-    else:
-        lines_up = int(lines_up) + 1
-
-    #prefix = prefix * lines_up
 
     if step.failed:
         color = "\033[0;31m"
@@ -107,7 +97,7 @@ def print_step_ran(step):
 
     write_out("%s%s%s" % (prefix, color, string))
 
-    if step.hashes:
+    if step.table:
         for line in step.represent_hashes().splitlines():
             write_out("%s%s\033[0m\n" % (color, line))
 
@@ -131,9 +121,8 @@ def print_scenario_running(scenario):
 
 @after.outline
 def print_outline(scenario, order, outline, reasons_to_fail):
-    table = strings.dicts_to_string(scenario.outlines, scenario.keys)
-    lines = table.splitlines()
-    head = lines.pop(0)
+    lines = scenario.examples_lines()
+    head = lines[0]
 
     wline = lambda x: write_out("\033[0;36m%s%s\033[0m\n" % (" " * scenario.table_indentation, x))
     wline_success = lambda x: write_out("\033[1;32m%s%s\033[0m\n" % (" " * scenario.table_indentation, x))
@@ -143,7 +132,7 @@ def print_outline(scenario, order, outline, reasons_to_fail):
         wrt("\033[1;37m%s%s:\033[0m\n" % (" " * scenario.indentation, scenario.language.first_of_examples))
         wline(head)
 
-    line = lines[order]
+    line = lines[order + 1]
     wline_success(line)
     if reasons_to_fail:
         elines = reasons_to_fail[0].traceback.splitlines()
@@ -250,3 +239,5 @@ def print_no_features_found(where):
         '\033[1;37mcould not find features at '
         '\033[1;33m%s\033[0m\n' % where
     )
+
+console.flush_along_the_run()
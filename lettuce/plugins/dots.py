@@ -16,25 +16,22 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
-import sys
 from lettuce import core
+from lettuce import console
+from lettuce.plugins import Failures
 from lettuce.terrain import after
 
-failed_scenarios = []
-scenarios_and_its_fails = {}
+failures = Failures()
 
 def wrt(string):
-    sys.stdout.write(string)
+    console.write(string)
 
 @after.each_step
 def print_scenario_ran(step):
+    failures.gather(step)
     if not step.failed:
         wrt(".")
     elif step.failed:
-        if step.scenario not in failed_scenarios:
-            scenarios_and_its_fails[step.scenario] = step.why
-            failed_scenarios.append(step.scenario)
-
         if isinstance(step.why.exception, AssertionError):
             wrt("F")
         else:
@@ -45,8 +42,7 @@ def print_end(total):
     if total.scenarios_passed < total.scenarios_ran:
         wrt("\n")
         wrt("\n")
-        for scenario in failed_scenarios:
-            reason = scenarios_and_its_fails[scenario]
+        for scenario, reason in failures:
             wrt(reason.traceback)
 
     wrt("\n")
@@ -94,3 +90,5 @@ def print_no_features_found(where):
         'could not find features at '
         '%s\n' % where
     )
+
+console.flush_along_the_run()
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""A stream of JSON events, one per line (NDJSON), written as the run
+goes: when each feature and scenario starts and ends, for each step
+that ran, for each example of an outline, and at the end of the run.
+
+Features, scenarios and examples end either 'passed', 'failed',
+'undefined' (some step had no definition, none failed) or 'not_run'
+(skipped by tags, --failed, --changed-since or --max-failures).
+
+Every event is written with a single write to a file opened for
+appending, so that it is readable as soon as it happens, and so that
+the worker processes of a parallel run can write their events to the
+same file without garbling each other's.
+"""
+import json
+import os
+import time
+
+from lettuce.terrain import after
+from lettuce.terrain import before
+from lettuce.timing import clock
+from lettuce.registry import STEP_INDEX
+
+fd = None
+output_filename = None
+feature_state = {}
+scenario_state = {}
+
+def where(thing):
+    described_at = getattr(thing, 'described_at', None)
+    if described_at is None:
+        return None, None
+
+    return described_at.file, described_at.line
+
+def step_status(step):
+    if step.failed:
+        return 'failed'
+
+    if step.passed:
+        return 'passed'
+
+    if not step.has_definition:
+        return 'undefined'
+
+    return 'skipped'
+
+def dump_reason(why):
+    if why is None:
+        return None
+
+    return {'exception': why.exception.__class__.__name__,
+            'cause': why.cause,
+            'traceback': why.traceback}
+
+def start(state):
+    state['started'] = clock()
+    state['failed'] = False
+    state['undefined'] = False
+    state['ran'] = False
+
+def track(status, *states):
+    """Keeps the status of a step, or example, within the given states"""
+    for state in states:
+        state['ran'] = True
+        if status in ('failed', 'undefined'):
+            state[status] = True
+
+def status_of(state):
+    if state.get('failed'):
+        return 'failed'
+
+    if state.get('undefined'):
+        return 'undefined'
+
+    if not state.get('ran'):
+        return 'not_run'
+
+    return 'passed'
+
+def finish(state):
+    """Returns the duration and status of what the given state tracks"""
+    now = clock()
+    duration = now - state.get('started', now)
+    return duration, status_of(state)
+
+def has_undefined_steps(scenario, outline):
+    # only the steps of the first example run the step callbacks
+    for step in scenario.steps:
+        matched, function = STEP_INDEX.match(
+            step.solve_and_clone(outline).sentence, True)
+        if not matched:
+            return True
+
+    return False
+
+def wrt_event(event, **data):
+    if fd is None:
+        return
+
+    data['event'] = event
+    data['time'] = time.time()
+    data['pid'] = os.getpid()
+    os.write(fd, json.dumps(data, sort_keys=True) + '\n')
+
+def enable(filename=None):
+    global output_filename
+
+    output_filename = filename or "lettuceevents.ndjson"
+
+    @before.all
+    def open_events():
+        global fd
+        fd = os.open(output_filename,
+                     os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_APPEND,
+                     0666)
+        wrt_event('run_started')
+
+    @before.each_feature
+    def feature_started(feature):
+        start(feature_state)
+        filename, line = where(feature)
+        wrt_event('feature_started', feature=feature.name,
+                  file=filename, line=line)
+
+    @after.each_feature
+    def feature_finished(feature):
+        duration, status = finish(feature_state)
+        wrt_event('feature_finished', feature=feature.name,
+                  status=status, duration=duration)
+
+    @before.each_scenario
+    def scenario_started(scenario):
+        start(scenario_state)
+        filename, line = where(scenario)
+        wrt_event('scenario_started', feature=scenario.feature.name,
+                  scenario=scenario.name, file=filename, line=line)
+
+    @after.each_step
+    def step_finished(step):
+        status = step_status(step)
+        track(status, scenario_state, feature_state)
+
+        filename, line = where(step)
+        scenario = getattr(step, 'scenario', None)
+        wrt_event('step_finished',
+                  feature=scenario and scenario.feature.name or None,
+                  scenario=scenario and scenario.name or None,
+                  step=step.sentence, file=filename, line=line,
+                  status=status, duration=step.duration,
+                  reason=step.failed and dump_reason(step.why) or None)
+
+    @after.outline
+    def example_finished(scenario, order, outline, reasons_to_fail):
+        why = reasons_to_fail and reasons_to_fail[0] or None
+        if why is not None:
+            status = 'failed'
+        elif has_undefined_steps(scenario, outline):
+            status = 'undefined'
+        else:
+            status = 'passed'
+
+        track(status, scenario_state, feature_state)
+        wrt_event('example_finished', feature=scenario.feature.name,
+                  scenario=scenario.name, example=order + 1,
+                  status=status, reason=dump_reason(why))
+
+    @after.each_scenario
+    def scenario_finished(scenario):
+        if not scenario.steps:
+            # nothing tells whether it ran, nor could it fail
+            track('passed', scenario_state, feature_state)
+
+        duration, status = finish(scenario_state)
+        wrt_event('scenario_finished', feature=scenario.feature.name,
+                  scenario=scenario.name, status=status, duration=duration)
+
+    @after.all
+    def close_events(total):
+        global fd
+        wrt_event('run_finished', features_ran=total.features_ran,
+                  features_passed=total.features_passed,
+                  scenarios_ran=total.scenarios_ran,
+                  scenarios_passed=total.scenarios_passed,
+                  steps=total.steps, steps_passed=total.steps_passed,
+                  steps_failed=total.steps_failed,
+                  steps_skipped=total.steps_skipped,
+                  steps_undefined=total.steps_undefined)
+        if fd is not None:
+            os.close(fd)
+            fd = None
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import json
+
+from lettuce import timing
+from lettuce.plugins import wrt_output
+from lettuce.terrain import after
+
+def enable(filename=None):
+    output_filename = filename or "lettucehotspots.json"
+
+    @after.all
+    def output_json(total):
+        spots = timing.hotspots(total)
+        content = {
+            'steps': total.steps,
+            'steps_failed': total.steps_failed,
+            'load_duration': total.load_duration,
+            'hotspots': [spot.to_dict() for spot in spots],
+        }
+        wrt_output(output_filename, json.dumps(content, indent=2))
@@ -15,14 +15,14 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import os
-import sys
 import logging
 from lettuce import core
+from lettuce import console
 from lettuce.terrain import after
 from lettuce.terrain import before
 
 def wrt(what):
-    sys.stdout.write(what.encode('utf-8'))
+    console.write(what)
 
 @before.each_step
 def print_step_running(step):
@@ -88,3 +88,4 @@ def print_no_features_found(where):
         '\033[1;33m%s\033[0m\n' % where
     )
 
+console.flush_along_the_run()
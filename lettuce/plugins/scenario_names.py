@@ -16,16 +16,16 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
-import sys
 from lettuce import core
+from lettuce import console
+from lettuce.plugins import Failures
 from lettuce.terrain import after
 from lettuce.terrain import before
 
-failed_scenarios = []
-scenarios_and_its_fails = {}
+failures = Failures()
 
 def wrt(string):
-    sys.stdout.write(string.encode('utf-8'))
+    console.write(string)
 
 @before.each_scenario
 def print_scenario_running(scenario):
@@ -34,26 +34,23 @@ def print_scenario_running(scenario):
 @after.each_scenario
 def print_scenario_ran(scenario):
     if scenario.passed:
-        print "OK"
+        wrt("OK\n")
     elif scenario.failed:
-        reason = scenarios_and_its_fails[scenario]
+        reason = failures[scenario]
         if isinstance(reason.exception, AssertionError):
-            print "FAILED"
+            wrt("FAILED\n")
         else:
-            print "ERROR"
+            wrt("ERROR\n")
 
 @after.each_step
 def save_step_failed(step):
-    if step.failed and step.scenario not in failed_scenarios:
-        scenarios_and_its_fails[step.scenario] = step.why
-        failed_scenarios.append(step.scenario)
+    failures.gather(step)
 
 @after.all
 def print_end(total):
     if total.scenarios_passed < total.scenarios_ran:
-        print # just a line to separate things here
-        for scenario in failed_scenarios:
-            reason = scenarios_and_its_fails[scenario]
+        wrt("\n") # just a line to separate things here
+        for scenario, reason in failures:
             wrt(reason.traceback)
 
     wrt("\n")
@@ -101,3 +98,5 @@ def print_no_features_found(where):
         'could not find features at '
         '%s\n' % where
     )
+
+console.flush_along_the_run()
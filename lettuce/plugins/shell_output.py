@@ -16,14 +16,13 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
-import sys
 from lettuce import core
-from lettuce import strings
+from lettuce import console
 from lettuce.terrain import after
 from lettuce.terrain import before
 
 def wrt(what):
-    sys.stdout.write(what.encode('utf-8'))
+    console.write(what)
 
 @after.each_step
 def print_step_running(step):
@@ -32,7 +31,7 @@ def print_step_running(step):
         wrt(" (undefined)")
 
     wrt('\n')
-    if step.hashes:
+    if step.table:
         wrt(step.represent_hashes())
 
     if step.failed:
@@ -48,9 +47,8 @@ def print_scenario_running(scenario):
 
 @after.outline
 def print_outline(scenario, order, outline, reasons_to_fail):
-    table = strings.dicts_to_string(scenario.outlines, scenario.keys)
-    lines = table.splitlines()
-    head = lines.pop(0)
+    lines = scenario.examples_lines()
+    head = lines[0]
 
     wline = lambda x: wrt("%s%s\n" % (" " * scenario.table_indentation, x))
     if order is 0:
@@ -58,7 +56,7 @@ def print_outline(scenario, order, outline, reasons_to_fail):
         wrt("%s%s:\n" % (" " * scenario.indentation, scenario.language.first_of_examples))
         wline(head)
 
-    line = lines[order]
+    line = lines[order + 1]
     wline(line)
     if reasons_to_fail:
         print_spaced = lambda x: wrt("%s%s\n" % (" " * scenario.table_indentation, x))
@@ -139,3 +137,4 @@ def print_no_features_found(where):
         '%s\n' % where
     )
 
+console.flush_along_the_run()
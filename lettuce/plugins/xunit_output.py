@@ -14,53 +14,270 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""JUnit XML output, written as the run goes.
+
+Each testcase is appended to the file as soon as it is done, followed
+by the closing tags of the elements still open, so that the file is
+valid XML at any point of the run, even if lettuce dies halfway. The
+opening tags are padded with blanks, so that their counters can be
+rewritten in place.
+
+Testcases are either steps (the default) or scenarios, and they can be
+grouped within a testsuite per feature.
+"""
+from xml.sax.saxutils import quoteattr as _quoteattr
 
-import sys
-from datetime import datetime
 from lettuce.terrain import after
 from lettuce.terrain import before
-from xml.dom import minidom
+from lettuce.timing import clock
+
+STEP = 'step'
+SCENARIO = 'scenario'
+
+def text(value):
+    if isinstance(value, str):
+        return value.decode('utf-8', 'replace')
+
+    return unicode(value)
+
+def quoteattr(value):
+    return _quoteattr(text(value), {'\n': '&#10;', '\r': '&#13;', '\t': '&#9;'})
+
+def cdata(value):
+    return u'<![CDATA[%s]]>' % text(value).replace(u']]>', u']]]]><![CDATA[>')
+
+def make_test_case(classname, name, seconds, why=None):
+    xml = u'<testcase classname=%s name=%s time=%s' % (
+        quoteattr(classname), quoteattr(name), quoteattr(str(seconds)))
+
+    if why is None:
+        return xml + u'/>'
+
+    return xml + u'><failure message=%s>%s</failure></testcase>' % (
+        quoteattr(why.cause), cdata(why.traceback))
+
+class OpenElement(object):
+    """An element whose closing tag is yet to be written"""
+    padding = 48
+
+    def __init__(self, tag, name=None):
+        self.tag = tag
+        self.name = name
+        self.tests = 0
+        self.failed = 0
+        self.started = clock()
+        self.offset = None
+        self.width = None
+
+    def opening_tag(self):
+        attributes = []
+        if self.name is not None:
+            attributes.append(('name', self.name))
+
+        attributes.append(('tests', self.tests))
+        attributes.append(('failed', self.failed))
+        attributes.append(('time', "%.6f" % (clock() - self.started)))
+
+        tag = u'<%s %s' % (self.tag, u' '.join(
+            [u'%s=%s' % (key, quoteattr(value)) for key, value in attributes]))
+        tag = tag.encode('utf-8')
+        if self.width is None:
+            self.width = len(tag) + self.padding
+
+        return tag.ljust(self.width - 1) + '>'
+
+    def closing_tag(self):
+        return '</%s>' % self.tag
+
+class XunitWriter(object):
+    """Writes a JUnit XML file incrementally, see this module's
+    docstring"""
+    def __init__(self, filename, suite_per_feature=False):
+        self.stream = open(filename, 'wb')
+        self.suite_per_feature = suite_per_feature
+        self.suite = None
+        self.root = OpenElement(suite_per_feature and 'testsuites' or 'testsuite')
+
+        self.stream.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        self.end = self.stream.tell()
+        self._open(self.root)
+
+    def _open_elements(self):
+        return [element for element in (self.root, self.suite) if element]
+
+    def _append(self, data):
+        tail = ''.join([element.closing_tag() for element in
+                        reversed(self._open_elements())])
+
+        self.stream.seek(self.end)
+        self.stream.write(data + tail)
+        self.stream.truncate()
+        self.end += len(data)
+
+        for element in self._open_elements():
+            self.stream.seek(element.offset)
+            self.stream.write(element.opening_tag())
+
+        self.stream.flush()
 
+    def _open(self, element):
+        element.offset = self.end
+        self._append(element.opening_tag())
 
-def wrt_output(filename, content):
-    f = open(filename, "w")
-    f.write(content.encode('utf-8'))
-    f.close()
+    def open_suite(self, name):
+        if not self.suite_per_feature:
+            return
 
-def total_seconds(td):
-    return (td.microseconds + (td.seconds + td.days * 24 * 3600) * 1e6) / 1e6
+        self.close_suite()
+        self.suite = OpenElement('testsuite', name)
+        self._open(self.suite)
 
-def enable(filename=None):
+    def close_suite(self):
+        if self.suite is None:
+            return
+
+        suite, self.suite = self.suite, None
+        self.stream.seek(suite.offset)
+        self.stream.write(suite.opening_tag())
+        self._append(suite.closing_tag())
+
+    def add_test_case(self, xml, failed):
+        for element in self._open_elements():
+            element.tests += 1
+            element.failed += int(bool(failed))
+
+        self._append(xml.encode('utf-8'))
+
+    def close(self):
+        self.close_suite()
+        self._append('')
+        self.stream.close()
+
+class TestCaseRecorder(object):
+    """Takes the writer's place within worker processes, keeping what
+    would be written, so that the main process writes it instead"""
+    def __init__(self):
+        self.events = []
+
+    def open_suite(self, name):
+        self.events.append(('open_suite', (name,)))
+
+    def close_suite(self):
+        self.events.append(('close_suite', ()))
+
+    def add_test_case(self, xml, failed):
+        self.events.append(('add_test_case', (xml, failed)))
+
+writer = None
+output_filename = None
+granularity = STEP
+grouped = False
+scenario_state = {}
+
+def enable(filename=None, testcases=STEP, suite_per_feature=False):
+    global output_filename, granularity, grouped
 
-    doc = minidom.Document()
-    root = doc.createElement("testsuite")
     output_filename = filename or "lettucetests.xml"
+    granularity = testcases
+    grouped = suite_per_feature
+
+    @before.all
+    def open_xml():
+        global writer
+        writer = XunitWriter(output_filename, grouped)
+
+    @before.each_feature
+    def open_test_suite(feature):
+        if writer:
+            writer.open_suite(feature.name)
+
+    @after.each_feature
+    def close_test_suite(feature):
+        if writer:
+            writer.close_suite()
+
+    @before.each_scenario
+    def time_scenario(scenario):
+        scenario_state['started'] = clock()
+        scenario_state['steps'] = []
+        scenario_state['outlined'] = False
 
     @before.each_step
     def time_step(step):
-        step.started = datetime.now()
+        step.started = clock()
 
     @after.each_step
     def create_test_case(step):
+        if not writer:
+            return
+
+        if granularity == SCENARIO:
+            scenario_state.setdefault('steps', []).append(step)
+            return
+
         classname = "%s : %s" % (step.scenario.feature.name, step.scenario.name)
-        tc = doc.createElement("testcase")
-        tc.setAttribute("classname", classname)
-        tc.setAttribute("name", step.sentence)
-        tc.setAttribute("time", str(total_seconds((datetime.now() - step.started))))
+        started = getattr(step, 'started', None)
+        seconds = started is not None and clock() - started or 0.0
+        writer.add_test_case(
+            make_test_case(classname, step.sentence, seconds,
+                      step.failed and step.why or None),
+            step.failed)
+
+    @after.outline
+    def create_outline_test_case(scenario, order, outline, reasons_to_fail):
+        if not writer or granularity != SCENARIO:
+            return
+
+        now = clock()
+        seconds = now - scenario_state.get('started', now)
+        scenario_state['started'] = now
+        scenario_state['outlined'] = True
 
-        if step.failed:
-            cdata = doc.createCDATASection(step.why.traceback)
-            failure = doc.createElement("failure")
-            failure.setAttribute("message",step.why.cause)
-            failure.appendChild(cdata)
-            tc.appendChild(failure)
+        why = reasons_to_fail and reasons_to_fail[0] or None
+        name = u"%s (example %d)" % (scenario.name, order + 1)
+        writer.add_test_case(
+            make_test_case(scenario.feature.name, name, seconds, why),
+            why is not None)
 
-        root.appendChild(tc)
+    @after.each_scenario
+    def create_scenario_test_case(scenario):
+        if not writer or granularity != SCENARIO or scenario_state.get('outlined'):
+            return
+
+        seconds = clock() - scenario_state.get('started', clock())
+        failed = [step for step in scenario_state.get('steps', []) if step.failed]
+        why = failed and failed[0].why or None
+        writer.add_test_case(
+            make_test_case(scenario.feature.name, scenario.name, seconds, why),
+            why is not None)
 
     @after.all
-    def output_xml(total):
-        root.setAttribute("tests", str(total.steps))
-        root.setAttribute("failed", str(total.steps_failed))
-        doc.appendChild(root)
-        wrt_output(output_filename, doc.toxml())
+    def close_xml(total):
+        global writer
+        if writer:
+            writer.close()
+            writer = None
+
+def capture_test_cases():
+    """Makes worker processes keep their testcases to themselves, see
+    detach_test_cases"""
+    global writer
+    if writer is not None:
+        writer = TestCaseRecorder()
+
+def detach_test_cases():
+    """Takes what was written so far within a worker process, to be
+    sent back to the main process"""
+    if not isinstance(writer, TestCaseRecorder):
+        return []
+
+    events, writer.events = writer.events, []
+    return events
+
+def attach_test_cases(events):
+    """Writes down what a worker process has detached"""
+    if writer is None:
+        return
 
+    for method, args in events:
+        getattr(writer, method)(*args)
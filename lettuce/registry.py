@@ -14,10 +14,15 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import re
 import sys
+import sre_parse
+import sre_constants
 import threading
 import traceback
 
+from lettuce.timing import clock
+
 world = threading.local()
 world._set = False
 
@@ -55,7 +60,153 @@ class CallbackDict(CleanableDict):
                     callback_list.pop()
 
 
-STEP_REGISTRY = CleanableDict()
+class StepDict(CleanableDict):
+    """Holds the step definitions (regex -> function) and tells its
+    listeners (i.e.: the StepIndex) whenever it changes"""
+
+    def __init__(self, *args, **kw):
+        self.listeners = []
+        super(StepDict, self).__init__(*args, **kw)
+
+    def _changed(self):
+        for listener in self.listeners:
+            listener.invalidate()
+
+    def __setitem__(self, key, value):
+        super(StepDict, self).__setitem__(key, value)
+        self._changed()
+
+    def __delitem__(self, key):
+        super(StepDict, self).__delitem__(key)
+        self._changed()
+
+    def update(self, *args, **kw):
+        super(StepDict, self).update(*args, **kw)
+        self._changed()
+
+    def setdefault(self, key, default=None):
+        value = super(StepDict, self).setdefault(key, default)
+        self._changed()
+        return value
+
+    def pop(self, key, *args):
+        value = super(StepDict, self).pop(key, *args)
+        self._changed()
+        return value
+
+    def popitem(self):
+        item = super(StepDict, self).popitem()
+        self._changed()
+        return item
+
+class StepIndex(object):
+    """Precompiled lookup table for the step definitions within a
+    StepDict.
+
+    Keeps each regex compiled with and without re.I, rejects
+    definitions whose literal prefix can't be found within the
+    sentence before running the regex itself, and caches the match
+    for each sentence. The definitions are tried in the very same
+    order as STEP_REGISTRY.items(), so the first match wins just like
+    a plain linear scan.
+    """
+    def __init__(self, registry):
+        self.registry = registry
+        self.compiled = {}
+        self.entries = None
+        self.matches = {}
+        registry.listeners.append(self)
+
+    def invalidate(self):
+        self.entries = None
+        self.matches.clear()
+
+    def _literal_prefix(self, regex):
+        """Returns a tuple with the literal text every match of the
+        given regex must contain, and whether that regex ignores case
+        by itself (through inline flags)"""
+        try:
+            parsed = sre_parse.parse(regex)
+        except (sre_constants.error, TypeError):
+            return u'', False
+
+        chars = []
+        for opcode, value in parsed:
+            if opcode == sre_constants.AT:
+                if chars:
+                    break
+                continue
+
+            if opcode != sre_constants.LITERAL:
+                break
+
+            if value > 127:
+                # non-ascii literals may be compared in a different
+                # encoding than the sentence's, better not to rely on them
+                break
+
+            chars.append(unichr(value))
+
+        inline_ignore_case = bool(parsed.pattern.flags & sre_constants.SRE_FLAG_IGNORECASE)
+        return u''.join(chars), inline_ignore_case
+
+    def _compile(self, regex):
+        if regex not in self.compiled:
+            prefix, inline_ignore_case = self._literal_prefix(regex)
+            self.compiled[regex] = (
+                re.compile(regex),
+                re.compile(regex, re.I),
+                prefix,
+                prefix.lower(),
+                inline_ignore_case,
+            )
+
+        return self.compiled[regex]
+
+    def build(self):
+        """(Re)builds the index out of the current step definitions.
+        It is called once step definitions are loaded, and lazily
+        whenever a new definition is registered afterwards"""
+        self.entries = []
+        for regex, func in self.registry.items():
+            self.entries.append(self._compile(regex) + (func, ))
+
+        self.matches.clear()
+        return self
+
+    def match(self, sentence, ignore_case):
+        """Returns a tuple with the match object and the function of
+        the first step definition that matches the given sentence, or
+        (None, None) if there is no such definition"""
+        if self.entries is None:
+            self.build()
+
+        key = (sentence, bool(ignore_case))
+        if key in self.matches:
+            return self.matches[key]
+
+        lowered = sentence.lower()
+        found = None, None
+        for exact, insensitive, prefix, lowered_prefix, inline_i, func in self.entries:
+            if ignore_case or inline_i:
+                if lowered_prefix not in lowered:
+                    continue
+                regex = ignore_case and insensitive or exact
+            else:
+                if prefix not in sentence:
+                    continue
+                regex = exact
+
+            matched = regex.search(sentence)
+            if matched:
+                found = matched, func
+                break
+
+        self.matches[key] = found
+        return found
+
+STEP_REGISTRY = StepDict()
+STEP_INDEX = StepIndex(STEP_REGISTRY)
 CALLBACK_REGISTRY = CallbackDict(
     {
         'all': {
@@ -95,6 +246,9 @@ CALLBACK_REGISTRY = CallbackDict(
 )
 
 def call_hook(situation, kind, *args, **kw):
+    """Calls every callback registered for the given situation and
+    returns how long, in seconds, they took altogether"""
+    started = clock()
     for callback in CALLBACK_REGISTRY[kind][situation]:
         try:
             callback(*args, **kw)
@@ -103,6 +257,8 @@ def call_hook(situation, kind, *args, **kw):
             print
             sys.exit(2)
 
+    return clock() - started
+
 def clear():
     STEP_REGISTRY.clear()
     CALLBACK_REGISTRY.clear()
@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""The Runner, that finds, loads and runs features and step definitions
+under a given path, and loads terrain beforehand."""
+import os
+import sys
+import traceback
+from datetime import datetime
+
+from lettuce import fs
+from lettuce import ordering
+from lettuce import parallel
+from lettuce import sharding
+from lettuce import timing
+
+from lettuce.core import Feature, TotalResult, RunController
+
+from lettuce.registry import call_hook, STEP_REGISTRY
+from lettuce.exceptions import StepLoadingError
+from lettuce.plugins import xunit_output
+from lettuce.plugins import hotspots_output
+from lettuce.plugins import results_output
+from lettuce.plugins import events_output
+
+from lettuce import console
+from lettuce import exceptions
+
+# the terrain module loaded for each current dir, if any
+terrains = {}
+
+def load_terrain():
+    """Imports the conventional environment module "terrain", from the
+    current dir (or anywhere on sys.path), once per current dir"""
+    current_dir = os.getcwd()
+    if current_dir in terrains:
+        return terrains[current_dir]
+
+    try:
+        terrains[current_dir] = fs.FileSystem._import("terrain")
+    except Exception, e:
+        if not "No module named terrain" in str(e):
+            string = 'Lettuce has tried to load the conventional environment ' \
+                'module "terrain"\nbut it has errors, check its contents and ' \
+                'try to run lettuce again.\n\nOriginal traceback below:\n\n'
+
+            sys.stderr.write(string)
+            sys.stderr.write(exceptions.traceback.format_exc(e))
+            raise SystemExit(1)
+
+        terrains[current_dir] = None
+
+    return terrains[current_dir]
+
+def declare_terrain(step_manifest):
+    """Registers the step definitions of the "terrain" module within
+    the current dir that the step manifest tells of, without importing
+    it. Returns False when the module has to be imported to tell."""
+    for filename in ('terrain.py', os.path.join('terrain', '__init__.py')):
+        filename = os.path.join(os.getcwd(), filename)
+        if os.path.exists(filename):
+            declared = step_manifest.declare(filename)
+            if declared is None:
+                return False
+
+            STEP_REGISTRY.update(declared)
+            return True
+
+    return False
+
+class Runner(object):
+    """ Main lettuce's test runner
+
+    Takes a base path as parameter (string), so that it can look for
+    features and step definitions on there.
+    """
+    def __init__(self, base_path, scenarios=None, verbosity=0,
+                 enable_xunit=False, xunit_filename=None,
+                 xunit_testcases='step', xunit_suite_per_feature=False,
+                 run_controller=RunController(), processes=1,
+                 feature_cache=None, profile_dir=None,
+                 enable_hotspots=False, hotspots_filename=None,
+                 order='file', shard=None, enable_results=False,
+                 results_filename=None, enable_events=False,
+                 events_filename=None, file_cache=None, step_manifest=None,
+                 walk_threads=1, parser=None, output_buffer=None,
+                 shard_history=None):
+        """ lettuce.Runner will try to find a terrain.py file and
+        import it from within the current dir, once, unless only
+        checking the syntax with a step manifest: then it is only
+        imported when the manifest can't tell about it
+        """
+        if not (run_controller.only_syntax_check and step_manifest):
+            load_terrain()
+
+        self.single_feature = None
+        if os.path.isfile(base_path) and os.path.exists(base_path):
+            self.single_feature = base_path
+            base_path = os.path.dirname(base_path)
+
+        sys.path.insert(0, base_path)
+        self.loader = fs.FeatureLoader(base_path, file_cache=file_cache,
+                                       walk_threads=walk_threads,
+                                       step_manifest=step_manifest)
+        self.verbosity = verbosity
+        self.scenarios = scenarios and map(int, scenarios.split(",")) or None
+        self.run_controller = run_controller
+        self.processes = processes
+        self.feature_cache = feature_cache
+        self.parser = parser
+        self.profiler = profile_dir and timing.Profiler(profile_dir) or None
+        self.order = order
+        self.ordering = ordering.get_ordering(order, run_controller)
+        self.shard = shard
+        self.shard_history = shard_history
+        self.feature_for_test = None
+
+        sys.path.remove(base_path)
+
+        if verbosity is 0:
+            from lettuce.plugins import non_verbose as output
+        elif verbosity is 1:
+            from lettuce.plugins import dots as output
+        elif verbosity is 2:
+            from lettuce.plugins import scenario_names as output
+        elif verbosity is 3:
+            from lettuce.plugins import shell_output as output
+        else:
+            from lettuce.plugins import colored_shell_output as output
+
+        if enable_xunit:
+            xunit_output.enable(filename=xunit_filename,
+                                testcases=xunit_testcases,
+                                suite_per_feature=xunit_suite_per_feature)
+
+        if enable_hotspots:
+            hotspots_output.enable(filename=hotspots_filename)
+
+        if enable_results:
+            results_output.enable(filename=results_filename)
+
+        if enable_events:
+            events_output.enable(filename=events_filename)
+
+        # None stands for the default of console.Console
+        console.console.buffer_size = output_buffer
+        reload(output)
+
+        self.output = output
+
+    def load_feature(self, filename):
+        """ Parses the given feature file, unless it is already within
+        the feature cache
+        """
+        if self.feature_cache:
+            return Feature.from_file(filename, self.feature_cache,
+                                     parser=self.parser)
+
+        return Feature.from_file(filename, parser=self.parser)
+
+    def run_feature(self, feature, scenarios=None):
+        """ Runs the given feature, under the profiler if there is one
+        """
+        if scenarios is None:
+            scenarios = self.scenarios
+
+        if self.run_controller.should_stop():
+            return feature.not_run(scenarios)
+
+        if self.profiler:
+            return self.profiler.run(feature, self.run_controller, scenarios,
+                                     ordering=self.ordering)
+
+        return feature.run(self.run_controller, scenarios,
+                           ordering=self.ordering)
+
+    def select_scenarios(self, features):
+        """ Tells which scenarios of each of the given features are to
+        run (by id of the feature), leaving out the features that have
+        none within this runner's shard. Shards are split by the durations
+        within the shard history file, if any, or else by step counts, so
+        that every executor splits them the same way
+        """
+        if not self.shard:
+            return dict([(id(feature), self.scenarios) for feature in features])
+
+        index, count = self.shard
+        estimator = ordering.Estimator(sharding.read_history(self.shard_history))
+        shards = sharding.split(features, count, estimator, self.scenarios)
+        return dict([(id(feature), scenarios)
+                     for feature, scenarios in shards[index - 1]])
+
+    def run(self, features_files=None):
+        """ Find and load step definitions, and them find and load
+        features under `base_path` specified on constructor
+
+        Given a list of feature files, runs only those, with the step
+        definitions that are already loaded (see watch.Watcher)
+        """
+        stdout = console.hold_stdout()
+        try:
+            return self._run(features_files)
+        finally:
+            console.release_stdout(stdout)
+
+    def _run(self, features_files):
+        started_at = datetime.now()
+        load_duration = 0.0
+        if features_files is None:
+            try:
+                load_started = timing.clock()
+                if self.run_controller.only_syntax_check and self.loader.step_manifest:
+                    if not declare_terrain(self.loader.step_manifest):
+                        load_terrain()
+                    self.loader.find_and_declare_step_definitions(
+                        before_importing=load_terrain)
+                else:
+                    self.loader.find_and_load_step_definitions()
+                load_duration = timing.clock() - load_started
+            except StepLoadingError, e:
+                print "Error loading step definitions:\n", e
+                return
+
+        call_hook('before', 'all')
+
+        results = []
+        if features_files is None:
+            if self.single_feature:
+                features_files = [self.single_feature]
+            else:
+                features_files = self.loader.find_feature_files()
+
+        if not features_files:
+            self.output.print_no_features_found(self.loader.base_dir)
+            console.flush()
+            return
+
+        failed = False
+        try:
+            in_parallel = self.processes > 1 and len(features_files) > 1
+            if in_parallel or self.shard or self.order != 'file':
+                # every feature has to be parsed before they can be split
+                # into shards or sorted
+                features = map(self.load_feature, features_files)
+                selected = self.select_scenarios(features)
+                features = [feature for feature in features if id(feature) in selected]
+                features = self.ordering.sort_features(features)
+                if in_parallel and len(features) > 1:
+                    self.feature_for_test = features[-1]
+                    results.extend(parallel.run_features(
+                        features,
+                        self.processes,
+                        self.run_controller,
+                        profiler=self.profiler,
+                        ordering=self.ordering,
+                        feature_scenarios=[selected[id(feature)] for feature in features],
+                        output=self.output))
+                else:
+                    for feature in features:
+                        self.feature_for_test = feature
+                        results.append(self.run_feature(feature, selected[id(feature)]))
+            else:
+                for filename in features_files:
+                    feature = self.load_feature(filename)
+                    self.feature_for_test = feature
+                    results.append(self.run_feature(feature))
+        except exceptions.LettuceSyntaxError, e:
+            sys.stderr.write(e.msg)
+            failed = True
+        except:
+            e = sys.exc_info()[1]
+            console.flush()
+            print "Died with "+str(e)
+            traceback.print_exc()
+            failed = True
+
+        finally:
+            if failed:
+                raise SystemExit(2)
+
+            total = TotalResult(results, self.run_controller.only_syntax_check)
+            total.load_duration = load_duration
+
+            self.run_controller.finished(total)
+
+            call_hook('after', 'all', total)
+            console.flush()
+
+            if self.profiler:
+                print "(profiled, see %s)" % self.profiler.write_report(total)
+
+            if self.run_controller.should_stop():
+                print "(stopped after %d failed scenarios)" % self.run_controller.max_failures
+
+            finished_at = datetime.now()
+            time_took = finished_at - started_at
+
+            hours = time_took.seconds / 60 / 60
+            minutes = time_took.seconds / 60
+            seconds = time_took.seconds
+            if hours:
+                print  "(finished within %d hours)" % hours
+            elif minutes:
+                print  "(finished within %d minutes)" % minutes
+            elif seconds:
+                print  "(finished within %d seconds)" % seconds
+
+            return total
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Splitting of a run into shards, and merging of their results.
+
+Every shard splits the same features the same way, so each of them can
+pick its own share without talking to the others: scenarios are handed
+out, the longest first, to whichever shard has the least work so far.
+How long a scenario takes is told by ordering.Estimator, from its
+steps or, when every shard is given the very same history file (a
+.lettuceids file PrevResultPersister wrote on a previous run), from the
+durations in there. The history is only read, never written, and each
+shard's own .lettuceids is left out, as it differs between executors.
+
+Each shard writes its results down as JSON (see
+plugins.results_output), which `lettuce merge-results` reads back into a
+single TotalResult.
+"""
+import os
+import json
+
+from lettuce.core import fs
+from lettuce.core import TotalResult
+from lettuce.core import PrevResultPersister
+
+def parse_shard(value):
+    """Turns "K/N" into (K, N), K being 1-based"""
+    try:
+        index, count = map(int, value.split("/"))
+    except ValueError:
+        raise ValueError('A shard is given as K/N, not "%s"' % value)
+
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError('There is no shard %d out of %d' % (index, count))
+
+    return index, count
+
+def suffixed_filename(filename, suffix):
+    """lettucetests.xml, suffixed with 2, becomes lettucetests-2.xml"""
+    root, extension = os.path.splitext(filename)
+    return "%s-%s%s" % (root, suffix, extension)
+
+def shard_filename(filename, shard):
+    """Tells the file the given shard writes what would go to `filename`
+    when not sharded: lettucetests.xml becomes lettucetests-2.xml"""
+    if not shard:
+        return filename
+
+    return suffixed_filename(filename, shard[0])
+
+def read_history(filename):
+    """Reads the durations to split shards by out of the given
+    .lettuceids file, if any, never writing it"""
+    if not filename:
+        return {}
+
+    if not os.path.exists(filename):
+        raise IOError('There is no shard history file %s' % filename)
+
+    return PrevResultPersister(filename).read_previous_results()
+
+def split(features, count, estimator, scenarios=None):
+    """Splits the scenarios of the given features into `count` shards of
+    about the same estimated duration. Only the scenarios at the given
+    1-based positions are split, if any.
+
+    Returns a list holding, for each shard, a list of (feature, [1-based
+    positions of its scenarios]), in the order the features were given.
+    """
+    units = []
+    for feature in features:
+        for index, scenario in enumerate(feature.scenarios):
+            if scenarios and (index + 1) not in scenarios:
+                continue
+
+            filename = scenario.with_file and fs.project_path(scenario.with_file)
+            units.append((estimator.scenario(scenario), filename, index + 1, feature))
+
+    # the longest first, then by file rather than by the order features
+    # were found in, so that every shard splits the same way
+    units.sort(key=lambda unit: (-unit[0], unit[1], unit[2]))
+
+    loads = [0.0] * count
+    taken = [{} for shard in range(count)]
+    for duration, filename, index, feature in units:
+        shard = loads.index(min(loads))
+        loads[shard] += duration
+        taken[shard].setdefault(id(feature), []).append(index)
+
+    shards = []
+    for positions in taken:
+        shards.append([(feature, sorted(positions[id(feature)]))
+                       for feature in features if id(feature) in positions])
+
+    return shards
+
+def dump_step(step, status):
+    data = {
+        'sentence': step.sentence,
+        'status': status,
+        'duration': step.duration,
+    }
+    if status == 'undefined':
+        data['proposed_sentence'] = step.proposed_sentence
+        data['proposed_method_name'] = step.proposed_method_name
+
+    return data
+
+def dump_total(total):
+    """Turns a TotalResult into plain data that can be written as JSON"""
+    features = []
+    for feature_result in total.feature_results:
+        scenarios = []
+        for scenario_result in feature_result.scenario_results:
+            steps = []
+            for step in scenario_result.all_steps:
+                if step in scenario_result.steps_failed:
+                    status = 'failed'
+                elif step in scenario_result.steps_undefined:
+                    status = 'undefined'
+                elif step in scenario_result.steps_passed:
+                    status = 'passed'
+                else:
+                    status = 'skipped'
+
+                steps.append(dump_step(step, status))
+
+            why = [step.why.traceback for step in scenario_result.steps_failed
+                   if step.why]
+            scenarios.append({
+                'name': scenario_result.scenario.name,
+                'not_run': scenario_result.not_run,
+                'duration': scenario_result.duration,
+                'steps': steps,
+                'tracebacks': why,
+            })
+
+        described_at = feature_result.feature.described_at
+        features.append({
+            'name': feature_result.feature.name,
+            'file': described_at and described_at.file or None,
+            'duration': feature_result.duration,
+            'scenarios': scenarios,
+        })
+
+    return {
+        'only_syntax_check': total.only_syntax_check,
+        'load_duration': total.load_duration,
+        'features': features,
+    }
+
+class StepSummary(object):
+    """A step as told by a results file"""
+    def __init__(self, data):
+        self.sentence = self.original_sentence = data['sentence']
+        self.status = data['status']
+        self.duration = data['duration']
+        self.proposed_sentence = data.get('proposed_sentence')
+        self.proposed_method_name = data.get('proposed_method_name')
+
+    def represent_string(self, string):
+        return u"    %s" % string
+
+class ScenarioSummary(object):
+    """A ScenarioResult as told by a results file"""
+    def __init__(self, data):
+        self.name = data['name']
+        self.not_run = data['not_run']
+        self.duration = data['duration']
+        self.tracebacks = data['tracebacks']
+        self.all_steps = [StepSummary(step) for step in data['steps']]
+        for status in ('passed', 'failed', 'skipped', 'undefined'):
+            setattr(self, 'steps_%s' % status,
+                    [step for step in self.all_steps if step.status == status])
+
+        self.total_steps = len(self.all_steps)
+
+    @property
+    def passed(self):
+        return not self.not_run and \
+            self.total_steps == len(self.steps_passed) + len(self.steps_skipped)
+
+    @property
+    def failed(self):
+        return len(self.steps_failed) > 0
+
+class FeatureSummary(object):
+    """A FeatureResult as told by a results file"""
+    def __init__(self, data):
+        self.name = data['name']
+        self.file = data['file']
+        self.duration = data['duration']
+        self.scenario_results = [ScenarioSummary(scenario)
+                                 for scenario in data['scenarios']]
+
+    @property
+    def passed(self):
+        return all([result.passed for result in self.scenario_results])
+
+    @property
+    def not_run(self):
+        return bool(self.scenario_results) and \
+            all([result.not_run for result in self.scenario_results])
+
+def merge_results(filenames):
+    """Reads the given results files, written by shards of the same run,
+    back into a single TotalResult"""
+    feature_results = []
+    by_feature = {}
+    only_syntax_check = False
+    load_duration = None
+    for filename in filenames:
+        f = open(filename)
+        try:
+            data = json.load(f)
+        finally:
+            f.close()
+
+        only_syntax_check = only_syntax_check or data['only_syntax_check']
+        if data['load_duration'] is not None:
+            load_duration = max(load_duration, data['load_duration'])
+
+        # the scenarios of a feature may be split across shards
+        for feature in data['features']:
+            result = FeatureSummary(feature)
+            key = result.file, result.name
+            if key in by_feature:
+                by_feature[key].scenario_results.extend(result.scenario_results)
+            else:
+                by_feature[key] = result
+                feature_results.append(result)
+
+    total = TotalResult(feature_results, only_syntax_check)
+    total.load_duration = load_duration
+    return total
@@ -17,6 +17,14 @@
 
 import re
 import time
+from itertools import izip, izip_longest
+
+# compiled regexes, by the arguments of the helpers that build them,
+# as those helpers run for each line of each feature. A separator
+# split_wisely can split on without any regex maps to None.
+_split_regexes = {}
+_startswith_regexes = {}
+_remove_regexes = {}
 
 def escape_if_necessary(what):
     what = unicode(what)
@@ -25,17 +33,17 @@ def escape_if_necessary(what):
 
     return what
 
+def is_caseless(what):
+    """True if ignoring case makes no difference for `what`"""
+    return what.lower() == what.upper()
+
 def get_stripped_lines(string, ignore_lines_starting_with=''):
-    string = unicode(string)
-    lines = [unicode(l.strip()) for l in string.splitlines()]
+    lines = [line.strip() for line in unicode(string).splitlines()]
     if ignore_lines_starting_with:
-        filter_func = lambda x: x and not x.startswith(ignore_lines_starting_with)
-    else:
-        filter_func = lambda x: x
+        return [line for line in lines
+                if line and not line.startswith(ignore_lines_starting_with)]
 
-    lines = filter(filter_func, lines)
-
-    return lines
+    return [line for line in lines if line]
 
 def split_wisely(string, sep, strip=False):
     string = unicode(string)
@@ -45,95 +53,124 @@ def split_wisely(string, sep, strip=False):
         string=string.strip("\n")
     sep = unicode(sep)
 
-    regex = re.compile(escape_if_necessary(sep),  re.UNICODE | re.M | re.I)
+    if sep not in _split_regexes:
+        if len(sep) == 1 and is_caseless(sep) and sep not in u"^\\":
+            # the regex would be a char class matching just sep
+            _split_regexes[sep] = None
+        else:
+            _split_regexes[sep] = re.compile(
+                escape_if_necessary(sep), re.UNICODE | re.M | re.I)
+
+    regex = _split_regexes[sep]
+    if regex is None:
+        items = string.split(sep)
+    else:
+        items = regex.split(string)
 
-    items = filter(lambda x: x, regex.split(string))
     if strip:
-        items = [i.strip() for i in items]
-    else:
-        items = [i.strip("\n") for i in items]
+        return [i.strip() for i in items if i]
 
-    return [unicode(i) for i in items]
+    return [i.strip("\n") for i in items if i]
 
 def wise_startswith(string, seed):
     string = unicode(string).strip()
     seed = unicode(seed)
-    regex = u"^%s" % re.escape(seed)
-    return bool(re.search(regex, string, re.I))
+    if is_caseless(seed):
+        return string.startswith(seed)
+
+    regex = _startswith_regexes.get(seed)
+    if regex is None:
+        regex = _startswith_regexes[seed] = re.compile(
+            u"^%s" % re.escape(seed), re.I)
+
+    return bool(regex.match(string))
 
 def remove_it(string, what):
-    return unicode(re.sub(unicode(what), "", unicode(string)).strip())
+    what = unicode(what)
+    regex = _remove_regexes.get(what)
+    if regex is None:
+        regex = _remove_regexes[what] = re.compile(what)
+
+    return regex.sub(u"", unicode(string)).strip()
 
 def rfill(string, times, char=u" ", append=u""):
     string = unicode(string)
     missing = times - len(string)
-    for x in range(missing):
-        string += char
+    if missing > 0:
+        string += char * missing
 
-    return unicode(string) + unicode(append)
+    return string + unicode(append)
 
 def getlen(string):
     return len(string) + 1
 
+def columns_to_lines(keys, columns):
+    """Yields the lines of the table with the given keys, out of the
+    list of the values under each key. The width of each column is
+    computed once, then rows are rendered one at a time."""
+    def pad(value, size):
+        value = u" %s%s" % (value, u" " * (size - len(value)))
+        if u"|" in value:
+            value = value.replace(u"|", u"\\|")
+
+        return value
+
+    padded = []
+    for key, column in zip(keys, columns):
+        key = unicode(key)
+        column = [u'' if value is None else unicode(value) for value in column]
+        size = getlen(max([key] + column, key=len))
+        padded.append([pad(key, size)] + [pad(value, size) for value in column])
+
+    for row in izip(*padded):
+        yield u"|%s|" % u"|".join(row)
+
 def dicts_to_string(dicts, order):
-    escape = "#{%s}" % str(time.time())
-    def enline(line):
-        return unicode(line).replace("|", escape)
-    def deline(line):
-        return line.replace(escape, '\\|')
-
-    keys_and_sizes = dict([(k, getlen(k)) for k in dicts[0].keys()])
-    for key in keys_and_sizes:
-        for data in dicts:
-            current_size = keys_and_sizes[key]
-            value = unicode(data.get(key, ''))
-            size = getlen(value)
-            if size > current_size:
-                keys_and_sizes[key] = size
-
-    names = []
-    for key in order:
-        size = keys_and_sizes[key]
-        name = u" %s" % rfill(key, size)
-        names.append(enline(name))
-
-    table = [u"|%s|" % "|".join(names)]
-    for data in dicts:
-        names = []
-        for key in order:
-            value = data.get(key, '')
-            size = keys_and_sizes[key]
-            names.append(enline(u" %s" % rfill(value, size)))
-
-        table.append(u"|%s|" % "|".join(names))
-
-    return deline(u"\n".join(table) + u"\n")
+    columns = [[data.get(key, u'') for data in dicts] for key in order]
+    return u"\n".join(columns_to_lines(order, columns)) + u"\n"
 
-def parse_hashes(lines):
+def parse_table(lines):
+    """Returns the keys of the given table lines, and the list of the
+    values of each row"""
     escape = "#{%s}" % str(time.time())
-    def enline(line):
-        return unicode(line.replace("\\|", escape)).strip()
     def deline(line):
         return line.replace(escape, '|')
-    def discard_comments(lines):
-        return [line for line in lines if not line.startswith('#')]
 
-    lines = discard_comments(lines)
-    lines = map(enline, lines)
+    lines = [unicode(line.replace("\\|", escape)).strip()
+             for line in lines if not line.startswith('#')]
 
     keys = []
-    hashes = []
+    rows = []
     if lines:
-        first_line = lines.pop(0)
-        keys = split_wisely(first_line, u"|", True)
-        keys = map(deline, keys)
+        keys = [deline(key) for key in split_wisely(lines[0], u"|", True)]
+
+        for line in lines[1:]:
+            # split_wisely(line, u"|", True), as lines are stripped already
+            if escape in line:
+                values = [deline(value.strip()) for value in line.split(u"|") if value]
+            else:
+                values = [value.strip() for value in line.split(u"|") if value]
+            rows.append(values)
+
+    return keys, rows
+
+def parse_hashes(lines):
+    keys, rows = parse_table(lines)
+    return keys, [dict(zip(keys, values)) for values in rows]
+
+def parse_columns(lines):
+    """Returns the keys of the given table lines, and the list of the
+    values under each key, None standing for the cells short rows miss
+    """
+    keys, rows = parse_table(lines)
+    if not rows:
+        return keys, [[] for key in keys]
 
-        for line in lines:
-            values = split_wisely(line, u"|", True)
-            values = map(deline, values)
-            hashes.append(dict(zip(keys, values)))
+    columns = map(list, izip_longest(*rows))[:len(keys)]
+    while len(columns) < len(keys):
+        columns.append([None] * len(rows))
 
-    return keys, hashes
+    return keys, columns
 
 def parse_multiline(lines):
     multilines = []
@@ -153,6 +190,10 @@ def parse_multiline(lines):
 tag_stealing_regex = re.compile(ur"\s*\@(?P<name>[\w_-]+)[\s,]*", re.U)
 def steal_tags_from_line(possible_tag_line, tags):
     """returns true if this line contained some tags"""
+    if u'@' not in possible_tag_line:
+        # only lines of spaces count then
+        return not possible_tag_line.strip(u" ")
+
     found = tag_stealing_regex.search(possible_tag_line)
     found_tags = []
     if found or len(possible_tag_line.strip()) == 0:
@@ -183,14 +224,8 @@ def steal_tags_from_lines(lines):
 
     a filtered version of the "lines" variable, without lines of tags)
     """
-    regex = re.compile(ur'(^|\s+|[,])[@](?P<name>[\w_-]+)[\s,]*', re.U)
     tags = []
+    lines[:] = [line for line in lines
+                if not steal_tags_from_line(line, tags)]
 
-    for possible_tag_line in lines:
-        is_tag_line = steal_tags_from_line(possible_tag_line, tags)
-        if is_tag_line:
-            lines.remove(possible_tag_line)
     return tags, lines
-
-
-
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Timing and profiling of lettuce runs.
+
+Durations are measured with `clock`, a monotonic timer wherever there
+is one (see monotonic_clock), so that they are never thrown off by the
+system clock being set, and are kept in seconds on the very objects
+they belong to:
+
+    * Step.duration: time spent within the step definition
+    * Step.hooks_duration: time spent within before/after each step hooks
+    * ScenarioResult.duration and ScenarioResult.hooks_duration
+    * FeatureResult.duration, .hooks_duration and .parse_duration
+    * TotalResult.load_duration: time spent loading step definitions
+"""
+import os
+import sys
+import math
+import time
+import cProfile
+from timeit import default_timer
+
+# clock_gettime's clock ids, by platform
+CLOCK_MONOTONIC = {
+    'linux': 1,
+    'freebsd': 4,
+    'darwin': 6,
+}
+
+def monotonic_clock():
+    """Returns a function giving seconds from a monotonic clock: the
+    standard one if any, else clock_gettime(CLOCK_MONOTONIC) through
+    ctypes, else the default timer (which is monotonic on Windows)"""
+    if hasattr(time, 'monotonic'):
+        return time.monotonic
+
+    platform = sys.platform.rstrip('0123456789')
+    if platform not in CLOCK_MONOTONIC:
+        return default_timer
+
+    try:
+        import ctypes
+        import ctypes.util
+
+        class timespec(ctypes.Structure):
+            _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+        libraries = [ctypes.util.find_library('c'), ctypes.util.find_library('rt')]
+        for library in filter(None, libraries):
+            clock_gettime = getattr(ctypes.CDLL(library), 'clock_gettime', None)
+            if clock_gettime is not None:
+                break
+        else:
+            return default_timer
+    except (ImportError, OSError):
+        return default_timer
+
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+    clock_id = CLOCK_MONOTONIC[platform]
+    now = timespec()
+    if clock_gettime(clock_id, ctypes.byref(now)) != 0:
+        return default_timer
+
+    def clock():
+        now = timespec()
+        clock_gettime(clock_id, ctypes.byref(now))
+        return now.tv_sec + now.tv_nsec * 1e-9
+
+    return clock
+
+clock = monotonic_clock()
+
+def slowest_steps(total, limit=50):
+    """Returns the `limit` slowest steps ran, the slowest first"""
+    steps = []
+    for result in total.scenario_results:
+        steps.extend([step for step in result.all_steps if step.duration is not None])
+
+    steps.sort(key=lambda step: step.duration, reverse=True)
+    return steps[:limit]
+
+class Hotspot(object):
+    """What a single step definition has cost across a whole run: how
+    many steps it ran, how long they took and how many of them failed"""
+    def __init__(self, filename, line, function_name):
+        self.file = filename
+        self.line = line
+        self.function = function_name
+        self.durations = []
+        self.failures = 0
+
+    def add(self, step):
+        self.durations.append(step.duration)
+        if step.failed:
+            self.failures += 1
+
+    @property
+    def calls(self):
+        return len(self.durations)
+
+    @property
+    def total(self):
+        return sum(self.durations)
+
+    @property
+    def mean(self):
+        return self.total / self.calls
+
+    @property
+    def p95(self):
+        """The 95th percentile, by the nearest-rank method"""
+        durations = sorted(self.durations)
+        rank = int(math.ceil(0.95 * len(durations)))
+        return durations[max(rank, 1) - 1]
+
+    def to_dict(self):
+        return {
+            'file': self.file,
+            'line': self.line,
+            'function': self.function,
+            'calls': self.calls,
+            'total': self.total,
+            'mean': self.mean,
+            'p95': self.p95,
+            'failures': self.failures,
+        }
+
+def hotspots(total):
+    """Aggregates every step ran within the given TotalResult by its
+    step definition, returning Hotspot objects, the costliest first"""
+    found = {}
+    for result in total.scenario_results:
+        for step in result.all_steps:
+            if step.duration is None or not step.defined_at:
+                continue
+
+            definition = step.defined_at
+            key = definition.file, definition.line
+            if key not in found:
+                found[key] = Hotspot(definition.file, definition.line,
+                                     definition.function.__name__)
+
+            found[key].add(step)
+
+    spots = found.values()
+    spots.sort(key=lambda spot: spot.total, reverse=True)
+    return spots
+
+def slowest_definitions(total, limit=50):
+    """Returns the `limit` step definitions that took longer, summing up
+    every step they have ran, as (file, line, calls, seconds) tuples"""
+    return [(spot.file, spot.line, spot.calls, spot.total)
+            for spot in hotspots(total)[:limit]]
+
+class Profiler(object):
+    """Runs each feature under cProfile, dumping its stats to a file of
+    its own within `directory`, so that they can be read with pstats or
+    any tool that understands them"""
+    report_filename = 'slowest.txt'
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+
+    def stats_filename(self, feature):
+        name = feature.described_at and feature.described_at.file or feature.name
+        name = name.replace(os.sep, '.').replace(' ', '_')
+        return os.path.join(self.directory, "%s.prof" % name)
+
+    def _make_directory(self):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+    def run(self, feature, *args, **kw):
+        """Runs the given feature, taking arguments for Feature.run"""
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(feature.run, *args, **kw)
+        finally:
+            self._make_directory()
+            profile.dump_stats(self.stats_filename(feature))
+
+    def write_report(self, total, limit=50):
+        """Writes down the slowest steps and step definitions of the
+        given TotalResult, returning the report's filename"""
+        lines = []
+        if total.load_duration is not None:
+            lines.append(u"step definitions loaded in %.4fs" % total.load_duration)
+
+        parsing = [result.parse_duration for result in total.feature_results
+                   if result.parse_duration is not None]
+        lines.append(u"features parsed in %.4fs" % sum(parsing))
+        lines.append(u"")
+
+        lines.append(u"slowest %d steps:" % limit)
+        for step in slowest_steps(total, limit):
+            lines.append(u"  %.4fs  %s  # %s:%s" % (
+                step.duration, step.sentence,
+                step.described_at.file, step.described_at.line))
+
+        lines.append(u"")
+        lines.append(u"slowest %d step definitions:" % limit)
+        for filename, line, calls, seconds in slowest_definitions(total, limit):
+            lines.append(u"  %.4fs  %d calls  %s:%d" % (seconds, calls, filename, line))
+
+        self._make_directory()
+        filename = os.path.join(self.directory, self.report_filename)
+        f = open(filename, 'w')
+        try:
+            f.write(u"\n".join(lines).encode('utf-8') + "\n")
+        finally:
+            f.close()
+
+        return filename
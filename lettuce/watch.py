@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Watch mode: `lettuce --watch`
+
+Runs everything once, then keeps the process (terrain, step definitions
+and all) around, polling feature files and step modules for changes.
+Whenever some of them change, the step definitions and hooks of the
+touched modules are forgotten and those modules imported again, and
+only the scenarios within changed feature files, or that used the
+touched modules last time they ran, are run again. So are the feature
+files that had undefined steps, whenever any step module changes.
+"""
+import os
+import time
+import traceback
+
+from lettuce.fs import FileSystem
+from lettuce.changes import source_file, ChangedFiles, DependencyPersister
+from lettuce.registry import STEP_REGISTRY, STEP_INDEX, CALLBACK_REGISTRY
+
+def defined_in(function, modules):
+    code = getattr(function, 'func_code', None)
+    return code is not None and source_file(code.co_filename) in modules
+
+def forget_definitions(modules):
+    """Removes the step definitions and callbacks defined within the
+    given modules (source files) from the registries"""
+    for regex, function in STEP_REGISTRY.items():
+        if defined_in(function, modules):
+            del STEP_REGISTRY[regex]
+
+    for action_dict in CALLBACK_REGISTRY.values():
+        for callbacks in action_dict.values():
+            callbacks[:] = [callback for callback in callbacks
+                            if not defined_in(callback, modules)]
+
+class Watcher(object):
+    """Runs the given Runner over and over, whenever the files it
+    depends on change. It stands for the runner itself, so `run()`
+    returns the results of the last run, once interrupted."""
+    def __init__(self, runner, interval=1.0):
+        self.runner = runner
+        self.loader = runner.loader
+        self.run_controller = runner.run_controller
+        self.interval = interval
+        self.mtimes = {}
+        # feature files with undefined steps, as source files
+        self.undefined = set()
+
+        # the dependencies of each scenario tell what to run again
+        if not self.run_controller.dependency_persister:
+            self.run_controller.dependency_persister = DependencyPersister()
+
+    def feature_files(self):
+        if self.runner.single_feature:
+            return [self.runner.single_feature]
+
+        return self.loader.locate('*.feature')
+
+    def snapshot(self):
+        """Returns the mtime of each feature file and step module"""
+        self.loader.files = None
+        mtimes = {}
+        for filename in self.feature_files() + self.loader.locate('*.py'):
+            try:
+                mtimes[filename] = os.stat(filename).st_mtime
+            except OSError:
+                pass
+
+        return mtimes
+
+    def changes(self):
+        """Returns the files that were changed, added or removed since
+        last time"""
+        mtimes = self.snapshot()
+        changed = [filename for filename in set(mtimes) | set(self.mtimes)
+                   if mtimes.get(filename) != self.mtimes.get(filename)]
+        self.mtimes = mtimes
+        return changed
+
+    def reload(self, modules):
+        """Forgets what the given step modules defined, and imports
+        again those that are still there"""
+        forget_definitions(set(map(source_file, modules)))
+        for filename in modules:
+            if os.path.exists(filename):
+                self.loader.load_step_definitions(filename)
+
+        STEP_INDEX.build()
+
+    def affected_features(self, changed):
+        """Returns the feature files that were changed, or have
+        scenarios that depend on any of the changed files"""
+        affected = set()
+        for identity, modules in self.run_controller.dependencies.items():
+            if identity[0] and modules & changed:
+                affected.add(identity[0])
+
+        return [filename for filename in self.feature_files()
+                if source_file(filename) in changed or
+                FileSystem.project_path(filename) in affected]
+
+    def remember_undefined(self, result):
+        """Keeps which feature files have undefined steps, that new
+        step definitions may define"""
+        if not result:
+            return
+
+        ran = set()
+        undefined = set()
+        for feature_result in result.feature_results:
+            for scenario_result in feature_result.scenario_results:
+                filename = scenario_result.scenario.with_file
+                filename = filename and source_file(filename)
+                ran.add(filename)
+                if scenario_result.steps_undefined:
+                    undefined.add(filename)
+
+        self.undefined = (self.undefined - ran) | undefined
+
+    def run_again(self, changed):
+        """Runs the scenarios affected by the given changed files"""
+        modules = [filename for filename in changed if filename.endswith('.py')]
+        changed = set(map(source_file, changed))
+        if modules:
+            self.reload(modules)
+            changed |= self.undefined
+
+        features_files = self.affected_features(changed)
+        if not features_files:
+            return None
+
+        controller = self.run_controller
+        controller.changed_files = ChangedFiles(files=changed)
+        controller.failures = 0
+        try:
+            result = self.runner.run(features_files)
+            self.remember_undefined(result)
+            return result
+        finally:
+            controller.changed_files = None
+            if controller.prev_result_persister:
+                controller.previous_results = \
+                    controller.prev_result_persister.read_previous_results() or {}
+
+    def start(self):
+        """Runs everything a first time"""
+        result = self.runner.run()
+        self.remember_undefined(result)
+        self.mtimes = self.snapshot()
+        return result
+
+    def run(self):
+        result = self.start()
+        try:
+            while True:
+                print "(watching for changes, press Ctrl-C to stop)"
+                changed = []
+                while not changed:
+                    time.sleep(self.interval)
+                    changed = self.changes()
+
+                try:
+                    result = self.run_again(changed) or result
+                except SystemExit:
+                    # the runner already told what went wrong
+                    pass
+                except Exception:
+                    # e.g. a step module that does not import anymore
+                    traceback.print_exc()
+        except KeyboardInterrupt:
+            pass
+
+        return result
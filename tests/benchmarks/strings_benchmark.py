@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Micro-benchmarks of lettuce.strings, and of parsing a large feature
+
+Run it with `make benchmark`, or `python tests/benchmarks/strings_benchmark.py`
+from the root of the repository. It prints the best time, in
+microseconds, of each benchmark.
+"""
+import timeit
+
+from lettuce import strings
+from lettuce.core import Feature
+
+SCENARIOS = 200
+ROWS = 30
+
+def large_feature():
+    lines = [u'Feature: Lots of scenarios',
+             u'  In order to time the parser',
+             u'  As a lettuce hacker',
+             u'  I want a large feature', u'']
+    for number in range(SCENARIOS):
+        lines.extend([
+            u'  @slow @number-%d' % number,
+            u'  Scenario Outline: Scenario number %d' % number,
+            u'    Given I have the following people:',
+            u'      | name | age | city |',
+        ])
+        lines.extend(u'      | person %d | %d | city \\| %d |' % (row, row, row)
+                     for row in range(ROWS))
+        lines.extend([
+            u'    When I look for "<name>"',
+            u'    Then I see "<age>"',
+            u'',
+            u'  Examples:',
+            u'    | name | age |',
+            u'    | john | 30  |',
+            u'    | mary | 25  |',
+            u'',
+        ])
+
+    return u'\n'.join(lines)
+
+FEATURE = large_feature()
+LINES = FEATURE.splitlines()
+TABLE = [line.strip() for line in LINES if line.strip().startswith(u'|')][:ROWS + 1]
+KEYS, HASHES = strings.parse_hashes(TABLE)
+
+def parse_with(parser):
+    def parse():
+        Feature.parser = parser
+        try:
+            Feature.from_string(FEATURE)
+        finally:
+            Feature.parser = 'single-pass'
+
+    return parse
+
+BENCHMARKS = [
+    ('get_stripped_lines', lambda: strings.get_stripped_lines(FEATURE, '#'), 10),
+    ('split_wisely (table row)', lambda: strings.split_wisely(TABLE[1], u'|', True), 10000),
+    ('split_wisely (scenarios)', lambda: strings.split_wisely(FEATURE, u'Scenario:'), 10),
+    ('wise_startswith', lambda: [strings.wise_startswith(line, u'|') for line in LINES], 10),
+    ('remove_it', lambda: strings.remove_it(u'Scenario Outline: name', u'(Scenario Outline|Scenario): '), 10000),
+    ('rfill', lambda: strings.rfill(u'Given I have', 80, append=u'# some.feature:10\n'), 10000),
+    ('steal_tags_from_lines', lambda: strings.steal_tags_from_lines(list(LINES)), 10),
+    ('parse_hashes', lambda: strings.parse_hashes(TABLE), 100),
+    ('dicts_to_string', lambda: strings.dicts_to_string(HASHES, KEYS), 100),
+    ('Feature.from_string (single-pass)', parse_with('single-pass'), 1),
+    ('Feature.from_string (regex)', parse_with('regex'), 1),
+]
+
+def main():
+    for name, function, number in BENCHMARKS:
+        best = min(timeit.repeat(function, repeat=3, number=number)) / number
+        print "%-36s %12.1f us" % (name, best * 1000000)
+
+if __name__ == '__main__':
+    main()
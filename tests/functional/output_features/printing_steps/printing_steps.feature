@@ -0,0 +1,4 @@
+Feature: Steps that print
+  Scenario: Print along the steps
+    Given I print "first"
+    Then I print "second"
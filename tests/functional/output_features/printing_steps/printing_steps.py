@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+from lettuce import step
+
+@step(r'I print "(.*)"')
+def print_it(step, what):
+    print what
@@ -0,0 +1,5 @@
+Feature: Syntax check following the imports of step definitions
+  Scenario: Steps defined by modules the step definitions import
+    When a step defined by a module the steps import
+    Then a step defined along that import
+    And I do something unrecognised
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+import os
+import shared_steps
+from lettuce import step
+
+@step(u'Then a step defined along that import')
+def defined_along_import(step):
+    raise AssertionError('should not be run')
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+from lettuce import step
+
+@step(u'When a step defined by a module the steps import')
+def defined_in_imported_module(step):
+    raise AssertionError('should not be run')
@@ -0,0 +1,5 @@
+Feature: Syntax check reading the terrain
+  Scenario: Steps defined in a terrain that cannot be imported
+    Given a step defined in the terrain
+    Then a step defined along the features
+    And I do something unrecognised
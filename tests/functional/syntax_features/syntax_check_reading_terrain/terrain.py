@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+import a_module_that_does_not_exist
+from lettuce import step
+
+@step(u'Given a step defined in the terrain')
+def defined_in_terrain(step):
+    raise AssertionError('should not be run')
@@ -0,0 +1,5 @@
+Feature: Syntax check without importing step definitions
+  Scenario: Steps defined in a module that cannot be imported
+    Given a step defined in a module that cannot be imported
+    When I do something unrecognised
+    Then another step is defined there too
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+import a_module_that_does_not_exist
+from lettuce import step
+
+@step(u'Given a step defined in a module that cannot be imported')
+def defined_in_unimportable_module(step):
+    raise AssertionError('should not be run')
+
+@step(u'Then another step is defined there')
+def also_defined_there(step):
+    raise AssertionError('should not be run')
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import subprocess
+from nose.tools import assert_equals, with_setup
+
+from lettuce import Runner
+from lettuce.core import RunController
+from lettuce.changes import ChangedFiles, DependencyPersister
+
+from tests.sandbox import sandbox, make_sandbox, remove_sandbox, sandbox_path, write
+
+FEATURES = {
+    'apples': u'''
+Feature: Count apples
+  Scenario: One apple
+    Given I count apples for incremental runs
+''',
+    'pears': u'''
+Feature: Count pears
+  Scenario: One pear
+    Given I count pears for incremental runs
+''',
+}
+
+STEPS = u'''from lettuce import step
+
+@step(u'I count %s for incremental runs')
+def count(step):
+    pass
+'''
+
+def make_incremental_sandbox():
+    make_sandbox()
+    for name, feature in FEATURES.items():
+        write('%s.feature' % name, feature)
+        write('incremental_%s_steps.py' % name, STEPS % name)
+
+    sandbox['deps'] = DependencyPersister(sandbox_path('.lettucedeps'))
+
+def run(changed_files=None):
+    "Runs the sandbox, returning the names of the features that ran"
+    run_controller = RunController(changed_files=changed_files,
+                                   dependency_persister=sandbox['deps'])
+    total = Runner(sandbox['dir'], run_controller=run_controller).run()
+    return sorted([result.feature.name for result in total.feature_results
+                   if [r for r in result.scenario_results if not r.not_run]])
+
+def age_sandbox():
+    for name in os.listdir(sandbox['dir']):
+        os.utime(sandbox_path(name), (1000, 1000))
+
+@with_setup(make_incremental_sandbox, remove_sandbox)
+def test_dependencies_are_recorded_per_scenario():
+    "Each scenario records its feature file and the modules of its step definitions"
+
+    run()
+    dependencies = sandbox['deps'].read_dependencies()
+    key = (os.path.realpath(sandbox_path('apples.feature')),
+           u'One apple', 1, None)
+
+    assert key in dependencies, dependencies.keys()
+    assert os.path.realpath(sandbox_path('incremental_apples_steps.py')) \
+        in dependencies[key]
+    assert os.path.realpath(sandbox_path('incremental_pears_steps.py')) \
+        not in dependencies[key]
+
+@with_setup(make_incremental_sandbox, remove_sandbox)
+def test_changed_since_an_mtime_runs_only_affected_scenarios():
+    "Only scenarios whose feature or step modules changed after the given mtime run"
+
+    run()
+    age_sandbox()
+    assert_equals(run(ChangedFiles('2000')), [])
+
+    os.utime(sandbox_path('incremental_pears_steps.py'), None)
+    assert_equals(run(ChangedFiles('2000')), [u'Count pears'])
+
+    os.utime(sandbox_path('apples.feature'), None)
+    assert_equals(run(ChangedFiles('2000')), [u'Count apples', u'Count pears'])
+
+@with_setup(make_incremental_sandbox, remove_sandbox)
+def test_changed_since_runs_scenarios_it_knows_nothing_about():
+    "Scenarios that never ran before run, changed or not"
+
+    age_sandbox()
+    assert_equals(run(ChangedFiles('2000')), [u'Count apples', u'Count pears'])
+
+@with_setup(make_incremental_sandbox, remove_sandbox)
+def test_changed_since_a_git_ref():
+    "Files changed since a git ref, or not committed at all, are changed"
+
+    git = lambda *args: subprocess.check_call(
+        ('git', '-c', 'user.name=lettuce', '-c', 'user.email=lettuce@localhost') + args,
+        cwd=sandbox['dir'], stdout=open(os.devnull, 'w'))
+
+    git('init', '-q')
+    git('add', 'apples.feature', 'incremental_apples_steps.py')
+    git('commit', '-q', '-m', 'apples')
+    write('apples.feature', FEATURES['apples'] + u'\n')
+
+    changed = ChangedFiles('HEAD', sandbox['dir'])
+    assert sandbox_path('apples.feature') in changed
+    assert sandbox_path('pears.feature') in changed
+    assert sandbox_path('incremental_apples_steps.py') not in changed
+
+@with_setup(make_incremental_sandbox, remove_sandbox)
+def test_changed_since_runs_undefined_steps_once_a_module_is_added():
+    "Scenarios with undefined steps run again as soon as some step module changes or is added"
+
+    write('plums.feature', FEATURES['pears'].replace('pears', 'plums'))
+    run()
+    age_sandbox()
+    assert_equals(run(ChangedFiles('2000', sandbox['dir'])), [])
+
+    write('incremental_plums_steps.py', STEPS % 'plums')
+    assert_equals(run(ChangedFiles('2000', sandbox['dir'])), [u'Count plums'])
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import sys
+import socket
+from StringIO import StringIO
+from nose.tools import assert_equals, with_setup
+
+from lettuce.daemon import Daemon, send_request, read_response
+from lettuce.lettuce_cli import create_runner
+from tests.sandbox import sandbox, make_sandbox, remove_sandbox, sandbox_path, write
+
+FEATURE = '''
+Feature: Served
+  Scenario: Do one thing
+    Given I do one thing
+'''
+
+STEPS = '''from lettuce import step
+open(%(loads)r, "a").write("loaded\\\\n")
+
+@step(u'I do one thing')
+def one_thing(step):
+    %(body)s
+'''
+
+def make_served_sandbox():
+    make_sandbox()
+    sandbox['loads'] = sandbox_path('loads.txt')
+    write('features/served.feature', FEATURE)
+    write('features/served_steps.py', STEPS % {'loads': sandbox['loads'], 'body': 'pass'})
+
+def remove_served_sandbox():
+    remove_sandbox()
+    sys.modules.pop('served_steps', None)
+
+def create_sandboxed_runner(args, base_path):
+    "Builds runners that write nothing down within the current dir"
+    args = ['--id-file', 'None', '--deps-file', 'None',
+            '--cache-dir', sandbox_path('.lettuce_cache')] + list(args)
+    return create_runner(args, base_path)
+
+def ask(daemon, *args):
+    "Sends a request to the daemon, returning its exit status and output"
+    client, server = socket.socketpair()
+    try:
+        send_request(client, args)
+        daemon.handle(server)
+        server.close()
+        out, err = StringIO(), StringIO()
+        status = read_response(client, out, err)
+        return status, out.getvalue()
+    finally:
+        client.close()
+
+def loads():
+    return open(sandbox['loads']).read().count('loaded')
+
+@with_setup(make_served_sandbox, remove_served_sandbox)
+def test_daemon_runs_features_with_step_definitions_loaded_once():
+    "lettuce serve loads step definitions once, and runs features as many times as asked"
+
+    daemon = Daemon(sandbox_path('features'), create_runner=create_sandboxed_runner)
+    daemon.start()
+    assert_equals(loads(), 1)
+
+    for run in range(2):
+        status, output = ask(daemon, '-v', '3')
+        assert_equals(status, 0)
+        assert '1 feature (1 passed)' in output, output
+
+    assert_equals(loads(), 1)
+
+@with_setup(make_served_sandbox, remove_served_sandbox)
+def test_daemon_reloads_changed_step_modules():
+    "lettuce serve imports again the step modules that changed since the previous run"
+
+    daemon = Daemon(sandbox_path('features'), create_runner=create_sandboxed_runner)
+    daemon.start()
+    write('features/served_steps.py', STEPS % {'loads': sandbox['loads'], 'body': 'assert False'})
+
+    status, output = ask(daemon, '-v', '3', sandbox_path('features', 'served.feature'))
+    assert_equals(status, 1)
+    assert '1 step (1 failed, 0 passed)' in output, output
+    assert_equals(loads(), 2)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import json
+import os
+
+from nose.tools import assert_equals, with_setup
+from lettuce import Runner
+from lettuce.core import RunController
+from tests.functional.test_runner import feature_name, fjoin
+from tests.sandbox import make_sandbox, remove_sandbox, sandbox_path
+
+def run_with_events(path, **kw):
+    "Runs the given features, returning the events written"
+    filename = sandbox_path('events.ndjson')
+    Runner(path, enable_events=True, events_filename=filename, **kw).run()
+    return [json.loads(line) for line in open(filename)]
+
+@with_setup(make_sandbox, remove_sandbox)
+def test_events_output_follows_the_run():
+    'Test events output writes an event as each feature, scenario and step starts or ends'
+    events = run_with_events(feature_name('error_traceback'))
+
+    assert_equals([event['event'] for event in events], [
+        'run_started',
+        'feature_started',
+        'scenario_started',
+        'step_finished',
+        'scenario_finished',
+        'scenario_started',
+        'step_finished',
+        'scenario_finished',
+        'feature_finished',
+        'run_finished',
+    ])
+
+    passed, failed = [event for event in events
+                      if event['event'] == 'step_finished']
+    assert_equals(passed['step'], 'Given my step that passes')
+    assert_equals(passed['status'], 'passed')
+    assert_equals(passed['reason'], None)
+    assert passed['duration'] >= 0
+
+    assert_equals(failed['step'], 'Given my step that blows a exception')
+    assert_equals(failed['status'], 'failed')
+    assert_equals(failed['reason']['exception'], 'RuntimeError')
+    assert 'Traceback' in failed['reason']['traceback']
+
+    assert_equals(events[4]['status'], 'passed')
+    assert_equals(events[7]['status'], 'failed')
+    assert_equals(events[8]['status'], 'failed')
+    assert_equals(events[-1]['steps_failed'], 1)
+
+@with_setup(make_sandbox, remove_sandbox)
+def test_events_output_of_outlines():
+    'Test events output writes an event for each example of an outline'
+    events = run_with_events(feature_name('fail_outline'))
+
+    examples = [event for event in events
+                if event['event'] == 'example_finished']
+    assert_equals([(event['example'], event['status']) for event in examples],
+                  [(1, 'passed'), (2, 'failed'), (3, 'passed')])
+
+    scenario_finished, = [event for event in events
+                          if event['event'] == 'scenario_finished']
+    assert_equals(scenario_finished['status'], 'failed')
+
+def finished_statuses(events):
+    return [(event['event'], event['status']) for event in events
+            if event['event'] in ('scenario_finished', 'feature_finished')]
+
+@with_setup(make_sandbox, remove_sandbox)
+def test_events_output_of_undefined_steps():
+    'Test events output tells scenarios and features with undefined steps apart from passed ones'
+    events = run_with_events(feature_name('double-quoted-snippet'))
+
+    step_finished, = [event for event in events
+                      if event['event'] == 'step_finished']
+    assert_equals(step_finished['status'], 'undefined')
+    assert_equals(finished_statuses(events), [
+        ('scenario_finished', 'undefined'),
+        ('feature_finished', 'undefined'),
+    ])
+
+@with_setup(make_sandbox, remove_sandbox)
+def test_events_output_of_scenarios_not_run():
+    'Test events output tells scenarios and features that did not run apart from passed ones'
+    events = run_with_events(feature_name('error_traceback'),
+                             run_controller=RunController(tags_to_run=['@nowhere']))
+
+    assert_equals([event for event in events
+                   if event['event'] == 'step_finished'], [])
+    assert_equals(finished_statuses(events), [
+        ('scenario_finished', 'not_run'),
+        ('scenario_finished', 'not_run'),
+        ('feature_finished', 'not_run'),
+    ])
+
+@with_setup(make_sandbox, remove_sandbox)
+def test_events_output_of_worker_processes():
+    'Test events output gets whole lines from each worker process'
+    sequential = run_with_events(fjoin(), processes=1)
+    parallel = run_with_events(fjoin(), processes=2)
+
+    def key(event):
+        return event['event'], event.get('scenario'), event.get('step')
+
+    assert_equals(sorted(map(key, parallel)), sorted(map(key, sequential)))
+    assert_equals(parallel[0]['event'], 'run_started')
+    assert_equals(parallel[-1]['event'], 'run_finished')
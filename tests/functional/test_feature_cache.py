@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+from nose.tools import assert_equals, with_setup
+
+from lettuce import core
+from lettuce.cache import FeatureCache
+from tests.sandbox import sandbox, make_sandbox, remove_sandbox, sandbox_path, write
+
+FEATURE = u'''
+Feature: Cache parsed features
+  Scenario: Parse it once
+    Given I parse a feature
+    Then I see it is in the cache
+
+  Scenario Outline: Parse outlines once
+    Given I have <number> features
+    Examples:
+      | number |
+      | 1      |
+      | 2      |
+'''
+
+def make_cache_sandbox():
+    make_sandbox()
+    sandbox['feature'] = write('cached.feature', FEATURE)
+    sandbox['cache'] = FeatureCache(sandbox_path('.lettuce_cache'))
+
+@with_setup(make_cache_sandbox, remove_sandbox)
+def test_feature_cache_misses_before_parsing():
+    "A feature that was never parsed is not in the cache"
+
+    assert_equals(sandbox['cache'].load(sandbox['feature'], 'single-pass'), None)
+
+@with_setup(make_cache_sandbox, remove_sandbox)
+def test_feature_cache_gives_the_parsed_feature_back():
+    "Parsing a feature with a cache stores it, so that next time it is " \
+    "taken from there"
+
+    parsed = core.Feature.from_file(sandbox['feature'], sandbox['cache'])
+    cached = sandbox['cache'].load(sandbox['feature'], 'single-pass')
+
+    assert cached is not parsed
+    assert_equals(cached.name, parsed.name)
+    assert_equals(cached.described_at.line, parsed.described_at.line)
+    assert_equals([s.name for s in cached.scenarios],
+                  [s.name for s in parsed.scenarios])
+    assert_equals([s.sentence for s in cached.scenarios[0].steps],
+                  [s.sentence for s in parsed.scenarios[0].steps])
+    assert_equals(cached.scenarios[1].outlines, parsed.scenarios[1].outlines)
+    assert cached.scenarios[0].feature is cached
+    assert cached.scenarios[0].steps[0].scenario is cached.scenarios[0]
+
+    from_file = core.Feature.from_file(sandbox['feature'], sandbox['cache'])
+    assert_equals(from_file.name, parsed.name)
+
+@with_setup(make_cache_sandbox, remove_sandbox)
+def test_feature_cache_misses_when_the_file_changes():
+    "A cached feature is discarded once its file changes"
+
+    core.Feature.from_file(sandbox['feature'], sandbox['cache'])
+    write('cached.feature', FEATURE.replace(u'Parse it once', u'Parse it again'))
+    os.utime(sandbox['feature'], (0, 0))
+
+    assert_equals(sandbox['cache'].load(sandbox['feature'], 'single-pass'), None)
+
+    feature = core.Feature.from_file(sandbox['feature'], sandbox['cache'])
+    assert_equals(feature.scenarios[0].name, u'Parse it again')
+
+@with_setup(make_cache_sandbox, remove_sandbox)
+def test_feature_cache_survives_a_touch():
+    "A cached feature is still valid when only the mtime of its file changes"
+
+    core.Feature.from_file(sandbox['feature'], sandbox['cache'])
+    os.utime(sandbox['feature'], (0, 0))
+
+    assert_equals(sandbox['cache'].load(sandbox['feature'], 'single-pass').name,
+                  u'Cache parsed features')
+
+@with_setup(make_cache_sandbox, remove_sandbox)
+def test_feature_cache_keeps_each_parser_apart():
+    "A feature parsed with one parser is not taken from the cache for another"
+
+    core.Feature.from_file(sandbox['feature'], sandbox['cache'], parser='regex')
+
+    assert_equals(sandbox['cache'].load(sandbox['feature'], 'single-pass'), None)
+    assert_equals(sandbox['cache'].load(sandbox['feature'], 'regex').name,
+                  u'Cache parsed features')
+
+    core.Feature.from_file(sandbox['feature'], sandbox['cache'])
+    assert_equals(sandbox['cache'].load(sandbox['feature'], 'single-pass').name,
+                  u'Cache parsed features')
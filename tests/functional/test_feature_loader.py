@@ -14,10 +14,14 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-from nose.tools import assert_equals
+import os
+import sys
+from nose.tools import assert_equals, with_setup
 from os.path import dirname, join, abspath
-from lettuce.fs import FeatureLoader
+from lettuce.fs import FeatureLoader, FileSystem
+from lettuce.cache import FileListCache
 from lettuce.core import Feature, fs
+from tests.sandbox import sandbox, make_sandbox, remove_sandbox, sandbox_path, write
 
 current_dir = abspath(dirname(__file__))
 cjoin = lambda *x: join(current_dir, 'simple_features', *x)
@@ -40,6 +44,68 @@ def test_feature_finder_finds_all_feature_files_within_a_dir():
         ])
     )
 
+def test_scanning_finds_files_in_the_order_walking_does():
+    "FileSystem.scan lists files in the order walking does, with as many threads as asked"
+
+    walked = FileSystem.locate(cjoin(), '*')
+    for threads in (1, 4):
+        files, mtimes = FileSystem.scan(cjoin(), threads)
+        assert_equals(files, walked)
+        assert_equals(mtimes[cjoin('1st_feature_dir')],
+                      os.stat(cjoin('1st_feature_dir')).st_mtime)
+
+def make_listed_sandbox():
+    make_sandbox()
+    sandbox['features'] = sandbox_path('features')
+    os.makedirs(os.path.join(sandbox['features'], 'steps'))
+    sandbox['cache'] = FileListCache(sandbox_path('.lettuce_cache'))
+
+def remove_listed_sandbox():
+    remove_sandbox()
+    sys.modules.pop('counted_steps', None)
+
+@with_setup(make_listed_sandbox, remove_listed_sandbox)
+def test_file_list_cache_is_valid_until_a_directory_changes():
+    "The cached list of files holds until a file is added to any directory"
+
+    write('features/one.feature', '')
+    files, mtimes = FileSystem.scan(sandbox['features'])
+    sandbox['cache'].store(sandbox['features'], files, mtimes)
+    assert_equals(sandbox['cache'].load(sandbox['features']), files)
+
+    write('features/steps/two.feature', '')
+    steps_dir = os.path.join(sandbox['features'], 'steps')
+    os.utime(steps_dir, (0, mtimes[steps_dir] + 10))
+    assert_equals(sandbox['cache'].load(sandbox['features']), None)
+
+@with_setup(make_listed_sandbox, remove_listed_sandbox)
+def test_feature_loader_lists_files_from_the_cache():
+    "FeatureLoader finds the files the cache knows about, without listing directories"
+
+    write('features/one.feature', '')
+    assert_equals(FeatureLoader(sandbox['features'], sandbox['cache']).find_feature_files(),
+                  [os.path.join(sandbox['features'], 'one.feature')])
+
+    # a file the cache does not know about, while no directory changed
+    files, mtimes = FileSystem.scan(sandbox['features'])
+    sandbox['cache'].store(sandbox['features'], [], mtimes)
+    assert_equals(FeatureLoader(sandbox['features'], sandbox['cache']).find_feature_files(), [])
+
+@with_setup(make_listed_sandbox, remove_listed_sandbox)
+def test_step_definitions_are_imported_once():
+    "FeatureLoader does not reload step definitions it has just imported"
+
+    loads = sandbox_path('loads.txt')
+    write('features/steps/counted_steps.py',
+          'open(%r, "a").write("loaded\\n")\n' % loads)
+
+    FeatureLoader(sandbox['features']).find_and_load_step_definitions()
+    assert_equals(open(loads).read(), 'loaded\n')
+
+    # but a module that was already there is reloaded, to pick up changes
+    FeatureLoader(sandbox['features']).find_and_load_step_definitions()
+    assert_equals(open(loads).read(), 'loaded\nloaded\n')
+
 def test_feature_finder_loads_feature_objects():
     "Feature.from_file loads feature by filename"
 
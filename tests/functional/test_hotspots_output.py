@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import json
+
+from nose.tools import assert_equals, with_setup
+from lettuce import registry
+from lettuce import Runner
+from lettuce import hotspots_output
+from lettuce import timing
+from tests.functional.test_runner import feature_name
+from tests.asserts import prepare_stdout
+
+def run_with_hotspots(name):
+    "Runs the given output feature, returning the JSON it would write"
+    written = []
+    def keep_json(filename, content):
+        written.append((filename, json.loads(content)))
+
+    old = hotspots_output.wrt_output
+    hotspots_output.wrt_output = keep_json
+    try:
+        Runner(feature_name(name), enable_hotspots=True).run()
+    finally:
+        hotspots_output.wrt_output = old
+
+    assert_equals(1, len(written), "Function not called")
+    return written[0]
+
+@with_setup(prepare_stdout, registry.clear)
+def test_hotspots_output_aggregates_by_step_definition():
+    'Test hotspots output sums up every step ran by each step definition'
+    filename, content = run_with_hotspots('success_outline')
+
+    assert_equals(filename, 'lettucehotspots.json')
+    assert_equals(content['steps'], 24)
+    spots = content['hotspots']
+    assert_equals(len(spots), 5)
+    assert_equals(sum([spot['calls'] for spot in spots]), 24)
+    assert_equals([spot['total'] for spot in spots],
+                  sorted([spot['total'] for spot in spots], reverse=True))
+
+    fill_field, = [spot for spot in spots if spot['calls'] == 12]
+    assert_equals(fill_field['function'], 'when_i_fill_the_field_x_with_y')
+    assert fill_field['file'].endswith('success_outline_steps.py')
+    assert_equals(fill_field['line'], 29)
+    assert_equals(fill_field['failures'], 0)
+    assert fill_field['mean'] <= fill_field['p95']
+
+@with_setup(prepare_stdout, registry.clear)
+def test_hotspots_output_counts_failures():
+    'Test hotspots output counts the failures of each step definition'
+    filename, content = run_with_hotspots('error_traceback')
+
+    failures = dict([(spot['function'], spot['failures'])
+                     for spot in content['hotspots']])
+    assert_equals(failures, {
+        'given_my_step_that_passes': 0,
+        'given_my_step_that_blows_a_exception': 1,
+    })
+
+def test_hotspot_p95_is_nearest_rank():
+    'The 95th percentile of a hotspot is taken by the nearest-rank method'
+    spot = timing.Hotspot('steps.py', 1, 'some_step')
+    spot.durations = [float(n) for n in range(1, 21)]
+
+    assert_equals(spot.calls, 20)
+    assert_equals(spot.total, 210.0)
+    assert_equals(spot.mean, 10.5)
+    assert_equals(spot.p95, 19.0)
@@ -15,6 +15,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import os
+import sys
 import lettuce
 
 from StringIO import StringIO
@@ -23,7 +24,9 @@ from nose.tools import assert_equals, with_setup, assert_raises
 from lettuce.fs import FeatureLoader
 from lettuce.core import Feature, fs, StepDefinition, RunController, ScenarioResultSummary
 from lettuce.terrain import world
-from lettuce import Runner, step
+from lettuce import Runner, step, after
+from lettuce import registry
+from lettuce.manifest import StepManifest
 
 from tests.asserts import assert_lines
 from tests.asserts import assert_stderr
@@ -56,6 +59,15 @@ def failed_feature_name(name):
 def tag_feature_name(name):
     return tjoin(name, "%s.feature" % name)
 
+def scenario_ids(filename):
+    "Returns the ids of the scenarios (or outline rows) of a feature, in order"
+    ids = []
+    for scenario in Feature.from_file(filename).scenarios:
+        for outline in scenario.outlines or [None]:
+            ids.append(scenario.identity(outline))
+
+    return ids
+
 @with_setup(prepare_stderr)
 def test_try_to_import_terrain():
     "Runner tries to import terrain, but has a nice output when it fail"
@@ -64,8 +76,9 @@ def test_try_to_import_terrain():
     os.chdir(sandbox_path)
 
     try:
-        import lettuce
-        reload(lettuce)
+        from lettuce import runner
+        runner.terrains.clear()
+        runner.load_terrain()
         raise AssertionError('The runner should raise ImportError !')
     except SystemExit:
         assert_stderr_lines_with_traceback(
@@ -73,15 +86,15 @@ def test_try_to_import_terrain():
             '"terrain"\nbut it has errors, check its contents and ' \
             'try to run lettuce again.\n\nOriginal traceback below:\n\n' \
             "Traceback (most recent call last):\n"
-            '  File "%(lettuce_core_file)s", line 44, in <module>\n'
-            '    terrain = fs.FileSystem._import("terrain")\n' \
-            '  File "%(lettuce_fs_file)s", line 63, in _import\n' \
-            '    module = imp.load_module(name, fp, pathname, description)\n' \
+            '  File "%(lettuce_core_file)s", line 52, in load_terrain\n'
+            '    terrains[current_dir] = fs.FileSystem._import("terrain")\n' \
+            '  File "%(lettuce_fs_file)s", line 129, in _import\n' \
+            '    return imp.load_module(name, fp, pathname, description)\n' \
             '  File "%(terrain_file)s", line 18\n' \
             '    it is here just to cause a syntax error\n' \
             "                  ^\n" \
             'SyntaxError: invalid syntax\n' % {
-                'lettuce_core_file': abspath(join(lettuce_dir, '__init__.py')),
+                'lettuce_core_file': abspath(join(lettuce_dir, 'runner.py')),
                 'lettuce_fs_file': abspath(join(lettuce_dir, 'fs.py')),
                 'terrain_file': abspath(lettuce_path('..', 'tests', 'functional', 'sandbox', 'terrain.py')),
             }
@@ -1083,6 +1096,22 @@ class MockPrevResultPersister(object):
     def write_results(self, results):
         self.final_results_list = results 
 
+@with_setup(prepare_stdout)
+def test_output_keeps_its_place_among_what_steps_print():
+    "Output written through the console is flushed before whatever steps print"
+
+    runner = Runner(feature_name('printing_steps'), verbosity=1)
+    runner.run()
+
+    assert_stdout_lines(
+        "first\n"
+        ".second\n"
+        ".\n"
+        "1 feature (1 passed)\n"
+        "1 scenario (1 passed)\n"
+        "2 steps (2 passed)\n"
+    )
+
 @with_setup(prepare_stdout)
 def test_syntax_check_only():
     "syntax checking: Show a list of all steps that do not have matching functions, don't actually run any steps"
@@ -1105,6 +1134,67 @@ def test_syntax_check_only():
         "    Then the syntax check should complain # tests/functional/syntax_features/syntax_check_only/syntax_check_only.feature:6 (undefined)\n"
     )
 
+@with_setup(prepare_stdout, registry.clear)
+def test_syntax_check_reads_step_definitions_without_importing_them():
+    "syntax checking: Step definitions are read from their modules, that are not imported"
+
+    filename = syntax_feature_name('syntax_check_without_imports')
+    run_controller = RunController(MockPrevResultPersister([]), only_syntax_check=True)
+    runner = Runner(filename, verbosity=0, run_controller=run_controller,
+                    step_manifest=StepManifest(None))
+    runner.run()
+
+    assert 'unimportable_steps' not in sys.modules
+    assert_stdout_lines(
+        "\n"
+        "Syntax errors:\n"
+        "    When I do something unrecognised                          # tests/functional/syntax_features/syntax_check_without_imports/syntax_check_without_imports.feature:4 (undefined)\n"
+    )
+
+def run_syntax_check_from(name):
+    "Checks the syntax of the features under the given dir, from within it"
+    directory = dirname(syntax_feature_name(name))
+    run_controller = RunController(MockPrevResultPersister([]), only_syntax_check=True)
+    runner = Runner(join(directory, 'features'), verbosity=0,
+                    run_controller=run_controller, step_manifest=StepManifest(None))
+    current_dir = os.getcwd()
+    os.chdir(directory)
+    try:
+        runner.run()
+    finally:
+        os.chdir(current_dir)
+
+@with_setup(prepare_stdout, registry.clear)
+def test_syntax_check_imports_what_the_manifest_cannot_tell():
+    "syntax checking: Step modules importing others that define steps are imported"
+
+    try:
+        run_syntax_check_from('syntax_check_following_imports')
+        # shared_steps could be read on its own, it is only imported
+        # along with following_steps
+        assert 'shared_steps' in sys.modules
+    finally:
+        sys.modules.pop('shared_steps', None)
+        sys.modules.pop('following_steps', None)
+
+    assert_stdout_lines(
+        "\n"
+        "Syntax errors:\n"
+        "    And I do something unrecognised                              # features/following_imports.feature:5 (undefined)\n"
+    )
+
+@with_setup(prepare_stdout, registry.clear)
+def test_syntax_check_reads_the_terrain_without_importing_it():
+    "syntax checking: The step definitions of the terrain are read, it is not imported"
+
+    run_syntax_check_from('syntax_check_reading_terrain')
+
+    assert_stdout_lines(
+        "\n"
+        "Syntax errors:\n"
+        "    And I do something unrecognised                            # features/reading_terrain.feature:5 (undefined)\n"
+    )
+
 @with_setup(prepare_stdout)
 def test_gather_failed_test_ids():
     "failed test checking: Test that gathers details on which tests (scenarios) have failed"
@@ -1118,6 +1208,7 @@ def test_gather_failed_test_ids():
         raise AssertionError('bang')
 
     filename = failed_feature_name('some_failing_scenarios')
+    ids = scenario_ids(filename)
     # Verbosity of zero so only get syntax output
     persister = MockPrevResultPersister(None)
     # Initial run, should run all steps initially and we should end up with which steps failed
@@ -1127,11 +1218,11 @@ def test_gather_failed_test_ids():
     # Check we caught and stored which steps failed and which passed
     res = persister.final_results_list
     assert_equals(len(res), 5)
-    assert_equals(res[1].status, ScenarioResultSummary.FAILED)
-    assert_equals(res[2].status, ScenarioResultSummary.FAILED)
-    assert_equals(res[3].status, ScenarioResultSummary.PASSED)
-    assert_equals(res[4].status, ScenarioResultSummary.PASSED)
-    assert_equals(res[5].status, ScenarioResultSummary.FAILED)
+    assert_equals(res[ids[0]].status, ScenarioResultSummary.FAILED)
+    assert_equals(res[ids[1]].status, ScenarioResultSummary.FAILED)
+    assert_equals(res[ids[2]].status, ScenarioResultSummary.PASSED)
+    assert_equals(res[ids[3]].status, ScenarioResultSummary.PASSED)
+    assert_equals(res[ids[4]].status, ScenarioResultSummary.FAILED)
 
 @with_setup(prepare_stdout)
 def test_gather_second_pass_failed_test_ids():
@@ -1146,13 +1237,14 @@ def test_gather_second_pass_failed_test_ids():
         raise AssertionError('bang')
 
     filename = failed_feature_name('some_failing_scenarios')
+    ids = scenario_ids(filename)
     # Verbosity of zero so only get syntax output
     scenarioSummaries={}
-    scenarioSummaries[1] = ScenarioResultSummary(1, ScenarioResultSummary.FAILED)
-    scenarioSummaries[2] = ScenarioResultSummary(2, ScenarioResultSummary.FAILED)
-    scenarioSummaries[3] = ScenarioResultSummary(3, ScenarioResultSummary.PASSED)
-    scenarioSummaries[4] = ScenarioResultSummary(4, ScenarioResultSummary.PASSED)
-    scenarioSummaries[5] = ScenarioResultSummary(5, ScenarioResultSummary.FAILED)
+    scenarioSummaries[ids[0]] = ScenarioResultSummary(ids[0], ScenarioResultSummary.FAILED)
+    scenarioSummaries[ids[1]] = ScenarioResultSummary(ids[1], ScenarioResultSummary.FAILED)
+    scenarioSummaries[ids[2]] = ScenarioResultSummary(ids[2], ScenarioResultSummary.PASSED)
+    scenarioSummaries[ids[3]] = ScenarioResultSummary(ids[3], ScenarioResultSummary.PASSED)
+    scenarioSummaries[ids[4]] = ScenarioResultSummary(ids[4], ScenarioResultSummary.FAILED)
     persister = MockPrevResultPersister(scenarioSummaries)
     # Initial run, should run all steps initially and we should end up with which steps failed
     run_controller = RunController(persister, only_run_failed=True, only_syntax_check=False)
@@ -1161,11 +1253,11 @@ def test_gather_second_pass_failed_test_ids():
     # Check we caught and stored which steps failed and which passed
     res = persister.final_results_list
     assert_equals(len(res), 5)
-    assert_equals(res[1].status, ScenarioResultSummary.FAILED)
-    assert_equals(res[2].status, ScenarioResultSummary.FAILED)
-    assert_equals(res[3].status, ScenarioResultSummary.NOT_RUN)
-    assert_equals(res[4].status, ScenarioResultSummary.NOT_RUN)
-    assert_equals(res[5].status, ScenarioResultSummary.FAILED)
+    assert_equals(res[ids[0]].status, ScenarioResultSummary.FAILED)
+    assert_equals(res[ids[1]].status, ScenarioResultSummary.FAILED)
+    assert_equals(res[ids[2]].status, ScenarioResultSummary.NOT_RUN)
+    assert_equals(res[ids[3]].status, ScenarioResultSummary.NOT_RUN)
+    assert_equals(res[ids[4]].status, ScenarioResultSummary.FAILED)
 
 @with_setup(prepare_stdout)
 def test_gather_third_pass_failed_test_ids():
@@ -1180,13 +1272,14 @@ def test_gather_third_pass_failed_test_ids():
         raise AssertionError('bang')
 
     filename = failed_feature_name('some_failing_scenarios')
+    ids = scenario_ids(filename)
     # Verbosity of zero so only get syntax output
     scenarioSummaries={}
-    scenarioSummaries[1] = ScenarioResultSummary(1, ScenarioResultSummary.FAILED)
-    scenarioSummaries[2] = ScenarioResultSummary(2, ScenarioResultSummary.FAILED)
-    scenarioSummaries[3] = ScenarioResultSummary(3, ScenarioResultSummary.NOT_RUN)
-    scenarioSummaries[4] = ScenarioResultSummary(4, ScenarioResultSummary.NOT_RUN)
-    scenarioSummaries[5] = ScenarioResultSummary(5, ScenarioResultSummary.FAILED)
+    scenarioSummaries[ids[0]] = ScenarioResultSummary(ids[0], ScenarioResultSummary.FAILED)
+    scenarioSummaries[ids[1]] = ScenarioResultSummary(ids[1], ScenarioResultSummary.FAILED)
+    scenarioSummaries[ids[2]] = ScenarioResultSummary(ids[2], ScenarioResultSummary.NOT_RUN)
+    scenarioSummaries[ids[3]] = ScenarioResultSummary(ids[3], ScenarioResultSummary.NOT_RUN)
+    scenarioSummaries[ids[4]] = ScenarioResultSummary(ids[4], ScenarioResultSummary.FAILED)
     persister = MockPrevResultPersister(scenarioSummaries)
     run_controller = RunController(persister, only_run_failed=True, only_syntax_check=False)
     runner = Runner(filename, verbosity=0, run_controller = run_controller)
@@ -1194,11 +1287,11 @@ def test_gather_third_pass_failed_test_ids():
     # Check we caught and stored which steps failed and which passed
     res = persister.final_results_list
     assert_equals(len(res), 5)
-    assert_equals(res[1].status, ScenarioResultSummary.FAILED)
-    assert_equals(res[2].status, ScenarioResultSummary.FAILED)
-    assert_equals(res[3].status, ScenarioResultSummary.NOT_RUN)
-    assert_equals(res[4].status, ScenarioResultSummary.NOT_RUN)
-    assert_equals(res[5].status, ScenarioResultSummary.FAILED)
+    assert_equals(res[ids[0]].status, ScenarioResultSummary.FAILED)
+    assert_equals(res[ids[1]].status, ScenarioResultSummary.FAILED)
+    assert_equals(res[ids[2]].status, ScenarioResultSummary.NOT_RUN)
+    assert_equals(res[ids[3]].status, ScenarioResultSummary.NOT_RUN)
+    assert_equals(res[ids[4]].status, ScenarioResultSummary.FAILED)
 
 @with_setup(prepare_stdout)
 def test_scenario_outlines_with_failed_only():
@@ -1217,6 +1310,7 @@ def test_scenario_outlines_with_failed_only():
         pass
 
     filename = failed_feature_name('failing_scenario_outlines')
+    ids = scenario_ids(filename)
     # Verbosity of zero so only get syntax output
     persister = MockPrevResultPersister(None)
     # Initial run, should run all steps initially and we should end up with which steps failed
@@ -1226,10 +1320,10 @@ def test_scenario_outlines_with_failed_only():
     # Check we caught and stored which steps failed and which passed
     res = persister.final_results_list
     assert_equals(len(res), 4)
-    assert_equals(res[1].status, ScenarioResultSummary.PASSED)
-    assert_equals(res[2].status, ScenarioResultSummary.FAILED)
-    assert_equals(res[3].status, ScenarioResultSummary.PASSED)
-    assert_equals(res[4].status, ScenarioResultSummary.FAILED)
+    assert_equals(res[ids[0]].status, ScenarioResultSummary.PASSED)
+    assert_equals(res[ids[1]].status, ScenarioResultSummary.FAILED)
+    assert_equals(res[ids[2]].status, ScenarioResultSummary.PASSED)
+    assert_equals(res[ids[3]].status, ScenarioResultSummary.FAILED)
 
 @with_setup(prepare_stdout)
 def test_scenario_outlines_with_failed_only_second_run():
@@ -1248,12 +1342,13 @@ def test_scenario_outlines_with_failed_only_second_run():
         pass
 
     filename = failed_feature_name('failing_scenario_outlines')
+    ids = scenario_ids(filename)
     # Verbosity of zero so only get syntax output
     scenarioSummaries={}
-    scenarioSummaries[1] = ScenarioResultSummary(1, ScenarioResultSummary.PASSED)
-    scenarioSummaries[2] = ScenarioResultSummary(2, ScenarioResultSummary.FAILED)
-    scenarioSummaries[3] = ScenarioResultSummary(3, ScenarioResultSummary.PASSED)
-    scenarioSummaries[4] = ScenarioResultSummary(4, ScenarioResultSummary.FAILED)
+    scenarioSummaries[ids[0]] = ScenarioResultSummary(ids[0], ScenarioResultSummary.PASSED)
+    scenarioSummaries[ids[1]] = ScenarioResultSummary(ids[1], ScenarioResultSummary.FAILED)
+    scenarioSummaries[ids[2]] = ScenarioResultSummary(ids[2], ScenarioResultSummary.PASSED)
+    scenarioSummaries[ids[3]] = ScenarioResultSummary(ids[3], ScenarioResultSummary.FAILED)
     persister = MockPrevResultPersister(scenarioSummaries)
     run_controller = RunController(persister, only_run_failed=True, only_syntax_check=False)
     runner = Runner(filename, verbosity=0, run_controller = run_controller)
@@ -1261,10 +1356,49 @@ def test_scenario_outlines_with_failed_only_second_run():
     # Check we caught and stored which steps failed and which passed
     res = persister.final_results_list
     assert_equals(len(res), 4)
-    assert_equals(res[1].status, ScenarioResultSummary.NOT_RUN)
-    assert_equals(res[2].status, ScenarioResultSummary.FAILED)
-    assert_equals(res[3].status, ScenarioResultSummary.NOT_RUN)
-    assert_equals(res[4].status, ScenarioResultSummary.FAILED)
+    assert_equals(res[ids[0]].status, ScenarioResultSummary.NOT_RUN)
+    assert_equals(res[ids[1]].status, ScenarioResultSummary.FAILED)
+    assert_equals(res[ids[2]].status, ScenarioResultSummary.NOT_RUN)
+    assert_equals(res[ids[3]].status, ScenarioResultSummary.FAILED)
+
+@with_setup(prepare_stdout)
+def test_failed_test_ids_do_not_depend_on_scenario_order():
+    "failed test checking: Results are keyed by feature, scenario name and outline row, and keep their history"
+
+    @step('working step')
+    def append_2_more(step):
+        pass
+
+    @step('breaking step')
+    def append_2_more(step):
+        raise AssertionError('bang')
+
+    filename = failed_feature_name('some_failing_scenarios')
+    ids = scenario_ids(filename)
+    assert_equals(len(set(ids)), 5)
+    assert_equals(ids[4], (fs.relpath(filename), u'failing scenario 5', 1, None))
+
+    # Only the last scenario is known, everything else is new to us
+    scenarioSummaries={}
+    scenarioSummaries[ids[4]] = ScenarioResultSummary(ids[4], ScenarioResultSummary.FAILED, 1.0, 3, 2)
+    scenarioSummaries['gone'] = ScenarioResultSummary('gone', ScenarioResultSummary.FAILED)
+    persister = MockPrevResultPersister(scenarioSummaries)
+    run_controller = RunController(persister, only_run_failed=True)
+    runner = Runner(filename, verbosity=0, run_controller = run_controller)
+    runner.run()
+
+    res = persister.final_results_list
+    assert_equals(len(res), 6)
+    assert_equals(res[ids[4]].status, ScenarioResultSummary.FAILED)
+    assert_equals(res[ids[4]].runs, 4)
+    assert_equals(res[ids[4]].failures, 3)
+    assert res[ids[4]].duration < 1.0, res[ids[4]].duration
+    assert_equals(res[ids[2]].runs, 1)
+    assert_equals(res[ids[2]].failures, 0)
+    assert_equals(res['gone'].status, ScenarioResultSummary.FAILED)
+
+    outline_ids = scenario_ids(failed_feature_name('failing_scenario_outlines'))
+    assert_equals(len(set(outline_ids)), 4)
 
 def test_run_only_scenarios_tagged():
     "Test that only scenarios that have the right tags on them get run"
@@ -1366,3 +1500,181 @@ def test_nasty_tags_in_descriptions():
     # Check what actually got run, nothing bad happened we hope from our parsing of the tags and lines
     assert_equals(["red", "blue", "purple", "black"], world.colours)
     
+
+def run_failed_features(processes, max_failures=None, verbosity=3):
+    "Runs all features under failed_features, returning the total result " \
+    "and the results persisted by the run controller"
+
+    @step('working step')
+    def working_step(step):
+        pass
+
+    @step('breaking step')
+    def breaking_step(step):
+        raise AssertionError('bang')
+
+    @step('I have entered')
+    def have_entered(step):
+        pass
+
+    @step('result should be')
+    def result_should_be(step):
+        pass
+
+    @step('When I press add')
+    def press_add(step):
+        pass
+
+    persister = MockPrevResultPersister()
+    run_controller = RunController(persister, max_failures=max_failures)
+    runner = Runner(fjoin(), verbosity=verbosity, run_controller=run_controller,
+                    processes=processes)
+    total = runner.run()
+    return total, persister.final_results_list
+
+def test_scenario_ids_do_not_depend_on_the_current_dir():
+    "failed test checking: Scenarios are known by the same ids from any current dir, even when they share their name"
+
+    filename = failed_feature_name('some_failing_scenarios')
+    ids = scenario_ids(filename)
+    original_path = abspath(".")
+    os.chdir(dirname(filename))
+    try:
+        assert_equals(scenario_ids(filename), ids)
+    finally:
+        os.chdir(original_path)
+
+    feature = Feature.from_string(
+        "Feature: twins\n"
+        "  Scenario: twin\n"
+        "    Given a step\n"
+        "  Scenario: twin\n"
+        "    Given a step\n")
+    first, second = feature.scenarios
+    assert first.identity() != second.identity()
+
+def test_scenario_ids_do_not_depend_on_the_order_of_scenarios():
+    "failed test checking: Adding, removing or moving scenarios leaves the ids of the others alone"
+
+    def ids_by_name(string):
+        ids = {}
+        for scenario in Feature.from_string(string).scenarios:
+            for outline in scenario.outlines or [None]:
+                ids.setdefault(scenario.name, []).append(scenario.identity(outline))
+        return ids
+
+    before = ids_by_name(
+        "Feature: fruits\n"
+        "  Scenario: apples\n"
+        "    Given a step\n"
+        "  Scenario: twin\n"
+        "    Given a step\n"
+        "  Scenario Outline: pears\n"
+        "    Given <count> pears\n"
+        "  Examples:\n"
+        "    | count |\n"
+        "    | 1     |\n"
+        "    | 2     |\n"
+        "  Scenario: twin\n"
+        "    Given another step\n")
+    after = ids_by_name(
+        "Feature: fruits\n"
+        "  Scenario: bananas\n"
+        "    Given a step\n"
+        "  Scenario Outline: pears\n"
+        "    Given <count> pears\n"
+        "  Examples:\n"
+        "    | count |\n"
+        "    | 1     |\n"
+        "    | 2     |\n"
+        "  Scenario: twin\n"
+        "    Given a step\n"
+        "  Scenario: twin\n"
+        "    Given another step\n")
+
+    assert_equals(after['pears'], before['pears'])
+    assert_equals(after['twin'], before['twin'])
+    assert 'apples' not in after
+
+@with_setup(prepare_stdout)
+def test_run_features_across_many_processes():
+    "Running features in worker processes gives the same results as running them sequentially"
+
+    sequential, sequential_ids = run_failed_features(processes=1)
+    sequential_output = sys.stdout.getvalue()
+    prepare_stdout()
+    parallel, parallel_ids = run_failed_features(processes=2)
+
+    assert_equals(parallel.features_ran, 2)
+    assert_equals(parallel.features_passed, sequential.features_passed)
+    assert_equals(parallel.scenarios_ran, sequential.scenarios_ran)
+    assert_equals(parallel.scenarios_passed, sequential.scenarios_passed)
+    assert_equals(parallel.steps, sequential.steps)
+    assert_equals(parallel.steps_passed, sequential.steps_passed)
+    assert_equals(parallel.steps_failed, sequential.steps_failed)
+    assert_equals(parallel.steps_skipped, sequential.steps_skipped)
+
+    assert_equals(sorted(parallel_ids.keys()), sorted(sequential_ids.keys()))
+    for scenario_id, summary in sequential_ids.items():
+        assert_equals(parallel_ids[scenario_id].status, summary.status)
+
+    assert_equals(sys.stdout.getvalue(), sequential_output)
+
+@with_setup(prepare_stdout, registry.clear)
+def test_max_failures_stops_running_scenarios():
+    "Once as many scenarios as told have failed, the remaining ones are reported as not run, cleanup hooks still run"
+
+    world.hooks_ran = []
+
+    @after.each_scenario
+    def after_scenario(scenario):
+        world.hooks_ran.append(('scenario', scenario.name))
+
+    @after.each_feature
+    def after_feature(feature):
+        world.hooks_ran.append(('feature', feature.name))
+
+    @after.all
+    def after_all(total):
+        world.hooks_ran.append(('all', total.scenarios_not_run))
+
+    total, ids = run_failed_features(processes=1, max_failures=1)
+
+    # undefined steps count as failures as well
+    assert_equals(total.scenarios_ran, 9)
+    assert_equals(total.scenarios_ran - total.scenarios_passed - total.scenarios_not_run, 1)
+    assert_equals(total.features_not_run, 1)
+    assert_equals([result.status for result in ids.values()].count(ScenarioResultSummary.FAILED), 1)
+
+    ran = [name for kind, name in world.hooks_ran if kind == 'scenario']
+    assert ran, world.hooks_ran
+    assert_equals(len([kind for kind, name in world.hooks_ran if kind == 'feature']), 1)
+    assert_equals(world.hooks_ran[-1], ('all', total.scenarios_not_run))
+    assert "(stopped after 1 failed scenarios)" in sys.stdout.getvalue()
+
+@with_setup(prepare_stdout, registry.clear)
+def test_worker_processes_hand_failures_back_to_the_output():
+    "Output plugins show the tracebacks of the scenarios that failed within worker processes"
+
+    for verbosity in (1, 2):
+        prepare_stdout()
+        run_failed_features(processes=1, verbosity=verbosity)
+        sequential_output = sys.stdout.getvalue()
+        prepare_stdout()
+        run_failed_features(processes=2, verbosity=verbosity)
+        parallel_output = sys.stdout.getvalue()
+
+        assert "AssertionError: bang" in sequential_output, sequential_output
+        assert_equals(parallel_output.count("AssertionError: bang"),
+                      sequential_output.count("AssertionError: bang"))
+
+@with_setup(prepare_stdout, registry.clear)
+def test_max_failures_stops_worker_processes():
+    "Worker processes stop running scenarios once as many as told have failed in any of them"
+
+    total, ids = run_failed_features(processes=2, max_failures=1)
+
+    assert_equals(total.scenarios_ran, 9)
+    failures = total.scenarios_ran - total.scenarios_passed - total.scenarios_not_run
+    assert failures in (1, 2), failures
+    assert total.scenarios_not_run >= 4, total.scenarios_not_run
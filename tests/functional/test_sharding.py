@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import sys
+from nose.tools import assert_equals, with_setup
+
+from lettuce import step
+from lettuce import registry
+from lettuce import Runner
+from lettuce.core import RunController, PrevResultPersister, ScenarioResultSummary
+from lettuce.sharding import merge_results
+from lettuce.lettuce_cli import merge
+from tests.functional.test_runner import fjoin, MockPrevResultPersister
+from tests.asserts import prepare_stdout
+from tests.sandbox import sandbox, make_sandbox, remove_sandbox, sandbox_path
+
+def define_steps():
+    @step('working step')
+    def working_step(step):
+        pass
+
+    @step('breaking step')
+    def breaking_step(step):
+        raise AssertionError('bang')
+
+    @step('I have entered')
+    def have_entered(step):
+        pass
+
+    @step('result should be')
+    def result_should_be(step):
+        pass
+
+    @step('When I press add')
+    def press_add(step):
+        pass
+
+def scenario_names(total):
+    return sorted([(result.feature.name, scenario.scenario.name)
+                   for result in total.feature_results
+                   for scenario in result.scenario_results])
+
+@with_setup(make_sandbox, remove_sandbox)
+def test_shards_run_every_scenario_once_and_merge_back():
+    "Each shard runs its own scenarios and writes them down, merging them sums up the whole run"
+
+    define_steps()
+    whole = Runner(fjoin(), run_controller=RunController()).run()
+
+    filenames = []
+    names = []
+    for index in (1, 2, 3):
+        filename = sandbox_path('lettuceresults-%d.json' % index)
+        runner = Runner(fjoin(), run_controller=RunController(),
+                        shard=(index, 3), enable_results=True,
+                        results_filename=filename)
+        total = runner.run()
+        registry.clear()
+        define_steps()
+
+        assert total.scenarios_ran > 0
+        names.extend(scenario_names(total))
+        filenames.append(filename)
+
+    assert_equals(sorted(names), scenario_names(whole))
+
+    merged = merge_results(filenames)
+    assert_equals(merged.features_ran, whole.features_ran)
+    assert_equals(merged.features_passed, whole.features_passed)
+    assert_equals(merged.scenarios_ran, whole.scenarios_ran)
+    assert_equals(merged.scenarios_passed, whole.scenarios_passed)
+    assert_equals(merged.scenarios_failed, whole.scenarios_failed)
+    assert_equals(merged.steps, whole.steps)
+    assert_equals(merged.steps_passed, whole.steps_passed)
+    assert_equals(merged.steps_failed, whole.steps_failed)
+    assert_equals(merged.steps_skipped, whole.steps_skipped)
+
+@with_setup(make_sandbox, remove_sandbox)
+def test_merging_results_tells_the_whole_run():
+    "lettuce merge-results writes the summary of the whole run out, failures first"
+
+    define_steps()
+    filenames = []
+    for index in (1, 2):
+        filename = sandbox_path('lettuceresults-%d.json' % index)
+        Runner(fjoin(), run_controller=RunController(), shard=(index, 2),
+               enable_results=True, results_filename=filename).run()
+        registry.clear()
+        define_steps()
+        filenames.append(filename)
+
+    prepare_stdout()
+    total = merge(filenames)
+
+    output = sys.stdout.getvalue()
+    assert "\nFailed: " in output, output
+    assert "\n%d scenarios (%d failed, %d passed)\n" % (
+        total.scenarios_ran, total.scenarios_failed, total.scenarios_passed) in output, output
+    assert output.index("Failed: ") < output.index("%d features" % total.features_ran)
+
+def shard_names(count, **kw):
+    "Runs each of `count` shards, returning the names of the scenarios each one ran"
+    names = []
+    for index in range(1, count + 1):
+        define_steps()
+        total = Runner(fjoin(), shard=(index, count), **kw).run()
+        registry.clear()
+        names.append(scenario_names(total))
+
+    return names
+
+def slow_history(total):
+    "Makes up a history where the later a scenario is, the longer it took"
+    history = {}
+    for feature_result in total.feature_results:
+        for position, result in enumerate(feature_result.scenario_results):
+            history[result.id] = ScenarioResultSummary(
+                result.id, ScenarioResultSummary.PASSED, 10.0 * position, 1, 0,
+                len(result.scenario.steps))
+
+    return history
+
+@with_setup(make_sandbox, remove_sandbox)
+def test_shards_do_not_depend_on_the_local_history():
+    "Shards split the same way whatever each executor ran before, unless given a shard history"
+
+    define_steps()
+    history = slow_history(Runner(fjoin(), run_controller=RunController()).run())
+    registry.clear()
+
+    by_steps = shard_names(2, run_controller=RunController())
+    with_local_history = shard_names(
+        2, run_controller=RunController(MockPrevResultPersister(history)))
+    assert_equals(with_local_history, by_steps)
+
+    filename = sandbox_path('history')
+    PrevResultPersister(filename).write_results(history)
+    by_history = shard_names(2, run_controller=RunController(),
+                             shard_history=filename)
+    assert by_history != by_steps, by_history
+    assert_equals(sorted(by_history[0] + by_history[1]),
+                  sorted(by_steps[0] + by_steps[1]))
@@ -26,7 +26,7 @@ def test_imports_terrain_under_path_that_is_run():
 
     os.chdir(join(abspath(dirname(__file__)), 'simple_features', '1st_feature_dir'))
 
-    status, output = commands.getstatusoutput('python -c "from lettuce import world;assert hasattr(world, \'works_fine\'); print \'it passed!\'"')
+    status, output = commands.getstatusoutput('python -c "import lettuce;lettuce.load_terrain();from lettuce import world;assert hasattr(world, \'works_fine\'); print \'it passed!\'"')
 
     assert_equals(status, 0)
     assert_equals(output, "it passed!")
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import sys
+import time
+from os.path import dirname, join, abspath
+from nose.tools import assert_equals, with_setup
+
+from lettuce import Runner
+from lettuce import timing
+
+from tests.asserts import prepare_stdout
+from tests.sandbox import sandbox, make_sandbox, remove_sandbox, sandbox_path
+
+current_dir = abspath(dirname(__file__))
+outline_feature = join(current_dir, 'output_features', 'success_outline',
+                       'success_outline.feature')
+
+@with_setup(prepare_stdout)
+def test_runs_are_timed():
+    "Running features records how long each step, scenario and feature took"
+
+    total = Runner(outline_feature, verbosity=0).run()
+
+    assert total.load_duration >= 0
+    feature_result, = total.feature_results
+    assert feature_result.duration >= feature_result.hooks_duration >= 0
+    assert feature_result.parse_duration >= 0
+
+    assert_equals(len(feature_result.scenario_results), 3)
+    for scenario_result in feature_result.scenario_results:
+        assert scenario_result.duration >= 0
+        assert_equals(len(scenario_result.all_steps), 8)
+        for step in scenario_result.all_steps:
+            assert 0 <= step.duration <= scenario_result.duration
+            assert step.hooks_duration >= 0
+
+@with_setup(make_sandbox, remove_sandbox)
+def test_profile_writes_stats_and_report():
+    "Profiling writes the cProfile stats of each feature and a report of " \
+    "the slowest steps and step definitions"
+
+    runner = Runner(outline_feature, verbosity=0, profile_dir=sandbox['dir'])
+    total = runner.run()
+
+    written = os.listdir(sandbox['dir'])
+    assert_equals(len(written), 2)
+    assert 'slowest.txt' in written, written
+    assert [name for name in written
+            if name.endswith('success_outline.feature.prof')], written
+
+    steps = timing.slowest_steps(total)
+    assert_equals(len(steps), 24)
+    assert_equals(steps, sorted(steps, key=lambda step: -step.duration))
+
+    definitions = timing.slowest_definitions(total)
+    assert_equals(len(definitions), 5)
+    assert_equals(sum([calls for _, _, calls, _ in definitions]), 24)
+
+    report = open(sandbox_path('slowest.txt')).read()
+    assert 'slowest 50 steps:' in report
+    assert 'success_outline_steps.py' in report
+
+def test_clock_is_monotonic():
+    'Durations are measured with a monotonic clock, not with the system clock'
+    if sys.platform.startswith('linux'):
+        assert timing.clock is not time.time
+
+    readings = [timing.clock() for i in range(1000)]
+    assert_equals(readings, sorted(readings))
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import sys
+from nose.tools import assert_equals, with_setup
+
+from lettuce import Runner
+from lettuce.core import RunController
+from lettuce.watch import Watcher
+from tests.sandbox import sandbox, make_sandbox, remove_sandbox, write
+
+ONE_FEATURE = '''
+Feature: One
+  Scenario: Do one thing
+    Given I do one thing
+'''
+
+TWO_FEATURE = '''
+Feature: Two
+  Scenario: Do another thing
+    Given I do another thing
+'''
+
+UNDEFINED_FEATURE = '''
+Feature: Undefined
+  Scenario: Do something undefined
+    Given I do another thing
+    And I do something undefined
+'''
+
+STEPS = '''from lettuce import step
+
+@step(u'I do %s')
+def %s(step):
+    %s
+'''
+
+def make_watched_sandbox():
+    make_sandbox()
+    write('features/one.feature', ONE_FEATURE)
+    write('features/two.feature', TWO_FEATURE)
+    write('features/watched_one_steps.py', STEPS % ('one thing', 'one_thing', 'pass'))
+    write('features/watched_two_steps.py', STEPS % ('another thing', 'another_thing', 'pass'))
+
+def remove_watched_sandbox():
+    remove_sandbox()
+    for name in ('watched_one_steps', 'watched_two_steps', 'watched_new_steps'):
+        sys.modules.pop(name, None)
+
+def start_watching(scenarios=2, base_dir=None):
+    runner = Runner(os.path.join(base_dir or sandbox['dir'], 'features'),
+                    verbosity=0, run_controller=RunController())
+    watcher = Watcher(runner)
+    result = watcher.start()
+    assert_equals(result.scenarios_ran, scenarios)
+    return watcher
+
+def features_of(result):
+    return [feature_result.feature.name for feature_result in result.feature_results]
+
+@with_setup(make_watched_sandbox, remove_watched_sandbox)
+def test_nothing_changed():
+    "Nothing is run again while no file changes"
+
+    watcher = start_watching()
+    assert_equals(watcher.changes(), [])
+
+@with_setup(make_watched_sandbox, remove_watched_sandbox)
+def test_changed_step_module_runs_again_the_features_using_it():
+    "Changing a step module reloads it, and runs again the features that used it"
+
+    watcher = start_watching()
+    write('features/watched_one_steps.py', STEPS % ('one thing', 'one_thing', 'assert False'))
+    result = watcher.run_again(watcher.changes())
+
+    assert_equals(features_of(result), ['One'])
+    assert_equals(result.steps_failed, 1)
+
+@with_setup(make_watched_sandbox, remove_watched_sandbox)
+def test_changed_feature_runs_again():
+    "Changing a feature file runs again that feature only"
+
+    watcher = start_watching()
+    write('features/two.feature', TWO_FEATURE.replace('another thing', 'one thing'))
+    result = watcher.run_again(watcher.changes())
+
+    assert_equals(features_of(result), ['Two'])
+    assert_equals(result.steps_passed, 1)
+
+@with_setup(make_watched_sandbox, remove_watched_sandbox)
+def test_new_step_module_runs_again_features_with_undefined_steps():
+    "A new step module runs again the features that had undefined steps"
+
+    write('features/undefined.feature', UNDEFINED_FEATURE)
+    watcher = start_watching(3)
+    write('features/watched_new_steps.py', STEPS % ('something undefined', 'defined_now', 'pass'))
+    result = watcher.run_again(watcher.changes())
+
+    assert_equals(features_of(result), ['Undefined'])
+    assert_equals(result.steps_passed, 2)
+
+@with_setup(make_watched_sandbox, remove_watched_sandbox)
+def test_removed_step_definitions_are_forgotten():
+    "Step definitions removed from a module are no longer there once it is reloaded"
+
+    watcher = start_watching()
+    write('features/watched_one_steps.py', STEPS % ('one other thing', 'one_other_thing', 'pass'))
+    result = watcher.run_again(watcher.changes())
+
+    assert_equals(features_of(result), ['One'])
+    assert_equals(result.steps_undefined, 1)
+
+@with_setup(make_watched_sandbox, remove_watched_sandbox)
+def test_watching_features_through_a_symlink():
+    "Changes are told the same way when the features are reached through a symlink"
+
+    link = sandbox['dir'] + '-link'
+    os.symlink(sandbox['dir'], link)
+    try:
+        write('features/undefined.feature', UNDEFINED_FEATURE)
+        watcher = start_watching(3, base_dir=link)
+        write('features/watched_one_steps.py', STEPS % ('one thing', 'one_thing', 'assert False'))
+        result = watcher.run_again(watcher.changes())
+
+        assert_equals(features_of(result), ['One', 'Undefined'])
+        assert_equals(result.steps_failed, 1)
+    finally:
+        os.remove(link)
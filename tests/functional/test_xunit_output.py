@@ -27,69 +27,97 @@ from lettuce import xunit_output
 from lxml import etree
 from tests.functional.test_runner import feature_name
 from tests.asserts import prepare_stdout
+from tests.sandbox import sandbox, make_sandbox, remove_sandbox, sandbox_path
 
-@with_setup(prepare_stdout, registry.clear)
-def test_xunit_output_with_no_errors():
-    'Test xunit output with no errors'
-    called = []
-    def assert_correct_xml(filename, content):
-        called.append(True)
-        root = etree.fromstring(content)
-        assert_equals(root.get("tests"), "1")
-        assert_equals(len(root.getchildren()), 1)
-        assert_equals(root.find("testcase").get("name"), "Given I do nothing")
-        assert_true(float(root.find("testcase").get("time")) > 0)
-
-    old = xunit_output.wrt_output
-    xunit_output.wrt_output = assert_correct_xml
-    runner = Runner(feature_name('commented_feature'), enable_xunit=True)
+def run_with_xunit(name, filename="lettucetests.xml", **kw):
+    "Runs the given output feature, returning the root of the xml written"
+    runner = Runner(feature_name(name), enable_xunit=True,
+                    xunit_filename=sandbox_path(filename), **kw)
     runner.run()
+    return etree.parse(sandbox_path(filename)).getroot()
 
-    assert_equals(1, len(called), "Function not called")
-    xunit_output.wrt_output = old
+@with_setup(make_sandbox, remove_sandbox)
+def test_xunit_output_with_no_errors():
+    'Test xunit output with no errors'
+    root = run_with_xunit('commented_feature')
 
+    assert_equals(root.get("tests"), "1")
+    assert_equals(len(root.getchildren()), 1)
+    assert_equals(root.find("testcase").get("name"), "Given I do nothing")
+    assert_true(float(root.find("testcase").get("time")) > 0)
 
-@with_setup(prepare_stdout, registry.clear)
+@with_setup(make_sandbox, remove_sandbox)
 def test_xunit_output_with_one_error():
     'Test xunit output with one errors'
-    called = []
-    def assert_correct_xml(filename, content):
-        called.append(True)
-        root = etree.fromstring(content)
-        assert_equals(root.get("tests"), "2")
-        assert_equals(root.get("failed"), "1")
-        assert_equals(len(root.getchildren()), 2)
-
-        passed, failed = root.findall("testcase")
-        assert_equals(passed.get("name"), "Given my step that passes")
-        assert_true(float(passed.get("time")) > 0)
-        assert_equals(failed.get("name"), "Given my step that blows a exception")
-        assert_true(float(failed.get("time")) > 0)
-        assert_true(failed.find("failure") is not None)
-
-    old = xunit_output.wrt_output
-    xunit_output.wrt_output = assert_correct_xml
-    runner = Runner(feature_name('error_traceback'), enable_xunit=True)
-    runner.run()
+    root = run_with_xunit('error_traceback')
+
+    assert_equals(root.get("tests"), "2")
+    assert_equals(root.get("failed"), "1")
+    assert_equals(len(root.getchildren()), 2)
 
-    assert_equals(1, len(called), "Function not called")
-    xunit_output.wrt_output = old
+    passed, failed = root.findall("testcase")
+    assert_equals(passed.get("name"), "Given my step that passes")
+    assert_true(float(passed.get("time")) > 0)
+    assert_equals(failed.get("name"), "Given my step that blows a exception")
+    assert_true(float(failed.get("time")) > 0)
+    assert_true(failed.find("failure") is not None)
 
-@with_setup(prepare_stdout, registry.clear)
+@with_setup(make_sandbox, remove_sandbox)
 def test_xunit_output_with_different_filename():
     'Test xunit output with different filename'
-    called = []
-    def assert_correct_xml(filename, content):
-        called.append(True)
-        assert_equals(filename, "custom_filename.xml")
-
-    old = xunit_output.wrt_output
-    xunit_output.wrt_output = assert_correct_xml
-    runner = Runner(feature_name('error_traceback'), enable_xunit=True,
-                    xunit_filename="custom_filename.xml")
-    runner.run()
+    run_with_xunit('error_traceback', filename="custom_filename.xml")
+
+    assert_equals(os.listdir(sandbox['dir']), ["custom_filename.xml"])
+
+@with_setup(make_sandbox, remove_sandbox)
+def test_xunit_output_with_scenarios_as_testcases():
+    'Test xunit output with a testcase per scenario, outlines having one per example'
+    root = run_with_xunit('success_outline', xunit_testcases='scenario')
+
+    assert_equals(root.get("tests"), "3")
+    assert_equals(root.get("failed"), "0")
+    names = [testcase.get("name") for testcase in root.findall("testcase")]
+    assert_equals(names, [
+        "fill a web form (example 1)",
+        "fill a web form (example 2)",
+        "fill a web form (example 3)",
+    ])
+
+@with_setup(make_sandbox, remove_sandbox)
+def test_xunit_output_with_a_suite_per_feature():
+    'Test xunit output grouping testcases within a testsuite per feature'
+    root = run_with_xunit('error_traceback', xunit_testcases='scenario',
+                          xunit_suite_per_feature=True)
+
+    assert_equals(root.tag, "testsuites")
+    assert_equals(root.get("tests"), "2")
+    assert_equals(root.get("failed"), "1")
+
+    suite, = root.findall("testsuite")
+    assert_equals(suite.get("name"), "Error traceback for output testing")
+    assert_equals(suite.get("tests"), "2")
+    assert_equals(suite.get("failed"), "1")
+
+    passed, failed = suite.findall("testcase")
+    assert_equals(passed.get("name"), "It should pass")
+    assert_true(passed.find("failure") is None)
+    assert_equals(failed.get("name"), "It should raise an exception different of AssertionError")
+    assert_true(failed.find("failure") is not None)
 
-    assert_equals(1, len(called), "Function not called")
-    xunit_output.wrt_output = old
+@with_setup(make_sandbox, remove_sandbox)
+def test_xunit_file_is_valid_while_being_written():
+    'Test xunit file is valid xml after each testcase, before the run finishes'
+    filename = sandbox_path("unfinished.xml")
+    writer = xunit_output.XunitWriter(filename, suite_per_feature=True)
+    writer.open_suite(u"Some feature")
+    writer.add_test_case(xunit_output.make_test_case(u"cls", u"first", 0.5), False)
+    writer.add_test_case(xunit_output.make_test_case(u"cls", u"second ]]> <", 0.5), False)
 
+    root = etree.parse(filename).getroot()
+    assert_equals(root.get("tests"), "2")
+    suite, = root.findall("testsuite")
+    assert_equals([testcase.get("name") for testcase in suite.findall("testcase")],
+                  ["first", "second ]]> <"])
 
+    writer.close()
+    assert_equals(etree.parse(filename).getroot().get("tests"), "2")
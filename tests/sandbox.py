@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""A temporary dir for the functional tests that write files (caches,
+reports, features that change...), made anew for each test:
+
+    @with_setup(make_sandbox, remove_sandbox)
+    def test_something():
+        write('features/one.feature', FEATURE)
+        Runner(sandbox_path('features')).run()
+
+What the runs print is captured, and the step definitions and hooks
+they register are cleared afterwards. Tests that need more set up wrap
+make_sandbox and remove_sandbox, and keep whatever else they need within
+`sandbox`.
+"""
+import os
+import shutil
+import tempfile
+
+from lettuce import registry
+from tests.asserts import prepare_stdout
+
+sandbox = {}
+
+def make_sandbox():
+    prepare_stdout()
+    sandbox.clear()
+    sandbox['dir'] = tempfile.mkdtemp()
+    sandbox['mtime'] = 1000000000
+
+def remove_sandbox():
+    registry.clear()
+    shutil.rmtree(sandbox['dir'])
+
+def sandbox_path(*names):
+    return os.path.join(sandbox['dir'], *names)
+
+def write(name, content):
+    """Writes a file of the sandbox, making its dir if needed. It always
+    gets a newer mtime than the files written before, however fast they
+    are written. Returns the file name."""
+    filename = sandbox_path(name)
+    if not os.path.isdir(os.path.dirname(filename)):
+        os.makedirs(os.path.dirname(filename))
+
+    if isinstance(content, unicode):
+        content = content.encode('utf-8')
+
+    f = open(filename, 'w')
+    f.write(content)
+    f.close()
+
+    sandbox['mtime'] += 10
+    os.utime(filename, (sandbox['mtime'], sandbox['mtime']))
+    return filename
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import sys
+from StringIO import StringIO
+from nose.tools import assert_equals, with_setup
+
+from lettuce.console import Console, DEFAULT_BUFFER_SIZE
+
+class Terminal(StringIO):
+    def isatty(self):
+        return True
+
+def keep_stdout():
+    keep_stdout.stdout = sys.stdout
+
+def restore_stdout():
+    sys.stdout = keep_stdout.stdout
+
+@with_setup(keep_stdout, restore_stdout)
+def test_console_gathers_output_until_flushed():
+    "Console gathers what is written until flushed, when not within a terminal"
+    sys.stdout = StringIO()
+    console = Console()
+    console.write(u'Feature: Açaí\n')
+    console.write('Scenario: it\n')
+    assert_equals(sys.stdout.getvalue(), '')
+
+    console.flush()
+    assert_equals(sys.stdout.getvalue(), u'Feature: Açaí\nScenario: it\n'.encode('utf-8'))
+
+@with_setup(keep_stdout, restore_stdout)
+def test_console_writes_out_once_the_buffer_is_full():
+    "Console writes out what it gathered once there are buffer_size bytes"
+    sys.stdout = StringIO()
+    console = Console(buffer_size=10)
+    console.write('12345')
+    assert_equals(sys.stdout.getvalue(), '')
+
+    console.write('67890')
+    assert_equals(sys.stdout.getvalue(), '1234567890')
+
+@with_setup(keep_stdout, restore_stdout)
+def test_console_writes_right_away_within_a_terminal():
+    "Console writes right away within a terminal, unless told otherwise"
+    sys.stdout = Terminal()
+    console = Console()
+    console.write('.')
+    assert_equals(sys.stdout.getvalue(), '.')
+    assert_equals(console.current_limit(), 0)
+
+    console.buffer_size = DEFAULT_BUFFER_SIZE
+    console.write('.')
+    assert_equals(sys.stdout.getvalue(), '.')
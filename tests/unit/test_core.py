@@ -164,3 +164,29 @@ def test_scenario_outline_represent_examples():
         '    | first     | primeiro  |\n'
         '    | second    | segundo   |\n'
     )
+
+def test_scenario_outline_examples_lines():
+    "Scenario.examples_lines renders the examples table once"
+
+    scenario = core.Scenario.from_string(SCENARIO_OUTLINE)
+
+    lines = scenario.examples_lines()
+    assert_equals(lines, [
+        u'| value_one | and_other |',
+        u'| first     | primeiro  |',
+        u'| second    | segundo   |',
+    ])
+    assert scenario.examples_lines() is lines
+
+def test_solved_step_represent_table():
+    "Step.represent_hashes of a solved step shows the solved table"
+
+    step = core.Step.from_string(u"""I have the following items:
+    | name   |
+    | <item> |
+""")
+    assert_equals(step.represent_hashes(), u'      | name   |\n      | <item> |\n')
+
+    solved = step.solve_and_clone({'item': 'Glass'})
+    assert_equals(solved.represent_hashes(), u'      | name  |\n      | Glass |\n')
+    assert_equals(step.represent_hashes(), u'      | name   |\n      | <item> |\n')
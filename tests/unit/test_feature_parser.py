@@ -259,6 +259,25 @@ def test_feature_max_length_on_step_with_table():
     feature = Feature.from_string(FEATURE5)
     assert_equals(feature.max_length, 83)
 
+def test_feature_layout_is_computed_once():
+    "The layout of a feature is computed once, and its max length comes from it"
+
+    feature = Feature.from_string(FEATURE5)
+    layout = feature.layout
+    assert_equals(layout.max_length, 83)
+    assert_equals(layout.width, 84)
+    assert feature.layout is layout
+
+def test_feature_layout_is_forgotten_once_a_table_changes():
+    "Setting the hashes of a step makes its feature compute its layout again"
+
+    feature = Feature.from_string(FEATURE5)
+    layout = feature.layout
+    step = feature.scenarios[0].steps[0]
+    step.hashes = [dict((key, u'x' * 100) for key in step.keys)]
+    assert feature.layout is not layout
+    assert feature.max_length > 100
+
 def test_feature_max_length_on_step_with_table_keys():
     "The max length of a feature considering when the table keys of some of the " \
     "steps are longer than the remaining things"
@@ -14,8 +14,13 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import shutil
+import tempfile
+
 import lettuce
 from lettuce import lettuce_cli
+from lettuce.console import console
 import lettuce.fs
 from nose.tools import assert_equals
 from mox import Mox
@@ -37,6 +42,9 @@ def test_terrain_import_exception():
         'module "terrain"\nbut it has errors, check its contents and ' \
         'try to run lettuce again.\n\nOriginal traceback below:\n\n'
 
+    from lettuce import runner
+    runner.terrains.clear()
+
     mox = Mox()
 
     mox.StubOutWithMock(lettuce.fs, 'FileSystem')
@@ -53,12 +61,13 @@ def test_terrain_import_exception():
     mox.ReplayAll()
 
     try:
-        reload(lettuce)
+        runner.load_terrain()
     except SystemExit:
         mox.VerifyAll()
 
     finally:
         mox.UnsetStubs()
+        runner.terrains.clear()
 
 def test_arument_parsing():
     "arguments to control what tags are to be run"
@@ -74,3 +83,22 @@ def test_arument_parsing():
     runner = lettuce_cli.create_runner(args, base_path)
     controller = runner.run_controller
     assert_equals(["one,two", "three,four,five", "six"], controller.tags_to_run)
+
+def test_cli_settings_stay_with_their_runner():
+    "what the command line tells goes to its runner, not to later ones"
+    base_path = os.path.dirname(__file__)
+    cache_dir = tempfile.mkdtemp()
+    try:
+        args = ["--cache-dir", cache_dir, "--parser", "regex",
+                "--output-buffer", "0"]
+        runner = lettuce_cli.create_runner(args, base_path)
+        assert runner.loader.file_cache is not None
+        assert_equals(runner.parser, "regex")
+
+        runner = lettuce.Runner(base_path)
+        assert_equals(runner.loader.file_cache, None)
+        assert_equals(runner.loader.step_manifest, None)
+        assert_equals(runner.parser, None)
+        assert_equals(console.buffer_size, None)
+    finally:
+        shutil.rmtree(cache_dir)
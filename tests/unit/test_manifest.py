@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_equals
+
+from lettuce.core import StepDefinition
+from lettuce.manifest import extract_step_definitions, declared_function
+
+def test_extracts_step_regexes_lines_and_names():
+    "The manifest tells the regex, line and function of each step definition"
+
+    source = '''# -*- coding: utf-8 -*-
+import lettuce
+from lettuce import step as define, world, before
+from django.contrib.auth.models import User
+
+@before.each_scenario
+def clean(scenario):
+    User.objects.all().delete()
+
+@define(r'I have (\\d+) users')
+def have_users(step, count):
+    pass
+
+@lettuce.step(u'I see them'
+              ' all')
+def see_them(step):
+    pass
+'''
+    assert_equals(extract_step_definitions(source), [
+        (r'I have (\d+) users', 10, 'have_users'),
+        (u'I see them all', 14, 'see_them'),
+    ])
+
+def test_modules_without_steps_have_none():
+    "A module with no step definitions has an empty list of them"
+
+    assert_equals(extract_step_definitions('import os\nHOME = os.environ["HOME"]\n'), [])
+
+def test_steps_that_cannot_be_read_need_importing():
+    "Steps defined in ways only running the module tells are left out of the manifest"
+
+    for source in [
+        'from lettuce import step\nREGEX = "x"\n@step(REGEX)\ndef f(step):\n    pass\n',
+        'from lettuce import step\nstep("x")(lambda step: None)\n',
+        'from lettuce import step\ndef define():\n    @step("x")\n    def f(step):\n        pass\n',
+        'from helpers import my_step\n@my_step("x")\ndef f(step):\n    pass\n',
+        'from lettuce.registry import STEP_REGISTRY\nSTEP_REGISTRY["x"] = None\n',
+        'from lettuce_webdriver.webdriver import *\n',
+        'from lettuce import step\n@step("(unbalanced")\ndef f(step):\n    pass\n',
+        'def broken(:\n',
+    ]:
+        assert_equals(extract_step_definitions(source), None)
+
+def test_declared_functions_are_where_the_definitions_are():
+    "Step definitions that were only read tell the same file and line as if imported"
+
+    function = declared_function('/tmp/steps.py', 10, 'have_users')
+    assert_equals(function.__name__, 'have_users')
+    definition = StepDefinition(None, function)
+    assert_equals(definition.line, 11)
+    assert definition.file.endswith('steps.py')
+
+def test_steps_importing_modules_that_define_steps_need_importing():
+    "Step modules importing modules of the project that mention lettuce are left out of the manifest"
+
+    directory = tempfile.mkdtemp()
+    try:
+        for name, source in [
+            ('defining_helpers.py', 'from lettuce import step\n'),
+            ('importing_helpers.py', 'import defining_helpers\n'),
+            ('plain_helpers.py', 'import os\nHOME = os.environ["HOME"]\n'),
+        ]:
+            f = open(os.path.join(directory, name), 'w')
+            f.write(source)
+            f.close()
+
+        steps = 'from lettuce import step\nimport %s\n@step("x")\ndef f(step):\n    pass\n'
+        for helper in ['defining_helpers', 'importing_helpers']:
+            assert_equals(extract_step_definitions(steps % helper, directory), None)
+
+        assert_equals(extract_step_definitions(steps % 'plain_helpers', directory),
+                      [('x', 3, 'f')])
+    finally:
+        shutil.rmtree(directory)
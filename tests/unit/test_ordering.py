@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from nose.tools import assert_equals, assert_raises
+
+from lettuce.core import Feature, RunController, ScenarioResultSummary
+from lettuce.ordering import Estimator, get_ordering
+
+FEATURE = u'''
+Feature: Order things
+  Scenario: Short one
+    Given I do one thing
+
+  Scenario: Long one
+    Given I do one thing
+    And I do another thing
+    And I do yet another thing
+
+  Scenario: Failing one
+    Given I do one thing
+    And I do another thing
+
+  Scenario Outline: Rows
+    Given I do <what>
+
+  Examples:
+    | what    |
+    | nothing |
+    | more    |
+'''
+
+PASSED = ScenarioResultSummary.PASSED
+FAILED = ScenarioResultSummary.FAILED
+
+class FakePersister(object):
+    def __init__(self, results):
+        self.results = results
+
+    def read_previous_results(self):
+        return self.results
+
+def names(scenarios):
+    return [scenario.name for scenario in scenarios]
+
+def run_controller_with(feature, *summaries):
+    "Makes a RunController that knows the given (status, duration, runs, failures) of each scenario"
+    results = {}
+    scenarios = [s for s in feature.scenarios for o in s.outlines or [None]]
+    outlines = [o for s in feature.scenarios for o in s.outlines or [None]]
+    for scenario, outline, summary in zip(scenarios, outlines, summaries):
+        if summary:
+            scenario_id = scenario.identity(outline)
+            status, duration, runs, failures = summary
+            results[scenario_id] = ScenarioResultSummary(
+                scenario_id, status, duration, runs, failures,
+                len(scenario.steps))
+
+    return RunController(FakePersister(results))
+
+def test_file_order_keeps_scenarios_in_place():
+    "The file order keeps scenarios in the order they were written"
+
+    feature = Feature.from_string(FEATURE)
+    ordering = get_ordering('file')
+    assert_equals(names(ordering.sort_scenarios(feature.scenarios)),
+                  [u'Short one', u'Long one', u'Failing one', u'Rows'])
+
+def test_failed_first_runs_failures_then_new_scenarios():
+    "failed-first runs what failed last time, then what never ran, then what fails the most"
+
+    feature = Feature.from_string(FEATURE)
+    controller = run_controller_with(feature,
+                                     (PASSED, 1.0, 4, 0),
+                                     (PASSED, 1.0, 4, 2),
+                                     (FAILED, 1.0, 4, 1),
+                                     (PASSED, 1.0, 4, 0),
+                                     None)
+    ordering = get_ordering('failed-first', controller)
+    assert_equals(names(ordering.sort_scenarios(feature.scenarios)),
+                  [u'Failing one', u'Rows', u'Long one', u'Short one'])
+
+def test_slowest_first_uses_durations_then_step_counts():
+    "slowest-first runs the longest first, estimating by steps what never ran"
+
+    feature = Feature.from_string(FEATURE)
+    controller = run_controller_with(feature,
+                                     (PASSED, 5.0, 1, 0),
+                                     None,
+                                     (PASSED, 1.0, 1, 0),
+                                     (PASSED, 0.5, 1, 0),
+                                     None)
+    ordering = get_ordering('slowest-first', controller)
+    assert_equals(names(ordering.sort_scenarios(feature.scenarios)),
+                  [u'Short one', u'Long one', u'Rows', u'Failing one'])
+
+    # 6.5s over 4 steps, so the 3 steps of "Long one" take 4.875s
+    estimator = Estimator(controller.previous_results)
+    assert_equals(estimator.step_duration, 6.5 / 4)
+    assert_equals(estimator.scenario(feature.scenarios[1]), 3 * 6.5 / 4)
+    assert_equals(estimator.scenario(feature.scenarios[3]), 0.5 + 6.5 / 4)
+
+def test_slowest_first_without_history_counts_steps():
+    "slowest-first with no history at all runs the scenarios with the most steps first"
+
+    feature = Feature.from_string(FEATURE)
+    ordering = get_ordering('slowest-first', RunController())
+    assert_equals(names(ordering.sort_scenarios(feature.scenarios)),
+                  [u'Long one', u'Failing one', u'Rows', u'Short one'])
+
+def test_unknown_order():
+    "Asking for an order that does not exist fails"
+
+    assert_raises(ValueError, get_ordering, 'random')
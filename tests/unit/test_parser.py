@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from nose.tools import assert_equals, assert_raises
+
+from lettuce.core import Feature, Language
+from lettuce.parser import Tokenizer
+from lettuce.exceptions import LettuceSyntaxError
+
+FEATURE = u'''
+# language: en
+@slow
+Feature: Tokenize features
+  In order to parse features quickly
+  As a lettuce user
+
+  @first
+  Scenario: Same step twice
+    Given I do something
+    """
+    a multiline
+    """
+    Given I do something
+      | name | value |
+      | one  | 1     |
+
+  Scenario Outline: Many rows
+    Given I have <number> rows
+
+  Examples:
+    | number |
+    | 10     |
+    | 20     |
+'''
+
+def kinds_and_lines(string):
+    return [(t.kind, t.line) for t in Tokenizer(Language()).tokenize(string)]
+
+def test_tokenizer_gives_kinds_and_line_numbers():
+    "The tokenizer gives the kind and the line number of each meaningful line"
+
+    assert_equals(kinds_and_lines(FEATURE), [
+        ('tags', 3),
+        ('feature', 4),
+        ('text', 5),
+        ('text', 6),
+        ('tags', 8),
+        ('scenario', 9),
+        ('text', 10),
+        ('multiline', 11),
+        ('multiline', 12),
+        ('multiline', 13),
+        ('text', 14),
+        ('table', 15),
+        ('table', 16),
+        ('scenario', 18),
+        ('text', 19),
+        ('examples', 21),
+        ('table', 22),
+        ('table', 23),
+        ('table', 24),
+    ])
+
+def test_tokenizer_does_not_look_for_keywords_within_multilines():
+    "Lines within a multiline are tokenized as multiline, whatever they look like"
+
+    tokens = kinds_and_lines(u'"""\nScenario: not really\n| nor | this |\n"""')
+    assert_equals(tokens, [('multiline', line) for line in range(1, 5)])
+
+def test_parsers_build_the_same_feature():
+    "The single-pass parser builds the same feature as the regex one"
+
+    features = []
+    for parser in ('regex', 'single-pass'):
+        Feature.parser = parser
+        try:
+            features.append(Feature.from_string(FEATURE))
+        finally:
+            Feature.parser = 'single-pass'
+
+    old, new = features
+    assert_equals(new.name, old.name)
+    assert_equals(new.tags, old.tags)
+    assert_equals(new.description, old.description)
+    assert_equals(len(new.scenarios), len(old.scenarios))
+    for new_scenario, old_scenario in zip(new.scenarios, old.scenarios):
+        assert_equals(new_scenario.name, old_scenario.name)
+        assert_equals(new_scenario.tags, old_scenario.tags)
+        assert_equals(new_scenario.keys, old_scenario.keys)
+        assert_equals(new_scenario.outlines, old_scenario.outlines)
+        for new_step, old_step in zip(new_scenario.steps, old_scenario.steps):
+            assert_equals(new_step.sentence, old_step.sentence)
+            assert_equals(new_step.keys, old_step.keys)
+            assert_equals(new_step.hashes, old_step.hashes)
+            assert_equals(new_step.multiline, old_step.multiline)
+
+def test_steps_get_the_line_they_are_at():
+    "Steps with the same sentence get each their own line number"
+
+    feature = Feature.from_string(FEATURE, with_file='tokenize.feature')
+    first, second = feature.scenarios[0].steps
+
+    assert_equals(first.described_at.line, 10)
+    assert_equals(second.described_at.line, 14)
+
+def test_single_pass_parser_complains_about_many_features():
+    "The single-pass parser does not accept more than one feature per file"
+
+    assert_raises(LettuceSyntaxError, Feature.from_string,
+                  FEATURE + u'\nFeature: Another one\n')
+
+def test_descriptions_get_the_lines_they_are_at():
+    "Features and scenarios get their line numbers straight from the parser, " \
+    "even when a scenario name or a description line repeats"
+
+    string = u'\n'.join([
+        u'Feature: Repeated names',
+        u'  As a lettuce user',
+        u'  Scenario: Twice',
+        u'    Given I am here',
+        u'  Scenario: Twice',
+        u'    Given I am here',
+        u'    And the lettuce user is As a lettuce user',
+    ])
+    feature = Feature.from_string(string, with_file='repeated.feature')
+
+    assert_equals(feature.described_at.line, 1)
+    assert_equals(feature.described_at.description_at, (2, ))
+    assert_equals([s.described_at.line for s in feature.scenarios], [3, 5])
@@ -312,6 +312,19 @@ def test_solved_steps_also_have_scenario_as_attribute():
     for step in scenario.solved_steps:
         assert_equals(step.scenario, scenario)
 
+def test_solving_steps_leaves_the_outlined_steps_untouched():
+    "Solving the steps of a scenario outline won't change its own steps"
+    scenario = Scenario.from_string(OUTLINED_SCENARIO_WITH_SUBSTITUTIONS_IN_TABLE)
+    solved = scenario.solved_steps
+
+    assert_equals(scenario.steps[0].sentence, 'Given I provide the following configuration:')
+    assert_equals(scenario.steps[0].hashes, [
+        {'Parameter': 'a', 'Value': '<a>'},
+        {'Parameter': 'b', 'Value': '<b>'},
+    ])
+    assert solved[0] is not scenario.steps[0]
+    assert solved[0].hashes is not solved[2].hashes
+
 def test_scenario_outlines_within_feature():
     "Solving scenario outlines within a feature"
     feature = Feature.from_string(OUTLINED_FEATURE)
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2011>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from nose.tools import assert_equals, assert_raises
+
+from lettuce.core import Feature
+from lettuce.ordering import Estimator
+from lettuce.sharding import parse_shard, shard_filename, suffixed_filename, split
+
+FEATURE = u'''
+Feature: Shard things %s
+  Scenario: Three steps
+    Given I do one thing
+    And I do another thing
+    And I do yet another thing
+
+  Scenario: Two steps
+    Given I do one thing
+    And I do another thing
+
+  Scenario: One step
+    Given I do one thing
+'''
+
+def test_parse_shard():
+    "Shards are given as K/N, K going from 1 to N"
+
+    assert_equals(parse_shard("3/12"), (3, 12))
+    assert_raises(ValueError, parse_shard, "0/12")
+    assert_raises(ValueError, parse_shard, "13/12")
+    assert_raises(ValueError, parse_shard, "twelve")
+
+def test_shard_filename():
+    "Each shard writes to a file of its own"
+
+    assert_equals(shard_filename("lettucetests.xml", (3, 12)), "lettucetests-3.xml")
+    assert_equals(shard_filename("lettucetests.xml", None), "lettucetests.xml")
+    assert_equals(suffixed_filename("lettucetests-3.xml", "blog"), "lettucetests-3-blog.xml")
+
+def test_split_balances_estimated_durations():
+    "Scenarios are split, the longest first, to the shard with the least work"
+
+    first = Feature.from_string(FEATURE % 'first')
+    second = Feature.from_string(FEATURE % 'second')
+    shards = split([first, second], 2, Estimator())
+
+    # 3, 3, 2, 2, 1 and 1 steps, handed out in turn
+    assert_equals(shards, [
+        [(first, [1, 2, 3])],
+        [(second, [1, 2, 3])],
+    ])
+
+    shards = split([first, second], 3, Estimator())
+    assert_equals(shards, [
+        [(first, [1, 3])],
+        [(second, [1, 3])],
+        [(first, [2]), (second, [2])],
+    ])
+
+def test_split_takes_every_scenario_once():
+    "Every selected scenario ends up within exactly one shard"
+
+    features = [Feature.from_string(FEATURE % index) for index in range(5)]
+    for count in (1, 2, 3, 7, 20):
+        taken = []
+        for shard in split(features, count, Estimator(), scenarios=[1, 3]):
+            for feature, scenarios in shard:
+                taken.extend([(features.index(feature), index) for index in scenarios])
+
+        assert_equals(sorted(taken),
+                      [(feature, index) for feature in range(5) for index in (1, 3)])
@@ -275,6 +275,82 @@ def test_handy_function_for_table_members_fail_giving_assertionerror():
 
     assert failed, 'it should fail'
 
+def test_table_gives_the_values_of_a_column():
+    'Step.table.column gives the list of the values under a key'
+
+    step = Step.from_string(I_HAVE_TASTY_BEVERAGES)
+    assert_equals(step.table.column('Name'), ['Skol', 'Nestea'])
+    assert_equals(step.table.column('Price'), ['3.80', '2.10'])
+
+def test_table_column_fails_giving_assertionerror():
+    'Step.table.column raises AssertionError if the key does not exist'
+
+    step = Step.from_string(I_HAVE_TASTY_BEVERAGES)
+    try:
+        step.table.column('Foobar')
+        failed = False
+    except AssertionError, e:
+        failed = True
+        assert_equals(
+            unicode(e),
+            'The step "I have the following tasty beverages in my freezer:" ' \
+            'have no table column with the key "Foobar". ' \
+            'Could you check your step definition for that ? ' \
+            'Maybe there is a typo :)'
+        )
+
+    assert failed, 'it should fail'
+
+def test_table_gives_the_rows_as_tuples():
+    'Step.table.rows gives the rows as tuples, of all the keys or of the given ones'
+
+    step = Step.from_string(I_HAVE_TASTY_BEVERAGES)
+    assert_equals(len(step.table), 2)
+    assert_equals(step.table.keys, ('Name', 'Type', 'Price'))
+    assert_equals(list(step.table.rows()), [
+        ('Skol', 'Beer', '3.80'),
+        ('Nestea', 'Ice-tea', '2.10'),
+    ])
+    assert_equals(list(step.table.rows('Price', 'Name')), [
+        ('3.80', 'Skol'),
+        ('2.10', 'Nestea'),
+    ])
+    assert_equals(list(step.table), list(step.table.rows()))
+
+def test_table_of_step_without_one():
+    'Step.table of a step without a table is empty'
+
+    step = Step.from_string(I_DIE_HAPPY)
+    assert_equals(len(step.table), 0)
+    assert_equals(list(step.table.rows()), [])
+    assert_equals(step.hashes, [])
+
+def test_hashes_of_short_rows_miss_their_keys():
+    'Step.hashes rows miss the keys their line has no cell for, as Step.table has None there'
+
+    step = Step.from_string("""I have the following tasty beverages in my freezer:
+   | Name   | Type     | Price |
+   | Skol   | Beer     |
+""")
+    assert_equals(step.hashes, [{'Name': 'Skol', 'Type': 'Beer'}])
+    assert_equals(step.table.column('Price'), [None])
+
+def test_values_under_follow_changes_to_the_hashes():
+    'Step.hashes.values_under gives the values the rows of Step.hashes have right now'
+
+    step = Step.from_string(I_HAVE_TASTY_BEVERAGES)
+    step.hashes.append({'Name': 'Heineken', 'Type': 'Beer', 'Price': '4.10'})
+    step.hashes[0]['Name'] = 'Brahma'
+    assert_equals(step.hashes.values_under('Name'), ['Brahma', 'Nestea', 'Heineken'])
+
+def test_hashes_can_be_set():
+    'Setting Step.hashes sets Step.table as well'
+
+    step = Step.from_string(I_HAVE_TASTY_BEVERAGES)
+    step.hashes = [{'Name': 'Heineken', 'Type': 'Beer', 'Price': '4.10'}]
+    assert_equals(step.table.column('Name'), ['Heineken'])
+    assert_equals(step.hashes.first['Price'], '4.10')
+
 
 def test_step_with_one_tag():
     "Lettuce should support a tag in a step"
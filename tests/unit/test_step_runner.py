@@ -463,3 +463,52 @@ def test_invalid_regex_raise_an_error():
         def step_with_bad_regex(step):
             pass
     assert_raises(StepLoadingError, load_step)
+
+@with_setup(step_runner_environ, step_runner_cleanup)
+def test_step_index_follows_the_step_registry_order():
+    "The step index picks the first matching definition, in the same " \
+    "order as STEP_REGISTRY.items()"
+    import re
+
+    @step(r'a step that (.*) matches')
+    def generic(step, what):
+        pass
+
+    @step(r'a step that (certainly|surely) matches')
+    def specific(step, what):
+        pass
+
+    expected = [func for regex, func in registry.STEP_REGISTRY.items()
+                if re.search(regex, 'Given a step that surely matches')][0]
+
+    matched, func = registry.STEP_INDEX.match(u'Given a step that surely matches', True)
+    assert_equals(func, expected)
+    assert_equals(matched.groups(), ('surely', ))
+
+@with_setup(step_runner_environ, step_runner_cleanup)
+def test_step_index_is_updated_when_a_step_is_defined():
+    "The step index forgets its cached matches when a new step is defined"
+    from lettuce.exceptions import NoDefinitionFound
+
+    runnable_step = Step.from_string('Given I am defined just now')
+    assert_raises(NoDefinitionFound, runnable_step.run, True)
+
+    @step(r'I am defined (.*)')
+    def defined_later(step, when):
+        assert_equals(when, 'just now')
+
+    assert runnable_step.run(True)
+
+@with_setup(step_runner_environ, step_runner_cleanup)
+def test_step_index_does_not_prefilter_alternations():
+    "The step index does not discard a regex with a top level alternation"
+
+    @step(r'apples|oranges are (\w+)')
+    def fruits(step, color):
+        pass
+
+    matched, func = registry.STEP_INDEX.match(u'When oranges are orange', True)
+    assert_equals(func, fruits)
+
+    matched, func = registry.STEP_INDEX.match(u'When ORANGES are orange', False)
+    assert_equals(func, None)
@@ -227,6 +227,22 @@ def test_dicts_to_string_allows_empty():
         u"| Miguel \\| Arcanjo |     |\n"
     )
 
+def test_columns_to_lines():
+    "strings.columns_to_lines yields the lines of a table out of its columns"
+
+    lines = strings.columns_to_lines(
+        ['name', 'age'],
+        [[u'Gabriel | Falcão', 'Miguel'], [22, None]]
+    )
+    assert_equals(
+        list(lines),
+        [
+            u"| name             | age |",
+            u"| Gabriel \\| Falcão | 22  |",
+            u"| Miguel           |     |",
+        ]
+    )
+
 def test_parse_hashes():
     "strings.parse_hashes"
 
@@ -330,3 +346,22 @@ def test_steal_right_tags():
     tags, non_tag_lines = strings.steal_tags_from_lines(lines)
     assert_equals(["nice", "tags-only", "indeed"], tags)
     assert_equals(len(non_tag_lines), len(orig_lines)-1)
+
+def test_steal_tags_from_consecutive_lines():
+    "strings.steal_tags_from_lines takes every tag line, even one right after another"
+    lines = ["Given a step", "", "@slow", "@red, @blue", "Then another step"]
+    tags, non_tag_lines = strings.steal_tags_from_lines(lines)
+    assert_equals(["slow", "red", "blue"], tags)
+    assert_equals(["Given a step", "Then another step"], non_tag_lines)
+
+def test_split_wisely_splits_on_regex_chars():
+    "strings.split_wisely splits on single chars that mean something in regexes"
+    assert_equals(strings.split_wisely("a|b", "|"), ["a", "b"])
+    assert_equals(strings.split_wisely("a.b", "."), ["a", "b"])
+    assert_equals(strings.split_wisely("aXbxc", "x"), ["a", "b", "c"])
+
+def test_wise_startswith_ignores_case():
+    "strings.wise_startswith ignores case, and leading spaces"
+    assert strings.wise_startswith("  Scenario: foo", "scenario")
+    assert strings.wise_startswith("  | a | b |", "|")
+    assert not strings.wise_startswith("Given | a |", "|")
@@ -134,25 +134,28 @@ def test_after_each_feature_is_executed_before_each_feature():
 def test_after_each_all_is_executed_before_each_all():
     "terrain.before.each_all and terrain.after.each_all decorators"
     import lettuce
+    from lettuce import runner as lettuce_runner
     from lettuce.fs import FeatureLoader
     world.all_steps = []
 
     mox = Mox()
 
     loader_mock = mox.CreateMock(FeatureLoader)
-    mox.StubOutWithMock(lettuce.sys, 'path')
-    mox.StubOutWithMock(lettuce, 'fs')
-    mox.StubOutWithMock(lettuce.fs, 'FileSystem')
-    mox.StubOutWithMock(lettuce, 'Feature')
+    mox.StubOutWithMock(lettuce_runner, 'load_terrain')
+    mox.StubOutWithMock(lettuce_runner.sys, 'path')
+    mox.StubOutWithMock(lettuce_runner, 'fs')
+    mox.StubOutWithMock(lettuce_runner.fs, 'FileSystem')
+    mox.StubOutWithMock(lettuce_runner, 'Feature')
 
-    lettuce.fs.FeatureLoader('some_basepath').AndReturn(loader_mock)
+    lettuce_runner.load_terrain()
+    lettuce_runner.fs.FeatureLoader('some_basepath', file_cache=None, walk_threads=1, step_manifest=None).AndReturn(loader_mock)
 
-    lettuce.sys.path.insert(0, 'some_basepath')
-    lettuce.sys.path.remove('some_basepath')
+    lettuce_runner.sys.path.insert(0, 'some_basepath')
+    lettuce_runner.sys.path.remove('some_basepath')
 
     loader_mock.find_and_load_step_definitions()
     loader_mock.find_feature_files().AndReturn(['some_basepath/foo.feature'])
-    lettuce.Feature.from_file('some_basepath/foo.feature'). \
+    lettuce_runner.Feature.from_file('some_basepath/foo.feature', parser=None). \
         AndReturn(Feature.from_string(FEATURE2))
 
     mox.ReplayAll()